@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+from PIL import Image
+
+from src.benchmarks.utils import time_function
+from src.generator.utils import PIL2array1C, PIL2array3C
+
+
+def benchmark_conversions(size: int = 1280, repeats: int = 10):
+    """Compares the PIL to NumPy conversions against the former getdata() approach"""
+    rng = np.random.default_rng(0)
+    img_3c = Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8))
+    img_1c = Image.fromarray(rng.integers(0, 256, (size, size), dtype=np.uint8))
+    w, h = size, size
+    return {
+        "PIL2array3C_getdata": time_function(
+            lambda: np.array(img_3c.getdata(), np.uint8).reshape(h, w, 3), repeats
+        ),
+        "PIL2array3C": time_function(lambda: PIL2array3C(img_3c), repeats),
+        "PIL2array3C_no_copy": time_function(
+            lambda: PIL2array3C(img_3c, copy=False), repeats
+        ),
+        "PIL2array1C_getdata": time_function(
+            lambda: np.array(img_1c.getdata(), np.uint8).reshape(h, w), repeats
+        ),
+        "PIL2array1C": time_function(lambda: PIL2array1C(img_1c), repeats),
+        "PIL2array1C_no_copy": time_function(
+            lambda: PIL2array1C(img_1c, copy=False), repeats
+        ),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark_conversions(), indent=2))
@@ -0,0 +1,301 @@
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from src.benchmarks.utils import time_function
+from src.config import BLENDING_LIST, NUMBER_OF_WORKERS, OBJECT_CATEGORIES
+from src.generator.annotations import create_annotation_dicts_mscoco
+from src.generator.backgrounds import get_background
+from src.generator.create import render_plan_record
+from src.generator.handler import (
+    generate_synthetic_dataset,
+    load_relevant_data,
+    sample_tasks,
+)
+from src.generator.join_annotations import merge_mscoco_annotation_files
+from src.generator.plan import create_plan_header, plan_image
+from src.image_augmentation.basic_augmentations import augment_rotation, augment_scale
+from src.image_augmentation.blendings import (
+    apply_blendings_and_paste_onto_background,
+    sample_blending_parameters,
+)
+from src.image_augmentation.misc import (
+    adjust_masks_for_occlusion,
+    create_full_size_and_sharpened_mask,
+)
+from src.image_augmentation.motion_blur import apply_motion_blur
+from src.image_augmentation.object_position import find_valid_object_position
+from src.models.auxiliary import ImgPosition, ImgSize
+from src.models.img_data import ImgDataRGBA
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+SPLIT_FILES = [
+    DATA_DIR / "objects/splits.json",
+    DATA_DIR / "distractors/splits.json",
+    DATA_DIR / "backgrounds/splits.json",
+]
+BLENDING_MODES = [
+    "none",
+    "gaussian",
+    "box",
+    "motion",
+    "gamma_correction",
+    "illumination",
+    "mixed",
+    "poisson",
+]
+STAGES = [
+    "asset_loading",
+    "scale_rotate",
+    "placement",
+    "planning",
+    "blending",
+    "motion_blur",
+    "annotations",
+    "render",
+    "join",
+    "end_to_end",
+    "backends",
+]
+
+
+def benchmark_pipeline(
+    stages: List[str] = STAGES,
+    repeats: int = 10,
+    join_sizes: List[int] = [10000, 100000],
+    workers: List[int] = [1, 4, NUMBER_OF_WORKERS],
+    num_images: int = 8,
+) -> Dict[str, Dict]:
+    """Times each stage of the generation on the bundled assets in data/
+
+    Stages work on the first planned image of the train split with seed 0, thus the
+    workload is the same for each run.
+
+    Args:
+        stages(list): Stages to benchmark (see STAGES)
+        repeats(int): Number of timed calls of the per-image stages
+        join_sizes(list): Number of single image annotation files joined
+        workers(list): Number of workers of the end-to-end and backend runs
+        num_images(int): Number of images of the end-to-end runs
+    Returns:
+        dict: Timing statistics (see time_function) of each benchmark
+    """
+    object_catalog, distractor_catalog, background_catalog = load_relevant_data(
+        *[split_file.as_posix() for split_file in SPLIT_FILES]
+    )
+    params = next(
+        sample_tasks(object_catalog, distractor_catalog, background_catalog, "train", 0)
+    )
+    header = create_plan_header(
+        "train", 0, OBJECT_CATEGORIES, BLENDING_LIST, True, True, True
+    )
+    sizes = {}
+    record = plan_image(params, header, sizes)
+    layout = record["objects"][0]
+    img_data = ImgDataRGBA.from_dict(layout)
+    foreground, mask, _, _ = img_data.load_object_data()
+    foreground, mask = augment_scale(foreground, mask, layout["size"])
+    foreground, mask = augment_rotation(foreground, mask, layout["rotation"])
+    x, y = layout["position"]
+    background = get_background(
+        record["background"],
+        record.get("background_crop"),
+        record["background_size"],
+    )
+    background = Image.fromarray(background, "RGB")
+    bg_w, bg_h = background.size
+
+    results = {}
+    if "asset_loading" in stages:
+        results["asset_loading"] = time_function(img_data.load_object_data, repeats)
+    if "scale_rotate" in stages:
+        loaded_foreground, loaded_mask, _, _ = img_data.load_object_data()
+
+        def scale_rotate():
+            fg, m = augment_scale(loaded_foreground, loaded_mask, layout["size"])
+            augment_rotation(fg, m, layout["rotation"])
+
+        results["scale_rotate"] = time_function(scale_rotate, repeats)
+    if "placement" in stages:
+        o_w, o_h = foreground.size
+        xmin, xmax, ymin, ymax = layout["bbox"]
+        placed = [  # the other objects of the image are placed already
+            [
+                o["position"][0] + o["bbox"][0],
+                o["position"][0] + o["bbox"][1],
+                o["position"][1] + o["bbox"][2],
+                o["position"][1] + o["bbox"][3],
+            ]
+            for o in record["objects"][1:]
+        ]
+        results["placement"] = time_function(
+            lambda: find_valid_object_position(
+                list(placed), True, bg_h, o_h, o_w, bg_w, xmax, xmin, ymax, ymin
+            ),
+            repeats,
+        )
+    if "planning" in stages:
+        results["planning"] = time_function(
+            lambda: plan_image(params, header, sizes), repeats
+        )
+    if "blending" in stages:
+        for mode in BLENDING_MODES:
+            blending_params = [sample_blending_parameters(mode, random.Random(0))]
+            results[f"blending_{mode}"] = time_function(
+                lambda: apply_blendings_and_paste_onto_background(
+                    [background.copy()], [mode], foreground, mask, x, y, blending_params
+                ),
+                repeats if mode != "poisson" else 1,
+            )
+    if "motion_blur" in stages:
+        background_array = np.asarray(background)
+        results["motion_blur"] = time_function(
+            lambda: apply_motion_blur(background_array, 9, 45.0, "full"), repeats
+        )
+    if "annotations" in stages:
+
+        def annotations():
+            masks = [
+                create_full_size_and_sharpened_mask(
+                    mask, ImgSize(bg_w, bg_h), ImgPosition(*o["position"])
+                )
+                for o in record["objects"]
+            ]
+            adjust_masks_for_occlusion(masks)
+            create_annotation_dicts_mscoco(0, masks, [0] * len(masks), bg_w, bg_h)
+
+        results["annotations"] = time_function(annotations, repeats)
+    if "render" in stages:
+        results["render"] = time_function(
+            lambda: render_plan_record(record, header["blending_list"]), repeats
+        )
+        results["render"]["images"] = len(header["blending_list"])
+    if "join" in stages:
+        for join_size in join_sizes:
+            results[f"join_{join_size}"] = benchmark_join(join_size)
+    if "end_to_end" in stages:
+        for num_workers in workers:
+            results[f"end_to_end_{num_workers}_workers"] = benchmark_end_to_end(
+                num_workers, num_images
+            )
+    if "backends" in stages:
+        for num_workers in workers:
+            for backend in ["processes", "threads"]:
+                results[f"backend_{backend}_{num_workers}_workers"] = benchmark_backend(
+                    backend, num_workers, num_images
+                )
+    for stats in results.values():
+        stats["per_s"] = 1000 * stats.get("images", 1) / stats["mean_ms"]
+    return results
+
+
+def benchmark_join(num_files: int, repeats: int = 1) -> Dict:
+    """Joins num_files synthetic single image annotation files"""
+    annotation = {
+        "segmentation": [[10, 10, 60, 10, 60, 60, 10, 60]],
+        "iscrowd": 0,
+        "image_id": 0,
+        "category_id": 0,
+        "id": 0,
+        "bbox": [10, 10, 50, 50],
+        "area": 0,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_paths = []
+        for i in range(num_files):
+            data = {
+                "categories": OBJECT_CATEGORIES,
+                "annotations": [annotation, dict(annotation, id=1)],
+                "images": [
+                    {
+                        "id": 0,
+                        "file_name": f"train/{i:05d}/image_none00.jpg",
+                        "width": 1280,
+                        "height": 720,
+                    }
+                ],
+            }
+            json_path = Path(tmp_dir) / f"{i}.json"
+            with json_path.open("w") as f:
+                json.dump(data, f)
+            json_paths.append(json_path)
+        output_path = Path(tmp_dir) / "joined.json"
+        stats = time_function(
+            lambda: merge_mscoco_annotation_files(json_paths, output_path),
+            repeats,
+            warmup=0,
+        )
+    stats["images"] = num_files
+    return stats
+
+
+def benchmark_end_to_end(
+    num_workers: int, num_images: int, backend: str = "processes"
+) -> Dict:
+    """Generates a dataset with num_images train images from scratch"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        generate_synthetic_dataset(
+            output_dir=tmp_dir,
+            object_json=SPLIT_FILES[0].as_posix(),
+            distractor_json=SPLIT_FILES[1].as_posix(),
+            background_json=SPLIT_FILES[2].as_posix(),
+            number_of_images={"train": num_images, "validation": 0, "test": 0},
+            dontocclude=True,
+            rotation=True,
+            scale=True,
+            multithreading=num_workers > 1,
+            seed=0,
+            render_cache_dir=None,
+            num_workers=num_workers,
+            backend=backend,
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    return {
+        "mean_ms": elapsed_ms,
+        "min_ms": elapsed_ms,
+        "max_ms": elapsed_ms,
+        "repeats": 1,
+        "images": num_images * len(BLENDING_LIST),
+    }
+
+
+def benchmark_backend(backend: str, num_workers: int, num_images: int) -> Dict:
+    """Measures throughput and peak memory of an execution backend
+
+    Each run is a fresh interpreter, such that the peak RSS is not inflated by earlier
+    benchmarks. The memory of the process backend is estimated as the peak RSS of the
+    parent plus num_workers times the largest peak RSS of a worker.
+    """
+    code = (
+        "from resource import getrusage, RUSAGE_SELF, RUSAGE_CHILDREN;"
+        "import json;"
+        "from src.benchmarks.pipeline import benchmark_end_to_end;"
+        f"stats = benchmark_end_to_end({num_workers}, {num_images}, {backend!r});"
+        "stats['self_rss'] = getrusage(RUSAGE_SELF).ru_maxrss;"
+        "stats['children_rss'] = getrusage(RUSAGE_CHILDREN).ru_maxrss;"
+        "print(json.dumps(stats))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=DATA_DIR.parent,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    stats = json.loads(output.strip().splitlines()[-1])
+    self_rss = stats.pop("self_rss") * 1024
+    children_rss = stats.pop("children_rss") * 1024
+    if backend == "processes" and num_workers > 1:
+        stats["peak_rss"] = self_rss + num_workers * children_rss
+    else:
+        stats["peak_rss"] = self_rss
+    return stats
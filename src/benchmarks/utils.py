@@ -0,0 +1,79 @@
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+
+def time_function(func: Callable, repeats: int = 10, warmup: int = 1) -> Dict:
+    """Times func and returns the statistics in milliseconds
+
+    Args:
+        func(Callable): Function without arguments to time
+        repeats(int): Number of timed calls
+        warmup(int): Number of untimed calls before timing (e.g. to fill caches)
+    Returns:
+        dict: Mean, min and max time per call in ms
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": sum(timings) / len(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "repeats": repeats,
+    }
+
+
+def save_results(results: Dict[str, Dict], output_file: Path):
+    """Saves benchmark results together with a description of the machine"""
+    data = {
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(output_file, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_results(results_file: Path) -> Dict[str, Dict]:
+    with open(results_file, "r") as f:
+        return json.load(f)["results"]
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = 1.2
+) -> List[str]:
+    """Prints the speed of each benchmark relative to the baseline
+
+    Args:
+        results(dict): Current results
+        baseline(dict): Results of a previous run
+        threshold(float): Benchmarks slower than threshold times the baseline regressed
+    Returns:
+        list: Names of the regressed benchmarks
+    """
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, stats in results.items():
+        if name not in baseline:
+            print(f"{name:<32} {'-':>12} {stats['mean_ms']:>12.2f}")
+            continue
+        ratio = stats["mean_ms"] / baseline[name]["mean_ms"]
+        flag = " REGRESSION" if ratio > threshold else ""
+        print(
+            f"{name:<32} {baseline[name]['mean_ms']:>12.2f} "
+            f"{stats['mean_ms']:>12.2f} {ratio:>7.2f}{flag}"
+        )
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
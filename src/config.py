@@ -1,5 +1,12 @@
 # Parameters for generator
-NUMBER_OF_WORKERS = 20
+NUMBER_OF_WORKERS = 20  # used unless src/tools/autotune_workers.py was run on this machine
+WORKER_LIBRARY_THREADS = 1  # threads of OpenCV/BLAS in each worker (None keeps the library defaults)
+EXECUTION_BACKEND = "processes"  # "processes" or "threads" (one process sharing imports and caches, less memory)
+TASK_SCHEDULING = "locality"  # "locality" renders tasks of a background (sorted by objects) in batches on one worker, "fifo" in plan order
+SCHEDULING_BATCH_SIZE = 16  # maximum number of tasks per batch of the locality scheduling
+METRICS_FILE = None  # Prometheus text file with live metrics of a run, e.g. for the textfile collector of the node exporter (None disables it)
+METRICS_PORT = None  # serve live metrics of a run at http://localhost:<port>/metrics (None disables it)
+METRICS_INTERVAL = 5  # seconds between two updates of METRICS_FILE
 BLENDING_LIST = [
     "gaussian",
     # "poisson",  # takes a lot of time and results are not that good
@@ -18,6 +25,11 @@ MAX_NO_OF_OBJECTS = 4
 MIN_NO_OF_DISTRACTOR_OBJECTS = 2
 MAX_NO_OF_DISTRACTOR_OBJECTS = 4
 MAX_ATTEMPTS_TO_SYNTHESIZE = 20
+MAX_SAMPLING_ATTEMPTS = 1000  # draws of a scale or rotation before the layout of an image is given up
+MAX_LAYOUT_ATTEMPTS = 100  # layouts sampled per image before its task is re-planned with a new seed
+MAX_REPLANS = 3  # re-plans of a failed task (new seed) before it is skipped, see failed_tasks.jsonl
+TASK_TIMEOUT = 600  # seconds a task may render before its worker is recycled and the task re-planned (None disables it)
+DRY_RUN_CALIBRATION_TASKS = 4  # tasks rendered per split by a dry run to calibrate its estimates
 
 # Parameters for objects in images
 MIN_SCALE = 0.15  # min scale for scale augmentation (maximum extend in each direction, 1=same size as image)
@@ -32,6 +44,22 @@ MAX_ALLOWED_IOU = 0.5  # IOU > MAX_ALLOWED_IOU is considered an occlusion, need
 # Parameters for image loading
 MINFILTER_SIZE = 3
 
+# Parameters for background loading
+BACKGROUND_CACHE_SIZE = 16  # number of preprocessed backgrounds kept in memory per worker (0 disables caching)
+BACKGROUND_CACHE_DIR = None  # directory for preprocessed backgrounds as memory-mapped .npy files (None: in memory)
+BACKGROUND_TARGET_SIZE = None  # (width, height) of generated images, None keeps the size of each background
+BACKGROUND_RESIZE_MODE = "resize"  # "resize" to target size, "crop" (scale to cover target size, then center crop) or "random_crop" (random crop of each image, scaled to target size)
+BACKGROUND_CROPS = 1  # consecutive images planned on each sampled background, e.g. with their own random crop (decoded once per worker)
+BACKGROUND_CROP_SCALE = (0.5, 1.0)  # side length of random crops relative to the largest crop with the aspect ratio of the target size
+
+# Parameters for rendering
+RENDER_CACHE_DIR = None  # directory of rendered images and masks, reused on rebuilds if unchanged (None disables caching)
+
+# Parameters for previews
+PREVIEW_SCALE = 0.25  # size of preview images (backgrounds and all geometry) relative to the generated images
+PREVIEW_TILE_SIZE = (320, 240)  # (width, height) of the box of each image on the contact sheet
+PREVIEW_COLUMNS = 8  # images per row of the contact sheet
+
 # Other
 OBJECT_CATEGORIES = [
     {"id": 0, "name": "box"},
@@ -1,9 +1,8 @@
 import json
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 import cv2
-import matplotlib.pyplot as plt  # noqa
 import numpy as np
 from PIL import Image
 
@@ -58,7 +57,19 @@ def create_image_and_annotation_dict_mscoco(
         "width": width,
         "height": height,
     }
+    annotation_dicts = create_annotation_dicts_mscoco(
+        image_id_int, masks, mask_category_ids, width, height
+    )
+    return image_dict, annotation_dicts
+
 
+def create_annotation_dicts_mscoco(
+    image_id_int: int,
+    masks: List[np.ndarray],
+    mask_category_ids: List[int],
+    width: int,
+    height: int,
+) -> List[Dict]:
     # compute mask and bounding box
     annotation_dicts = []
     for mask_id_int, mask in enumerate(masks):
@@ -79,36 +90,40 @@ def create_image_and_annotation_dict_mscoco(
             "area": area,
         }
         annotation_dicts.append(annotation_dict)
-    return image_dict, annotation_dicts
+    return annotation_dicts
 
 
 def save_single_annotation_data_to_json(
-    img_dict, annotation_dicts, categories, render_config, output_file_path
+    img_dict, annotation_dicts, categories, record, output_file_path
 ):
     subset_dict = {
         "categories": categories,
         "annotations": annotation_dicts,
         "images": [img_dict],
-        "render_config": {
-            "path": {
-                object_type: (
-                    str(render_config[object_type][0].img_path.parent)
-                    if len(render_config[object_type]) > 0
-                    else ""
-                )
-                for object_type in ["objects", "distractor_objects"]
-            },
-            "objects": [f.img_path.name for f in render_config["objects"]],
-            "distractors": [
-                f.img_path.name for f in render_config["distractor_objects"]
-            ],
-            "background": str(render_config["bg_file"]),
-        },
+        "render_config": get_render_config(record),
     }
     with open(output_file_path, "w") as f:
         json.dump(subset_dict, f)
 
 
+def get_render_config(record):
+    """Summarizes the assets of a plan record, the full layout is in the plan file"""
+    objects = [Path(o["path"]) for o in record["objects"] if not o["distractor"]]
+    distractors = [Path(o["path"]) for o in record["objects"] if o["distractor"]]
+    return {
+        "task_id": record["task_id"],
+        "path": {
+            "objects": str(objects[0].parent) if len(objects) > 0 else "",
+            "distractor_objects": (
+                str(distractors[0].parent) if len(distractors) > 0 else ""
+            ),
+        },
+        "objects": [p.name for p in objects],
+        "distractors": [p.name for p in distractors],
+        "background": record["background"],
+    }
+
+
 def save_annotation_data_to_json(
     imgs_dict, annotation_dicts, categories, output_file_path
 ):
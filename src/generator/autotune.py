@@ -0,0 +1,175 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config import BLENDING_LIST, NUMBER_OF_WORKERS, WORKER_LIBRARY_THREADS
+from src.generator.utils import LIBRARY_THREAD_VARIABLES
+
+ROOT = Path(__file__).parent.parent.parent
+AUTOTUNE_FILE = ROOT / "autotune.json"
+MEMORY_FRACTION = 0.8  # fraction of the available memory a run may use
+
+
+def autotune_workers(
+    object_json: str,
+    distractor_json: str,
+    background_json: str,
+    num_images: int = 8,
+    candidates: Optional[List[int]] = None,
+    memory_limit: Optional[int] = None,
+) -> Dict:
+    """Finds the number of workers with the highest throughput within a memory limit
+
+    Each candidate generates the same small dataset (at least two images per worker)
+    with library threads limited to WORKER_LIBRARY_THREADS per worker, in a fresh
+    interpreter (see measure_worker_count).
+
+    Args:
+        object_json(str): Path to objects of interest json
+        distractor_json(str): Path to distractor object json
+        background_json(str): Path to background json
+        num_images(int): Minimum number of images generated per candidate
+        candidates(list): Numbers of workers to try (default: powers of two up to the
+            number of CPUs)
+        memory_limit(int): Bytes a run may use, parent and workers (default: 80% of
+            the available memory)
+    Returns:
+        dict: Chosen number of workers, machine description and all measurements
+    """
+    if candidates is None:
+        candidates = get_candidate_worker_counts(os.cpu_count())
+    if memory_limit is None:
+        memory_limit = int(MEMORY_FRACTION * get_available_memory())
+    measurements = []
+    for num_workers in candidates:
+        n = max(num_images, 2 * num_workers)
+        elapsed, peak_rss = measure_worker_count(
+            object_json, distractor_json, background_json, n, num_workers
+        )
+        measurements.append(
+            {
+                "num_workers": num_workers,
+                "images_per_s": n * len(BLENDING_LIST) / elapsed,
+                "memory": peak_rss,
+            }
+        )
+        print(
+            f"{num_workers:>3} workers: {measurements[-1]['images_per_s']:.2f} "
+            f"images/s, ~{measurements[-1]['memory'] / 1024 ** 2:.0f} MB"
+        )
+    feasible = [m for m in measurements if m["memory"] <= memory_limit]
+    best = max(feasible or measurements[:1], key=lambda m: m["images_per_s"])
+    return {
+        "num_workers": best["num_workers"],
+        "library_threads": WORKER_LIBRARY_THREADS,
+        "memory_limit": memory_limit,
+        "machine": get_machine_description(),
+        "measurements": measurements,
+    }
+
+
+def measure_worker_count(
+    object_json: str,
+    distractor_json: str,
+    background_json: str,
+    num_images: int,
+    num_workers: int,
+):
+    """Generates a dataset in a fresh interpreter, such that the peak RSS is per run
+
+    The peak RSS of the interpreter is read from procfs (see get_rss), since the
+    maximum RSS of getrusage is kept across fork and exec, i.e. includes the caller.
+    Library threads of the workers are limited by the environment of the interpreter,
+    i.e. before NumPy is loaded, even if threadpoolctl is missing.
+
+    Returns:
+        tuple: Seconds of the generation and peak memory in bytes, the peak RSS of the
+            parent plus num_workers times the largest peak RSS of a worker
+    """
+    kwargs = dict(
+        object_json=object_json,
+        distractor_json=distractor_json,
+        background_json=background_json,
+        number_of_images={"train": num_images, "validation": 0, "test": 0},
+        dontocclude=True,
+        rotation=True,
+        scale=True,
+        multithreading=num_workers > 1,
+        seed=0,
+        render_cache_dir=None,
+        num_workers=num_workers,
+    )
+    code = (
+        "from resource import getrusage, RUSAGE_CHILDREN;"
+        "import json, tempfile, time;"
+        "from src.generator.handler import generate_synthetic_dataset;"
+        "from src.generator.profiling import get_rss;"
+        "tmp_dir = tempfile.TemporaryDirectory();"
+        "start = time.perf_counter();"
+        f"generate_synthetic_dataset(output_dir=tmp_dir.name, **{kwargs!r});"
+        "elapsed = time.perf_counter() - start;"
+        "tmp_dir.cleanup();"
+        "print(json.dumps([elapsed, get_rss()['peak_rss'], "
+        "getrusage(RUSAGE_CHILDREN).ru_maxrss * 1024]))"
+    )
+    env = dict(os.environ)
+    if num_workers > 1 and WORKER_LIBRARY_THREADS is not None:
+        env.update({v: str(WORKER_LIBRARY_THREADS) for v in LIBRARY_THREAD_VARIABLES})
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    elapsed, peak_rss, worker_rss = json.loads(output.strip().splitlines()[-1])
+    if num_workers > 1:  # rendered in worker processes
+        peak_rss += num_workers * worker_rss
+    return elapsed, peak_rss
+
+
+def get_candidate_worker_counts(cpu_count: int) -> List[int]:
+    candidates = [1]
+    while candidates[-1] * 2 < cpu_count:
+        candidates.append(candidates[-1] * 2)
+    if cpu_count > 1:
+        candidates.append(cpu_count)
+    return candidates
+
+
+def get_available_memory() -> int:
+    """Returns the available memory in bytes (total memory if unknown)"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def get_machine_description() -> Dict:
+    return {"hostname": platform.node(), "cpu_count": os.cpu_count()}
+
+
+def save_autotune_result(result: Dict, autotune_file: Path = AUTOTUNE_FILE):
+    with open(autotune_file, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def get_number_of_workers(autotune_file: Path = AUTOTUNE_FILE) -> int:
+    """Returns the autotuned number of workers of this machine, else NUMBER_OF_WORKERS"""
+    if not Path(autotune_file).exists():
+        return NUMBER_OF_WORKERS
+    with open(autotune_file, "r") as f:
+        result = json.load(f)
+    if result["machine"] != get_machine_description():
+        print(f"Ignoring {autotune_file}, it was created on another machine")
+        return NUMBER_OF_WORKERS
+    return result["num_workers"]
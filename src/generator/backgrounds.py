@@ -0,0 +1,233 @@
+import hashlib
+import os
+import random
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config import (
+    BACKGROUND_CACHE_SIZE,
+    BACKGROUND_CACHE_DIR,
+    BACKGROUND_CROP_SCALE,
+    BACKGROUND_TARGET_SIZE,
+    BACKGROUND_RESIZE_MODE,
+)
+
+
+def load_background(
+    bg_file: Union[str, Path],
+    target_size: Optional[Tuple[int, int]] = None,
+    resize_mode: str = "resize",
+    draft: bool = False,
+    crop: Optional[List[int]] = None,
+) -> np.ndarray:
+    """Decodes a background and flattens it onto a white canvas
+
+    Args:
+        bg_file(Path): Background image path (can be RGB or RGBA)
+        target_size(tuple): Optional (width, height) of the returned background
+        resize_mode(str): "resize" to scale to target_size, "crop" to scale to cover
+            target_size and crop the center, "random_crop" keeps the full size unless
+            a crop is given
+        draft(bool): Decode JPEGs at the smallest scale (1/2, 1/4 or 1/8) that still
+            covers target_size, e.g. for previews
+        crop(list): Box (left, top, right, bottom) of the background that is scaled to
+            target_size, e.g. the random crop of a plan record
+    Returns:
+        NumPy Array: RGB background of shape (h, w, 3)
+    """
+    with Image.open(bg_file) as img:
+        full_w, full_h = img.size
+        if draft and target_size is not None:
+            draft_size = tuple(target_size)
+            if crop is not None:  # the crop needs to cover target_size
+                draft_size = (
+                    target_size[0] * full_w // max(1, crop[2] - crop[0]),
+                    target_size[1] * full_h // max(1, crop[3] - crop[1]),
+                )
+            img.draft("RGB", draft_size)
+        if crop is not None:
+            crop = [
+                crop[0] * img.width / full_w,
+                crop[1] * img.height / full_h,
+                crop[2] * img.width / full_w,
+                crop[3] * img.height / full_h,
+            ]
+        if img.mode in ["RGBA", "LA"] or "transparency" in img.info:
+            background_rgba = img.convert("RGBA")
+            background = Image.new("RGBA", background_rgba.size, (255, 255, 255))
+            background = Image.alpha_composite(background, background_rgba)
+            background = background.convert("RGB")
+        else:
+            background = img.convert("RGB")
+    if crop is not None:
+        return crop_background(background, crop, target_size)
+    if target_size is not None and resize_mode != "random_crop":
+        background = resize_background(background, target_size, resize_mode)
+    return np.asarray(background, dtype=np.uint8)
+
+
+def get_background_size(
+    bg_file: Union[str, Path],
+    target_size: Optional[Tuple[int, int]] = BACKGROUND_TARGET_SIZE,
+) -> Tuple[int, int]:
+    """Returns the (width, height) of a loaded background, only reading the header"""
+    if target_size is not None:
+        return tuple(target_size)
+    with Image.open(bg_file) as img:
+        return img.size
+
+
+def resize_background(
+    background: Image.Image, target_size: Tuple[int, int], resize_mode: str = "resize"
+) -> Image.Image:
+    target_w, target_h = target_size
+    if resize_mode == "resize":
+        return background.resize((target_w, target_h), Image.ANTIALIAS)
+    elif resize_mode == "crop":
+        bg_w, bg_h = background.size
+        scale = max(target_w / bg_w, target_h / bg_h)
+        new_w = max(target_w, int(round(bg_w * scale)))
+        new_h = max(target_h, int(round(bg_h * scale)))
+        background = background.resize((new_w, new_h), Image.ANTIALIAS)
+        left = (new_w - target_w) // 2
+        top = (new_h - target_h) // 2
+        return background.crop((left, top, left + target_w, top + target_h))
+    else:
+        raise NotImplementedError(f"Unknown background resize mode: {resize_mode}")
+
+
+def sample_background_crop(
+    bg_w: int,
+    bg_h: int,
+    target_w: int,
+    target_h: int,
+    rng: random.Random,
+    crop_scale: Tuple[float, float] = BACKGROUND_CROP_SCALE,
+) -> List[int]:
+    """Samples a random crop with the aspect ratio of the target size
+
+    Returns:
+        list: Box (left, top, right, bottom) of the crop in the background
+    """
+    max_scale = min(bg_w / target_w, bg_h / target_h)
+    scale = max_scale * rng.uniform(*crop_scale)
+    crop_w = min(bg_w, max(1, round(target_w * scale)))
+    crop_h = min(bg_h, max(1, round(target_h * scale)))
+    left = rng.randint(0, bg_w - crop_w)
+    top = rng.randint(0, bg_h - crop_h)
+    return [left, top, left + crop_w, top + crop_h]
+
+
+def crop_background(
+    background: Union[Image.Image, np.ndarray],
+    crop: List[float],
+    target_size: Tuple[int, int],
+) -> np.ndarray:
+    """Scales a box of the background to target_size, only the box is resampled"""
+    if isinstance(background, np.ndarray):
+        background = Image.fromarray(background, "RGB")
+    background = background.resize(tuple(target_size), Image.ANTIALIAS, box=crop)
+    return np.asarray(background, dtype=np.uint8)
+
+
+class BackgroundCache:
+    """Keeps decoded and flattened backgrounds, since they are reused for many images
+
+    Backgrounds are stored as read-only RGB arrays, either in memory or as .npy files in
+    cache_dir, which are memory-mapped (and thus shared between workers by the OS). The
+    cache can be shared by the threads of the thread backend. With the "random_crop"
+    resize mode, backgrounds are kept at full size and cropped for each image.
+    """
+
+    def __init__(
+        self,
+        max_size: int = BACKGROUND_CACHE_SIZE,
+        cache_dir: Optional[Union[str, Path]] = BACKGROUND_CACHE_DIR,
+        target_size: Optional[Tuple[int, int]] = BACKGROUND_TARGET_SIZE,
+        resize_mode: str = BACKGROUND_RESIZE_MODE,
+    ):
+        self.max_size = max_size
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if resize_mode == "random_crop":
+            target_size = None
+        self.target_size = tuple(target_size) if target_size is not None else None
+        self.resize_mode = resize_mode
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bg_file: Union[str, Path]) -> np.ndarray:
+        key = str(bg_file)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        # decoded without the lock, thus threads can load backgrounds in parallel
+        if self.cache_dir is not None:
+            background = self._load_from_disk(Path(bg_file))
+        else:
+            background = load_background(bg_file, self.target_size, self.resize_mode)
+        background.flags.writeable = False
+        if self.max_size > 0:
+            with self._lock:
+                self._cache[key] = background
+                if len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return background
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _load_from_disk(self, bg_file: Path) -> np.ndarray:
+        cache_file = self.cache_dir / f"{self._get_cache_key(bg_file)}.npy"
+        if not cache_file.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            background = load_background(bg_file, self.target_size, self.resize_mode)
+            tmp_file = cache_file.with_name(
+                f"{cache_file.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            )
+            np.save(tmp_file, background)
+            os.replace(tmp_file, cache_file)  # atomic, workers might race here
+        return np.load(cache_file, mmap_mode="r")
+
+    def _get_cache_key(self, bg_file: Path) -> str:
+        stat = bg_file.stat()
+        description = (
+            f"{bg_file.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|"
+            f"{self.target_size}|{self.resize_mode}"
+        )
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+
+_background_cache = None
+_background_cache_lock = threading.Lock()
+
+
+def get_background(
+    bg_file: Union[str, Path],
+    crop: Optional[List[int]] = None,
+    target_size: Optional[Tuple[int, int]] = None,
+) -> np.ndarray:
+    """Returns the preprocessed background from the cache of this process
+
+    Args:
+        bg_file(Path): Background image path
+        crop(list): Box of the background scaled to target_size, see load_background
+        target_size(tuple): (width, height) of the crop
+    """
+    global _background_cache
+    with _background_cache_lock:
+        if _background_cache is None:
+            _background_cache = BackgroundCache()
+    if crop is None:
+        return _background_cache.get(bg_file)
+    assert _background_cache.target_size is None, (
+        f"Background {bg_file} is cropped, but the cache resizes to "
+        f"{_background_cache.target_size}, was it planned with other settings?"
+    )
+    return crop_background(_background_cache.get(bg_file), crop, target_size)
@@ -1,11 +1,27 @@
+import os
+import time
+from pathlib import Path
+
 from PIL import Image
 
-from src.config import MAX_DEGREES, MAX_ATTEMPTS_TO_SYNTHESIZE
 from src.generator.annotations import (
     create_image_and_annotation_dict_mscoco,
     save_single_annotation_data_to_json,
     remove_ignore_label_segmentations,
 )
+from src.generator.backgrounds import get_background
+from src.generator.journal import append_to_journal
+from src.generator.plan import get_output_files
+from src.generator.profiling import (
+    finish_stage_timing,
+    finish_task_profile,
+    get_rss,
+    profile_stage,
+    start_stage_timing,
+    start_task_profile,
+)
+from src.generator.render_cache import get_render_cache
+from src.generator.statistics import DatasetStatistics
 from src.generator.utils import PIL2array3C
 from src.image_augmentation.basic_augmentations import (
     augment_scale,
@@ -16,142 +32,180 @@ from src.image_augmentation.misc import (
     create_full_size_and_sharpened_mask,
     adjust_masks_for_occlusion,
 )
-from src.image_augmentation.motion_blur import LinearMotionBlur3C
-from src.image_augmentation.object_position import find_valid_object_position
+from src.image_augmentation.motion_blur import apply_motion_blur
 from src.models.auxiliary import ImgSize, ImgPosition
+from src.models.img_data import ImgDataRGBA
 
 
 def create_image_anno_wrapper(
-    args,
-    scale_augment=False,
-    rotation_augment=False,
+    record,
+    output_dir,
     blending_list=["none"],
-    dontocclude=False,
+    categories=None,
+    journal_file=None,
+    render_cache_dir=None,
+    profile_memory=False,
 ):
-    """ Wrapper used to pass params to workers
+    """Wrapper used to pass plan records to workers
+
+    Returns:
+        dict: Task ID, number of images and of those taken from the render cache,
+            the memory profile of the task (None if not profiled), its
+            DatasetStatistics, the duration of its stages and the RSS of the worker
     """
-    categories = args["categories"]
-    del args["categories"]
-    anno_files = args["anno_files"]
-    del args["anno_files"]
-    # Create synthesized images, including masks and labels
-    img_files, masks, mask_category_ids = create_image_anno(
-        scale_augment=scale_augment,
-        rotation_augment=rotation_augment,
-        blending_list=blending_list,
-        dontocclude=dontocclude,
-        **args
+    start_time = time.perf_counter()
+    start_stage_timing()
+    if profile_memory:
+        start_task_profile(record["task_id"])
+    img_files, anno_files = get_output_files(
+        Path(output_dir), record["task_id"], blending_list
     )
+    img_files[0].parent.mkdir(exist_ok=True)
+    # Reuse unchanged images of previous builds
+    variant_masks = [None] * len(blending_list)
+    if render_cache_dir is not None:
+        render_cache = get_render_cache(render_cache_dir)
+        keys = [
+            render_cache.get_key(record, blending_list, i)
+            for i in range(len(blending_list))
+        ]
+        for i in range(len(blending_list)):
+            variant_masks[i] = render_cache.load(keys[i], img_files[i])
+    missing = [i for i in range(len(blending_list)) if variant_masks[i] is None]
+    # Create synthesized images, including masks and labels
+    if len(missing) > 0:
+        with profile_stage("render"):
+            images, masks, mask_category_ids = render_plan_record(
+                record, blending_list, missing
+            )
+        with profile_stage("save"):
+            for image, i in zip(images, missing):
+                image.save(img_files[i])
+                variant_masks[i] = masks, mask_category_ids
+                if render_cache_dir is not None:
+                    render_cache.save(keys[i], img_files[i], masks, mask_category_ids)
     # Generate MS COCO style annotations from these and save
-    for i in range(len(img_files)):
-        img_dict, annotation_dicts = create_image_and_annotation_dict_mscoco(
-            image_path=args["img_files"][i],
-            image_id_int=i,
-            masks=masks,
-            mask_category_ids=mask_category_ids,
-        )
-        remove_ignore_label_segmentations(annotation_dicts)
-        save_single_annotation_data_to_json(
-            img_dict, annotation_dicts, categories, args, anno_files[i]
-        )
-    return
+    statistics = DatasetStatistics()
+    statistics.add_task(record)
+    with profile_stage("annotations"):
+        for i in range(len(img_files)):
+            masks, mask_category_ids = variant_masks[i]
+            img_dict, annotation_dicts = create_image_and_annotation_dict_mscoco(
+                image_path=img_files[i],
+                image_id_int=i,
+                masks=masks,
+                mask_category_ids=mask_category_ids,
+            )
+            remove_ignore_label_segmentations(annotation_dicts)
+            statistics.add_image(img_dict, annotation_dicts, masks, record, categories)
+            save_single_annotation_data_to_json(
+                img_dict, annotation_dicts, categories, record, anno_files[i]
+            )
+    if journal_file is not None:
+        append_to_journal(journal_file, record["task_id"])
+    stages = finish_stage_timing()
+    stages["task"] = time.perf_counter() - start_time
+    return {
+        "task_id": record["task_id"],
+        "images": len(blending_list),
+        "cached": len(blending_list) - len(missing),
+        "memory": finish_task_profile(),
+        "statistics": statistics,
+        "stages": stages,
+        "pid": os.getpid(),
+        "rss": get_rss()["rss"],
+    }
 
 
-def create_image_anno(
-    objects,
-    distractor_objects,
-    img_files,
-    bg_file,
-    scale_augment=False,
-    rotation_augment=False,
-    blending_list=["none"],
-    dontocclude=False,
+def render_plan_record(
+    record, blending_list=["none"], variants=None, background=None, load_object=None
 ):
-    """Add data augmentation, synthesizes images and generates annotations according to given parameters
+    """Synthesizes the images of all blendings of a plan record (see plan.py)
+
+    Rendering has no random choices, thus the same record always gives the same images.
 
     Args:
-        objects(list): List of objects whose annotations are also important
-        distractor_objects(list): List of distractor objects that will be synthesized but whose annotations are not required
-        img_files(str): Image file name
-        anno_file(str): Annotation file name
-        bg_file(str): Background image path
-        bg_w(int): Width of synthesized image
-        bg_h(int): Height of synthesized image
-        scale_augment(bool): Add scale data augmentation
-        rotation_augment(bool): Add rotation data augmentation
-        blending_list(list): List of blending modes to synthesize for each image
-        dontocclude(bool): Generate images with occlusion
+        record(dict): Plan record with background, object layouts and motion blur
+        blending_list(list): Blending modes of the plan
+        variants(list): Indices of the blendings to render, all if None
+        background(np.ndarray): RGB background of the record, loaded if None
+        load_object(callable): Returns load_object_data() of an ImgDataRGBA, e.g. from
+            a cache, called instead of load_object_data if given
+    Returns:
+        tuple: Images (one per rendered blending), masks and category ID of each mask
     """
-
-    all_objects = objects + distractor_objects
-    already_syn = []
-    assert len(all_objects) > 0
-    while True:  # creating new attempts for synthesizing
-        masks = []
-        mask_category_ids = []
-        backgrounds = []
-
-        # Load background (can be RGB or RGBA)
-        background_rgba = Image.open(bg_file).convert("RGBA")
-        background = Image.new("RGBA", background_rgba.size, (255, 255, 255))
-        background = Image.alpha_composite(background, background_rgba).convert("RGB")
-
-        bg_w, bg_h = background.size
-        # background = background.resize((w, h), Image.ANTIALIAS)
-        for i in range(len(blending_list)):  # same background for each blend
-            backgrounds.append(background.copy())
-
-        if dontocclude:
-            already_syn = []  # reset already_sin
-        attempt = None
-        for idx, img_data in enumerate(all_objects):
-            # Load object and mask; augment it; find object position;
-            loaded_data = img_data.load_object_data()
+    if variants is None:
+        variants = list(range(len(blending_list)))
+    blending_list = [blending_list[i] for i in variants]
+    # Load background (decoded, flattened and resized only once per worker)
+    if background is None:
+        background = get_background(
+            record["background"],
+            record.get("background_crop"),
+            record["background_size"],
+        )
+    background = Image.fromarray(background, "RGB")
+    bg_w, bg_h = background.size
+    assert [bg_w, bg_h] == record["background_size"], (
+        f"Background {record['background']} has size {bg_w}x{bg_h} instead of "
+        f"{record['background_size']}, was it planned with other settings?"
+    )
+    backgrounds = []
+    for i in range(len(blending_list)):  # same background for each blend
+        backgrounds.append(background.copy())
+    masks = []
+    mask_category_ids = []
+    for layout in record["objects"]:
+        # Load object and mask, cropped to the bounding box of the plan
+        img_data = ImgDataRGBA(
+            Path(layout["path"]),
+            layout["label"],
+            layout["label_id"],
+            {**layout["metadata"], "bbox": layout["bbox"]},
+        )
+        with profile_stage("objects"):
+            if load_object is None:
+                loaded_data = img_data.load_object_data()
+            else:
+                loaded_data = load_object(img_data)
             if loaded_data is None:
                 continue
-            else:
-                foreground, mask, orig_h, orig_w = loaded_data
+            foreground, mask, _, _ = loaded_data
             # Augmentations
-            o_w, o_h = orig_w, orig_h
-            if scale_augment:
-                foreground, mask, o_h, o_w = augment_scale(
-                    foreground, bg_h, mask, orig_h, orig_w, bg_w
-                )
-            if rotation_augment:
-                max_degrees = MAX_DEGREES
-                foreground, mask, o_h, o_w = augment_rotation(
-                    foreground, bg_h, mask, max_degrees, bg_w
-                )
-            # Determine position
-            xmin, xmax, ymin, ymax = img_data.get_annotation_from_mask()
-            x, y, attempt = find_valid_object_position(
-                already_syn, dontocclude, bg_h, o_h, o_w, bg_w, xmax, xmin, ymax, ymin
-            )
-            # Apply blending
+            foreground, mask = augment_scale(foreground, mask, layout["size"])
+            foreground, mask = augment_rotation(foreground, mask, layout["rotation"])
+        # Apply blending
+        x, y = layout["position"]
+        with profile_stage("blending"):
             apply_blendings_and_paste_onto_background(
-                backgrounds, blending_list, foreground, mask, x, y
+                backgrounds,
+                blending_list,
+                foreground,
+                mask,
+                x,
+                y,
+                [layout["blending"][i] for i in variants],
             )
-            # Create mask
+        # Create mask
+        with profile_stage("masks"):
             masks.append(
                 create_full_size_and_sharpened_mask(
                     mask.copy(), ImgSize(bg_w, bg_h), ImgPosition(x, y)
                 )
             )
-            # Save category
-            mask_category_ids.append(img_data.label_id)
-            if idx >= len(objects):
-                continue
-        if attempt == MAX_ATTEMPTS_TO_SYNTHESIZE:
-            continue  # could not create image yet, thus trying again
-        else:
-            break  # found synthesized image, thus break
+        # Save category
+        mask_category_ids.append(img_data.label_id)
 
-    adjust_masks_for_occlusion(masks)  # remove overlay due to occlusion
+    with profile_stage("masks"):
+        adjust_masks_for_occlusion(masks)  # remove overlay due to occlusion
 
-    # apply final filter across whole image and save img
-    for i in range(len(blending_list)):
-        if blending_list[i] == "motion":
-            backgrounds[i] = LinearMotionBlur3C(PIL2array3C(backgrounds[i]))
-        backgrounds[i].save(img_files[i])
+    # apply final filter across whole image
+    with profile_stage("motion_blur"):
+        for i, variant in enumerate(variants):
+            motion_blur = record["motion_blur"][variant]
+            if motion_blur is not None:
+                backgrounds[i] = apply_motion_blur(
+                    PIL2array3C(backgrounds[i], copy=False), **motion_blur
+                )
 
-    return img_files, masks, mask_category_ids
+    return backgrounds, masks, mask_category_ids
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src.config import DRY_RUN_CALIBRATION_TASKS
+from src.generator.create import create_image_anno_wrapper
+from src.generator.join_annotations import (
+    save_joined_mscoco_annotation_file_from_paths_of_single_image_annotations,
+)
+from src.generator.profiling import get_rss, reset_peak_rss
+
+
+def estimate_split(
+    records: List[Dict],
+    header: Dict,
+    num_workers: int,
+    backend: str,
+    planning_s: float = 0.0,
+    calibration_tasks: int = DRY_RUN_CALIBRATION_TASKS,
+) -> Dict:
+    """Predicts the cost of rendering a planned split from a few calibration tasks
+
+    The calibration tasks are spread over the plan and rendered one after another in a
+    temporary directory, thus the estimates cover the blendings of the plan and the
+    encoder used to save the images. Rendering is assumed to scale linearly with the
+    number of workers, up to the number of cores.
+
+    Args:
+        records(list): Plan records of the split
+        header(dict): Settings of the plan
+        num_workers(int): Number of workers of the run
+        backend(str): "processes" or "threads", which share the memory of one process
+        planning_s(float): Time taken to plan the split
+        calibration_tasks(int): Number of tasks rendered
+    Returns:
+        dict: Number of tasks and images, wall time in seconds, CPU-hours, peak memory
+            and output bytes
+    """
+    estimate = {
+        "tasks": len(records),
+        "images": len(records) * len(header["blending_list"]),
+        "calibration_tasks": 0,
+        "wall_time_s": planning_s,
+        "cpu_hours": 0.0,
+        "peak_memory": 0,
+        "output_bytes": 0,
+    }
+    if len(records) == 0:
+        return estimate
+    step = max(1, len(records) // calibration_tasks)
+    calibration = records[::step][:calibration_tasks]
+    durations = []
+    rss_start = get_rss()["rss"]
+    peak_rss = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_dir = Path(tmp_dir)
+        for record in calibration:
+            reset_peak_rss()
+            start = time.perf_counter()
+            create_image_anno_wrapper(
+                record, output_dir, header["blending_list"], header["categories"]
+            )
+            durations.append(time.perf_counter() - start)
+            peak_rss = max(peak_rss, get_rss()["peak_rss"])
+        task_bytes = sum(f.stat().st_size for f in output_dir.rglob("*") if f.is_file())
+        start = time.perf_counter()
+        joined_file = output_dir / "joined.json"
+        save_joined_mscoco_annotation_file_from_paths_of_single_image_annotations(
+            list(output_dir.rglob("image_*.json")), joined_file
+        )
+        join_s = time.perf_counter() - start
+        task_bytes += joined_file.stat().st_size  # share of the split file
+    plan_bytes = sum(
+        len(json.dumps(record, separators=(",", ":"))) for record in records
+    )
+    task_s = sum(durations) / len(durations)
+    parallel = max(1, min(num_workers, os.cpu_count() or 1))
+    if backend == "threads":  # one process, each thread adds its working memory
+        peak_memory = rss_start + num_workers * max(peak_rss - rss_start, 0)
+    else:
+        peak_memory = num_workers * peak_rss
+    scale = len(records) / len(calibration)
+    estimate.update(
+        {
+            "calibration_tasks": len(calibration),
+            "task_s": task_s,
+            "wall_time_s": planning_s
+            + len(records) * task_s / parallel
+            + join_s * scale,
+            "cpu_hours": len(records) * task_s / 3600,
+            "peak_memory": peak_memory,
+            "output_bytes": int(task_bytes * scale) + plan_bytes,
+        }
+    )
+    return estimate
+
+
+def print_estimates(estimates: Dict[str, Dict], num_workers: int):
+    gb = 1024**3
+    for split_type, estimate in estimates.items():
+        print(
+            f"{split_type:<12} {estimate['images']:>8} images "
+            f"{estimate['wall_time_s'] / 3600:8.2f} h wall time "
+            f"{estimate['cpu_hours']:8.2f} CPU-h "
+            f"{estimate['peak_memory'] / gb:6.2f} GB peak "
+            f"{estimate['output_bytes'] / gb:8.2f} GB output"
+        )
+    hours = sum(e["wall_time_s"] for e in estimates.values()) / 3600
+    cpu_hours = sum(e["cpu_hours"] for e in estimates.values())
+    peak_memory = max(e["peak_memory"] for e in estimates.values())
+    output_bytes = sum(e["output_bytes"] for e in estimates.values())
+    print(
+        f"Total with {num_workers} workers: {hours:.2f} h, {cpu_hours:.2f} CPU-h, "
+        f"{peak_memory / gb:.2f} GB peak memory, {output_bytes / gb:.2f} GB output"
+    )
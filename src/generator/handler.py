@@ -2,27 +2,53 @@ import json
 import random
 import time
 from functools import partial
-from multiprocessing import Pool
+from itertools import chain
 from pathlib import Path
-from typing import Union, Dict, List
-
-import tqdm
+from typing import Dict
 
 from src.config import (
     OBJECT_CATEGORIES,
     BLENDING_LIST,
-    NUMBER_OF_WORKERS,
+    BACKGROUND_CROPS,
+    BACKGROUND_RESIZE_MODE,
+    BACKGROUND_TARGET_SIZE,
     MIN_NO_OF_OBJECTS,
     MAX_NO_OF_OBJECTS,
     MIN_NO_OF_DISTRACTOR_OBJECTS,
     MAX_NO_OF_DISTRACTOR_OBJECTS,
+    RENDER_CACHE_DIR,
+    EXECUTION_BACKEND,
+    MAX_REPLANS,
+    METRICS_FILE,
+    METRICS_PORT,
 )
+from src.generator.autotune import get_number_of_workers
 from src.generator.create import create_image_anno_wrapper
+from src.generator.estimate import estimate_split, print_estimates
+from src.generator.journal import JOURNAL_FILE_NAME, get_unfinished_tasks
 from src.generator.join_annotations import (
+    MscocoAnnotationReader,
     save_joined_mscoco_annotation_file_from_paths_of_single_image_annotations,
 )
-from src.generator.utils import init_worker
-from src.models.img_data import ImgDataRGBA, BaseImgData
+from src.generator.metrics import get_run_metrics, start_run_metrics, stop_run_metrics
+from src.generator.plan import (
+    FAILED_TASKS_FILE_NAME,
+    PLAN_FILE_NAME,
+    create_plan_header,
+    get_output_files,
+    get_task_of_record,
+    load_plan,
+    log_failed_task,
+    plan_images,
+    plan_task,
+    replace_plan_records,
+    save_plan,
+)
+from src.generator.profiling import create_memory_report, print_memory_report
+from src.generator.statistics import DatasetStatistics, get_statistics_file
+from src.generator.utils import derive_seed
+from src.generator.workers import run_tasks
+from src.models.asset_catalog import AssetCatalog, SPLIT_TYPES
 
 
 def generate_synthetic_dataset(
@@ -35,6 +61,19 @@ def generate_synthetic_dataset(
     rotation: bool,
     scale: bool,
     multithreading: bool,
+    resume: bool = False,
+    seed: int = None,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    append: bool = False,
+    render_cache_dir: str = RENDER_CACHE_DIR,
+    num_workers: int = None,
+    profile_memory: bool = False,
+    backend: str = EXECUTION_BACKEND,
+    dry_run: bool = False,
+    metrics_file: str = METRICS_FILE,
+    metrics_port: int = METRICS_PORT,
+    first_task_ids: Dict[str, int] = None,
 ):
     """
     Generate synthetic dataset
@@ -47,177 +86,473 @@ def generate_synthetic_dataset(
     :param rotation: enable rotation of objects
     :param scale: enable scaling of objects
     :param multithreading: use multithreading
+    :param resume: continue an interrupted run, only missing or corrupt images are rendered
+    :param seed: global seed, the output does not depend on the number of workers
+    :param num_shards: number of shards (e.g. machines) the dataset is split into
+    :param shard_index: index of the shard rendered here, see merge_shards.py for merging
+    :param append: add number_of_images new images to the existing dataset in output_dir
+    :param render_cache_dir: reuse unchanged images of previous builds from this directory
+    :param num_workers: number of processes used with multithreading, autotuned or
+        NUMBER_OF_WORKERS if None
+    :param profile_memory: record the memory usage of each task, see <split>_memory.json
+    :param backend: run the workers as "processes" or "threads"
+    :param dry_run: only plan the images and render a few of them in a temporary
+        directory to estimate wall time, CPU-hours, peak memory and output size
+    :param metrics_file: write live metrics of the run in the Prometheus text format to
+        this file (see metrics.py)
+    :param metrics_port: serve live metrics at http://localhost:<port>/metrics
+    :param first_task_ids: ID of the first new task of each split when appending, the
+        same for all shards (see get_next_task_ids), otherwise after the last image
+        directory of output_dir
+    :return: estimates of each split (see estimate.py) if dry_run, otherwise None
     """
+    assert 0 <= shard_index < num_shards, f"Invalid shard {shard_index}/{num_shards}"
+    assert not (append and num_shards > 1 and first_task_ids is None), (
+        "Shards only know their own images, pass the first_task_ids of the merged "
+        "dataset (see get_next_task_ids) when appending"
+    )
+    assert seed is not None or num_shards == 1, "All shards need to use the same seed"
+    if seed is None:
+        seed = random.randrange(2**32)
+    if num_workers is None:
+        num_workers = get_number_of_workers()
 
-    for split_type in ["test", "train", "validation"]:
-        print(f"{'#' * 20} Generating {split_type} data {'#' * 20}")
-        start_time = time.time()
-        (
-            background_files,
-            distractor_data,
-            objects_data,
-            labels,
-            split_output_dir,
-        ) = load_relevant_data(
-            output_dir, object_json, distractor_json, background_json, split_type,
-        )
-        full_anno_list, full_img_list, params_list = create_list_of_img_configurations(
-            objects_data,
-            distractor_data,
-            background_files,
-            OBJECT_CATEGORIES,
-            split_output_dir,
-            number_of_images[split_type],
-        )
+    object_catalog, distractor_catalog, background_catalog = load_relevant_data(
+        object_json, distractor_json, background_json
+    )
+    estimates = {}
+    if dry_run:  # a dry run publishes no metrics
+        metrics_file, metrics_port = None, None
+    metrics = start_run_metrics(metrics_file, metrics_port)
+    if metrics is not None and metrics.port is not None:
+        print(f"Serving metrics at http://localhost:{metrics.port}/metrics")
+    try:
+        for split_type in SPLIT_TYPES:
+            print(f"{'#' * 20} Generating {split_type} data {'#' * 20}")
+            if metrics is not None:
+                metrics.start_split(split_type)
+            start_time = time.time()
+            split_output_dir = (Path(output_dir) / split_type).resolve()
+            if not dry_run:
+                split_output_dir.mkdir(exist_ok=True)
+            plan_file = split_output_dir / PLAN_FILE_NAME
+            journal_file = split_output_dir / JOURNAL_FILE_NAME
+            if resume and plan_file.exists():
+                header, records = load_plan(plan_file)
+                full_anno_list = get_anno_files_of_plan(
+                    header, records, split_output_dir
+                )
+                records = get_unfinished_tasks(
+                    records, header, split_output_dir, journal_file
+                )
+                print(f"Resuming: {len(records)} of {len(full_anno_list)} images left")
+            else:
+                first_task_id = 1
+                if append and first_task_ids is not None:
+                    first_task_id = first_task_ids[split_type]
+                elif append and split_output_dir.exists():
+                    first_task_id = get_next_task_id(split_output_dir)
+                (
+                    full_anno_list,
+                    full_img_list,
+                    params_list,
+                ) = create_list_of_img_configurations(
+                    object_catalog,
+                    distractor_catalog,
+                    background_catalog,
+                    split_type,
+                    split_output_dir,
+                    number_of_images[split_type],
+                    seed,
+                    num_shards,
+                    shard_index,
+                    first_task_id,
+                )
+                header = create_plan_header(
+                    split_type,
+                    seed,
+                    OBJECT_CATEGORIES,
+                    BLENDING_LIST,
+                    scale,
+                    rotation,
+                    dontocclude,
+                )
+                failed_file = split_output_dir / FAILED_TASKS_FILE_NAME
+                records = plan_images(
+                    params_list, header, None if dry_run else failed_file
+                )
+                # tasks that could not be planned are skipped
+                full_anno_list = get_anno_files_of_plan(
+                    header, records, split_output_dir
+                )
+                if not dry_run:
+                    save_plan(plan_file, header, records, append=append)
+                    if not append:
+                        journal_file.unlink(missing_ok=True)
+            if dry_run:
+                estimates[split_type] = estimate_split(
+                    records,
+                    header,
+                    num_workers if multithreading else 1,
+                    backend,
+                    time.time() - start_time,
+                )
+                continue
 
-        render_configurations(
-            full_anno_list,
-            params_list,
-            split_output_dir,
-            dontocclude,
-            rotation,
-            scale,
-            multithreading,
-        )
-        end_time = time.time()
-        elapsed = (end_time - start_time) / 60
-        print(f"Generation of {split_type}: {elapsed:.2f} min")
+            render_configurations(
+                full_anno_list,
+                records,
+                header,
+                split_output_dir,
+                multithreading,
+                journal_file,
+                append and not resume,
+                render_cache_dir,
+                num_workers,
+                profile_memory,
+                backend,
+            )
+            if metrics is not None:
+                metrics.finish_split()
+            end_time = time.time()
+            elapsed = (end_time - start_time) / 60
+            print(f"Generation of {split_type}: {elapsed:.2f} min")
+    finally:
+        stop_run_metrics()  # also if a split raised, e.g. to free the port
+    if dry_run:
+        print_estimates(estimates, num_workers if multithreading else 1)
+        return estimates
 
 
-def load_relevant_data(
-    output_dir: str,
-    object_json: str,
-    distractor_json: str,
-    background_json: str,
-    split_type: str,
+def load_relevant_data(object_json: str, distractor_json: str, background_json: str):
+    """Indexes the split files of all asset types once (for all splits)"""
+    object_catalog = AssetCatalog.from_split_file(
+        object_json, OBJECT_CATEGORIES[0]["name"]
+    )
+    distractor_catalog = AssetCatalog.from_split_file(
+        distractor_json, OBJECT_CATEGORIES[1]["name"]
+    )
+    background_catalog = AssetCatalog.from_split_file(background_json)
+    return object_catalog, distractor_catalog, background_catalog
+
+
+def render_plan(
+    plan_file: Path,
+    task_ids=None,
+    multithreading: bool = False,
+    render_cache_dir: str = RENDER_CACHE_DIR,
+    backend: str = EXECUTION_BACKEND,
 ):
-    output_dir = (Path(output_dir) / split_type).resolve()
-    output_dir.mkdir(exist_ok=True)
-    # Objects
-    object_files = load_data_from_split_file(object_json, split_type)
-    labels = ["box"] * len(object_files)
-    objects_data = [ImgDataRGBA(object_files[i], labels[i]) for i in range(len(labels))]
-    random.shuffle(objects_data)
-    # Distractors
-    distractor_files = load_data_from_split_file(distractor_json, split_type)
-    distractor_data = [
-        ImgDataRGBA(distractor_files[i], OBJECT_CATEGORIES[1]["name"])
-        for i in range(len(distractor_files))
+    """Renders (a subset of) the images of an existing plan again
+
+    The images only depend on their plan records, thus this can be used to compare
+    renderer changes on a fixed workload or to repair single images.
+
+    Args:
+        plan_file(Path): Plan of a split (see plan.py)
+        task_ids(list): IDs of the tasks to render, all if None
+        multithreading(bool): Use multiple workers
+        render_cache_dir(str): Directory of the render cache, None disables it
+        backend(str): Run the workers as "processes" or "threads"
+    """
+    header, records = load_plan(plan_file)
+    output_dir = plan_file.parent
+    full_anno_list = get_anno_files_of_plan(header, records, output_dir)
+    if task_ids is not None:
+        task_ids = set(task_ids)
+        records = [record for record in records if record["task_id"] in task_ids]
+    render_configurations(
+        full_anno_list,
+        records,
+        header,
+        output_dir,
+        multithreading,
+        render_cache_dir=render_cache_dir,
+        backend=backend,
+    )
+
+
+def get_anno_files_of_plan(header: Dict, records, output_dir: Path):
+    return [
+        get_output_files(output_dir, record["task_id"], header["blending_list"])[1]
+        for record in records
     ]
-    random.shuffle(distractor_data)
-    # Backgrounds
-    background_files = load_data_from_split_file(background_json, split_type)
-    random.shuffle(background_files)
-    return background_files, distractor_data, objects_data, labels, output_dir
-
-
-def load_data_from_split_file(json_file: Union[str, Path], split_type: str):
-    if isinstance(json_file, str):
-        json_file = Path(json_file)
-    assert json_file.exists(), f"File {json_file.resolve()} does not exist!"
-    with json_file.open("r") as f:
-        data = json.load(f)
-    if data.get("path", None) is not None:
-        base_path = Path(data["path"])
-        base_path = base_path if base_path.exists() else json_file.parent
-        return [base_path / f for f in data[split_type]]
-    else:
-        return [json_file.parent / f for f in data[split_type]]
 
 
 def render_configurations(
     full_anno_list,
     params_list,
+    header: Dict,
     output_dir: Path,
-    dontocclude: bool,
-    rotation_augment: bool,
-    scale_augment: bool,
     multithreading: bool,
+    journal_file: Path = None,
+    append: bool = False,
+    render_cache_dir: str = RENDER_CACHE_DIR,
+    num_workers: int = None,
+    profile_memory: bool = False,
+    backend: str = EXECUTION_BACKEND,
 ):
+    assert not (
+        multithreading and profile_memory and backend == "threads"
+    ), "Memory profiling needs the process backend"
     # Run configurations
     partial_func = partial(
         create_image_anno_wrapper,
-        scale_augment=scale_augment,
-        rotation_augment=rotation_augment,
-        blending_list=BLENDING_LIST,
-        dontocclude=dontocclude,
+        output_dir=output_dir,
+        blending_list=header["blending_list"],
+        categories=header["categories"],
+        journal_file=journal_file,
+        render_cache_dir=render_cache_dir,
+        profile_memory=profile_memory,
     )
     print(f"Found {len(params_list)} params lists")
 
-    if not multithreading:
-        for p in tqdm.tqdm(params_list):
-            partial_func(p)
-    else:
-        p = Pool(NUMBER_OF_WORKERS, init_worker)
-        try:
-            p.map(partial_func, params_list)
-        except KeyboardInterrupt:
-            print("....\nCaught KeyboardInterrupt, terminating workers")
-            p.terminate()
-        else:
-            p.close()
-        p.join()
+    num_workers = num_workers or get_number_of_workers()
+    results, failures = run_tasks(
+        partial_func, params_list, multithreading, backend, num_workers
+    )
+    # Failed tasks are logged and re-planned with a new seed, then rendered again
+    skipped = set()
+    replans = 0
+    while len(failures) > 0:
+        replans += 1
+        records = replan_failed_tasks(failures, header, output_dir, replans)
+        skipped.update(
+            set(record["task_id"] for record, _ in failures)
+            - set(record["task_id"] for record in records)
+        )
+        if len(records) == 0:
+            break
+        new_results, failures = run_tasks(
+            partial_func, records, multithreading, backend, num_workers
+        )
+        results += new_results
+    if len(skipped) > 0:
+        full_anno_list = [
+            anno_files
+            for anno_files in full_anno_list
+            if int(anno_files[0].parent.name) not in skipped
+        ]
+    if render_cache_dir is not None:
+        num_images = len(params_list) * len(header["blending_list"])
+        num_cached = sum(result["cached"] for result in results)
+        print(f"Reused {num_cached} of {num_images} images from the render cache")
+    if profile_memory and len(results) > 0:
+        report = create_memory_report([result["memory"] for result in results])
+        print_memory_report(report)
+        with (output_dir.parent / f"{output_dir.name}_memory.json").open("w") as f:
+            json.dump(report, f, indent=2)
+    split_anno_file = output_dir.parent / f"{output_dir.name}.json"
+    save_statistics(
+        results, output_dir, len(full_anno_list), append and split_anno_file.exists()
+    )
+    anno_files = list(chain.from_iterable(full_anno_list))
+    if append and split_anno_file.exists():
+        # existing annotations are streamed, new IDs continue after the existing ones
+        anno_files = [split_anno_file] + anno_files
     save_joined_mscoco_annotation_file_from_paths_of_single_image_annotations(
-        sum(full_anno_list, []), output_dir.parent / f"{output_dir.name}.json",
+        anno_files, split_anno_file
     )
+    if len(skipped) > 0:  # the annotations of the rendered images are kept
+        raise RuntimeError(
+            f"{len(skipped)} tasks of {output_dir.name} failed after {MAX_REPLANS} "
+            f"re-plans and were skipped, see {output_dir / FAILED_TASKS_FILE_NAME}"
+        )
+
+
+def save_statistics(results, output_dir: Path, num_tasks: int, append: bool = False):
+    """Merges the statistics of the rendered tasks and writes <split>_stats.json
+
+    The report is only written if it covers all tasks of the split, i.e. not when only
+    the remaining tasks of a resumed run or a subset of a plan are rendered.
+
+    Args:
+        results(list): Results of create_image_anno_wrapper of each task
+        output_dir(Path): Split directory
+        num_tasks(int): Number of tasks of the split (without skipped tasks)
+        append(bool): Add to the report of the existing images of the split
+    """
+    statistics_file = get_statistics_file(output_dir)
+    statistics = DatasetStatistics()
+    if append:
+        if not statistics_file.exists():
+            print(f"No {statistics_file.name} of the existing images, not written")
+            return
+        statistics.merge(DatasetStatistics.load(statistics_file))
+        num_tasks += statistics.tasks
+    for result in results:
+        statistics.merge(result["statistics"])
+    if statistics.tasks != num_tasks:
+        print(
+            f"Statistics cover {statistics.tasks} of {num_tasks} tasks, "
+            f"{statistics_file.name} is not written"
+        )
+        return
+    statistics.save(statistics_file)
+
+
+def replan_failed_tasks(failures, header: Dict, output_dir: Path, replans: int):
+    """Logs failed tasks and plans them again with a new seed (see plan_task)
+
+    Args:
+        failures(list): Plan record and reason of each failed task
+        header(dict): Settings of the plan
+        output_dir(Path): Split directory with the plan and the log of failed tasks
+        replans(int): Number of the re-planning round
+    Returns:
+        list: New plan records, tasks that failed MAX_REPLANS times are left out
+    """
+    failed_file = output_dir / FAILED_TASKS_FILE_NAME
+    records = []
+    for record, reason in failures:
+        print(f"Task {record['task_id']} failed: {reason}")
+        log_failed_task(failed_file, record, reason, replans - 1)
+        if replans > MAX_REPLANS:
+            continue
+        record = plan_task(
+            get_task_of_record(record), header, None, failed_file, replans
+        )
+        if record is not None:
+            records.append(record)
+    if len(records) > 0:
+        replace_plan_records(output_dir / PLAN_FILE_NAME, records)
+        if get_run_metrics() is not None:
+            get_run_metrics().tasks_retried(len(records))
+    return records
+
+
+def get_next_task_id(output_dir: Path) -> int:
+    """Returns the ID after the last image directory of an existing split"""
+    task_ids = [int(d.name) for d in output_dir.iterdir() if d.name.isdigit()]
+    return max(task_ids, default=0) + 1
+
+
+def get_next_task_ids(dataset_dir: Path) -> Dict[str, int]:
+    """Returns the ID after the last task of each split annotation file in dataset_dir
+
+    Merged annotation files (see merge_shards) contain the images of all shards, thus
+    all shards of an append start at the same task ID.
+    """
+    first_task_ids = {}
+    for split_type in SPLIT_TYPES:
+        split_anno_file = Path(dataset_dir) / f"{split_type}.json"
+        task_ids = []
+        if split_anno_file.exists():
+            reader = MscocoAnnotationReader(split_anno_file)
+            task_ids = [
+                int(Path(image["file_name"]).parent.name)
+                for image in reader.iter_images()
+            ]
+        first_task_ids[split_type] = max(task_ids, default=0) + 1
+    return first_task_ids
 
 
 def create_list_of_img_configurations(
-    objects_data: List[BaseImgData],
-    distractors_data: List[BaseImgData],
-    background_files: List[str],
-    categories,
+    object_catalog: AssetCatalog,
+    distractor_catalog: AssetCatalog,
+    background_catalog: AssetCatalog,
+    split_type: str,
     output_dir: Path,
     num_images: int,
+    seed: int = None,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    first_task_id: int = 1,
 ):
-    idx = 0
+    """Samples the objects, distractors and background of each image
+
+    The layout of the images is sampled afterwards from these tasks (see plan.py).
+
+    All images of the split are sampled, thus each shard gets the same (global) task IDs
+    and seeds, but only the tasks of the given shard are returned. Task IDs (and image
+    directories) start at first_task_id, e.g. when appending to an existing dataset.
+    """
     params_list = []
     full_img_list = []
     full_anno_list = []
-    for _ in range(num_images):
+    if num_images == 0:
+        return full_anno_list, full_img_list, params_list
+    tasks = sample_tasks(
+        object_catalog,
+        distractor_catalog,
+        background_catalog,
+        split_type,
+        seed,
+        num_shards,
+        shard_index,
+        first_task_id,
+    )
+    for params in tasks:
+        if params["task_id"] >= first_task_id + num_images:
+            break
+        img_files, anno_files = get_output_files(
+            output_dir, params["task_id"], BLENDING_LIST
+        )
+        params_list.append(params)
+        full_img_list.append(img_files)
+        full_anno_list.append(anno_files)
+    return full_anno_list, full_img_list, params_list
+
+
+def sample_tasks(
+    object_catalog: AssetCatalog,
+    distractor_catalog: AssetCatalog,
+    background_catalog: AssetCatalog,
+    split_type: str,
+    seed: int = None,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    first_task_id: int = 1,
+):
+    """Endlessly yields tasks with sampled objects, distractors and background
+
+    Each background is used for BACKGROUND_CROPS consecutive tasks, which are rendered
+    by the same worker with the locality scheduling (see workers.schedule_tasks).
+    """
+    assert BACKGROUND_CROPS == 1 or (
+        BACKGROUND_RESIZE_MODE == "random_crop" and BACKGROUND_TARGET_SIZE is not None
+    ), (
+        "BACKGROUND_CROPS > 1 needs BACKGROUND_RESIZE_MODE = 'random_crop' and a "
+        "BACKGROUND_TARGET_SIZE, else the tasks of a background show the same frame"
+    )
+    if first_task_id == 1:
+        rng = random.Random(derive_seed(seed, split_type))
+    else:  # do not repeat the samples of the existing images
+        rng = random.Random(derive_seed(seed, split_type, first_task_id))
+    object_indices = object_catalog.get_split_indices(split_type)
+    distractor_indices = distractor_catalog.get_split_indices(split_type)
+    background_indices = background_catalog.get_split_indices(split_type)
+    idx = first_task_id - 1
+    while True:
         objects = []
         distractor_objects = []
 
         # Get list of objects
-        n = min(random.randint(MIN_NO_OF_OBJECTS, MAX_NO_OF_OBJECTS), len(objects_data))
+        n = min(rng.randint(MIN_NO_OF_OBJECTS, MAX_NO_OF_OBJECTS), len(object_indices))
         for i in range(n):
-            objects.append(random.choice(objects_data))
+            objects.append(rng.choice(object_indices))
         # Get list of distractor objects
-        if len(distractors_data) > 0:
+        if len(distractor_indices) > 0:
             n = min(
-                random.randint(
-                    MIN_NO_OF_DISTRACTOR_OBJECTS, MAX_NO_OF_DISTRACTOR_OBJECTS
-                ),
-                len(distractors_data),
+                rng.randint(MIN_NO_OF_DISTRACTOR_OBJECTS, MAX_NO_OF_DISTRACTOR_OBJECTS),
+                len(distractor_indices),
             )
             for i in range(n):
-                distractor_objects.append(random.choice(distractors_data))
+                distractor_objects.append(rng.choice(distractor_indices))
 
         idx += 1
-        bg_file = random.choice(background_files)
-        img_files = []
-        anno_files = []
-        img_dir = output_dir / str(idx).zfill(5)
-        img_dir.mkdir(exist_ok=True)
-        for blending_type in BLENDING_LIST:
-            i = 0
-            img_file = img_dir / f"image_{blending_type}{str(i).zfill(2)}.jpg"
-            anno_file = img_file.with_suffix(".json")
-            while img_file in img_files:
-                i += 1
-                img_file = img_dir / f"image_{blending_type}{str(i).zfill(2)}.jpg"
-                anno_file = img_file.with_suffix(".json")
-            img_files.append(img_file)
-            anno_files.append(anno_file)
-        params = {
-            "objects": objects,
-            "distractor_objects": distractor_objects,
-            "img_files": img_files,
-            "anno_files": anno_files,
-            "bg_file": bg_file,
-            "categories": categories,
+        if (idx - first_task_id) % BACKGROUND_CROPS == 0:
+            # consecutive tasks share a background, e.g. each with its own crop
+            bg_idx = rng.choice(background_indices)
+        if (idx - 1) % num_shards != shard_index:
+            continue  # rendered by another shard
+        # Only sampled assets of this shard are materialised
+        yield {
+            "task_id": idx,
+            "seed": derive_seed(seed, split_type, idx),
+            "objects": [object_catalog.materialise(i) for i in objects],
+            "distractor_objects": [
+                distractor_catalog.materialise(i) for i in distractor_objects
+            ],
+            "bg_file": background_catalog.get_path(bg_idx),
         }
-        params_list.append(params)
-        full_img_list.append(img_files)
-        full_anno_list.append(anno_files)
-    return full_anno_list, full_img_list, params_list
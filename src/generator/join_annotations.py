@@ -1,7 +1,12 @@
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 import os
 import json
+import shutil
+import tempfile
+
+from src.models.asset_catalog import SPLIT_TYPES
 
 
 def join_mscoco_annotations(dataset_dir: Path):
@@ -16,16 +21,147 @@ def join_mscoco_annotations(dataset_dir: Path):
         )
 
 
+def merge_shards(shard_dirs: List[Path], output_dir: Path):
+    """Merges the split annotation files of shards (without reading any images)
+
+    Image file names are prefixed with the shard directory relative to output_dir.
+    """
+    for dataset_type in SPLIT_TYPES:
+        json_paths = [d / f"{dataset_type}.json" for d in shard_dirs]
+        json_paths = [p for p in json_paths if p.exists()]
+        prefixes = [
+            Path(os.path.relpath(p.parent, output_dir)).as_posix() for p in json_paths
+        ]
+        print(f"Merging {len(json_paths)} shards of {dataset_type}")
+        merge_mscoco_annotation_files(
+            json_paths, output_dir / f"{dataset_type}.json", prefixes
+        )
+
+
 def save_joined_mscoco_annotation_file_from_paths_of_single_image_annotations(
     json_paths: List[Path], output_path: Path
 ):
-    file_dicts = load_mscoco_file_dicts(json_paths)
-    final_dict = join_mscoco_annotation_dicts(file_dicts)
+    merge_mscoco_annotation_files(json_paths, output_path)
+
 
-    if os.path.exists(output_path):
-        os.remove(output_path)
-    with open(output_path, "w") as f:
-        json.dump(final_dict, f)
+def merge_mscoco_annotation_files(
+    json_paths: List[Path],
+    output_path: Path,
+    file_name_prefixes: Optional[List[str]] = None,
+):
+    """Merges MS COCO annotation files, while reassigning image and annotation IDs
+
+    Only one input file is read at a time and images and annotations are streamed to
+    temporary files, thus also many large files (e.g. of shards) can be merged. Files
+    written by this function are streamed line by line (see MscocoAnnotationReader),
+    thus the output can be used as input again (e.g. to append images) without loading
+    it into memory.
+
+    Args:
+        json_paths(list): Paths of the annotation files
+        output_path(Path): Path of the merged annotation file
+        file_name_prefixes(list): Optional prefix for the image file names of each input
+    """
+    category_ids = {}
+    image_id = 0
+    annotation_id = 0
+    with tempfile.TemporaryFile("w+") as images_file, tempfile.TemporaryFile(
+        "w+"
+    ) as annotations_file:
+        for i, path in enumerate(json_paths):
+            reader = MscocoAnnotationReader(path)
+            add_mscoco_categories(category_ids, reader.categories)
+            image_id_map = {}
+            for image in reader.iter_images():
+                image_id_map[image["id"]] = image_id
+                image["id"] = image_id
+                if file_name_prefixes is not None:
+                    image["file_name"] = f"{file_name_prefixes[i]}/{image['file_name']}"
+                write_json_list_item(images_file, image, first=image_id == 0)
+                image_id += 1
+            for anno in reader.iter_annotations():
+                anno["id"] = annotation_id
+                anno["image_id"] = image_id_map[anno["image_id"]]
+                write_json_list_item(annotations_file, anno, first=annotation_id == 0)
+                annotation_id += 1
+        categories = [{"id": i, "name": n} for n, i in category_ids.items()]
+        write_mscoco_annotation_file(
+            output_path, categories, annotations_file, images_file
+        )
+
+
+class MscocoAnnotationReader:
+    """Reads an MS COCO annotation file section by section
+
+    Files written by merge_mscoco_annotation_files (one list item per line) are streamed,
+    all other files (e.g. annotations of single images) are loaded completely.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file_dict = None
+        with open(path, "r") as f:
+            first_line = f.readline().strip()
+            second_line = f.readline().strip()
+        if (
+            first_line.startswith('{"categories": ')
+            and first_line.endswith(",")
+            and second_line == '"annotations": ['
+        ):
+            self.categories = json.loads(first_line[len('{"categories": ') : -1])
+        else:
+            with open(path, "r") as f:
+                self._file_dict = json.load(f)
+            self.categories = self._file_dict["categories"]
+
+    def iter_images(self) -> Iterator[Dict]:
+        return self._iter_section("images")
+
+    def iter_annotations(self) -> Iterator[Dict]:
+        return self._iter_section("annotations")
+
+    def _iter_section(self, section: str) -> Iterator[Dict]:
+        if self._file_dict is not None:
+            yield from self._file_dict[section]
+            return
+        header = f'"{section}": ['
+        in_section = False
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not in_section:
+                    in_section = line == header
+                elif line.startswith("]"):
+                    return
+                elif len(line) > 0:
+                    yield json.loads(line.rstrip(","))
+
+
+def write_json_list_item(f, item: Dict, first: bool):
+    # one item per line, such that large files can also be read line by line
+    f.write(("" if first else ",\n") + json.dumps(item))
+
+
+def write_mscoco_annotation_file(
+    output_path: Path, categories: List[Dict], annotations_file, images_file
+):
+    """Writes an annotation file from temporary files with the list items"""
+    tmp_path = Path(f"{output_path}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write('{"categories": ' + json.dumps(categories) + ',\n"annotations": [\n')
+        annotations_file.seek(0)
+        shutil.copyfileobj(annotations_file, f)
+        f.write('\n],\n"images": [\n')
+        images_file.seek(0)
+        shutil.copyfileobj(images_file, f)
+        f.write("\n]}\n")
+    os.replace(tmp_path, output_path)
+
+
+def add_mscoco_categories(category_ids: Dict[str, int], categories: List[Dict]):
+    for cat in categories:
+        # each name must only be assigned the same id
+        assert category_ids.setdefault(cat["name"], cat["id"]) == cat["id"]
 
 
 def load_mscoco_file_dicts(paths: List[Path]) -> List[Dict]:
@@ -57,36 +193,20 @@ def join_mscoco_annotation_img_annotations(anno_dicts: List[Dict]) -> List:
             anno["id"] = mask_id
             anno["image_id"] = img_id
             mask_id += 1
-    annotations_final = sum([anno["annotations"] for anno in anno_dicts], [])
+    annotations_final = list(chain.from_iterable(annotations))
     return annotations_final
 
 
 def join_mscoco_annotation_imgs(anno_dicts: List[Dict]) -> List:
-    images = [anno["images"] for anno in anno_dicts]
-    images_final = sum([[img for img in img_list] for img_list in images], [])
+    images_final = list(chain.from_iterable(anno["images"] for anno in anno_dicts))
     return images_final
 
 
 def join_mscoco_annotation_categories(anno_dicts: List[Dict]) -> List:
-    final_categories = []
-    categories = [anno["categories"] for anno in anno_dicts]
-    category_names = sum(
-        [[cat["name"] for cat in cat_list] for cat_list in categories], []
-    )
-    for name in set(category_names):  # check unique category names
-        matching_ids = sum(
-            [
-                [cat["id"] for cat in cat_list if cat["name"] == name]
-                for cat_list in categories
-            ],
-            [],
-        )
-        unique_matching_ids = set(matching_ids)
-        assert (
-            len(unique_matching_ids) == 1
-        )  # each name must only be assigned the same id
-        curr_category = {"id": unique_matching_ids.pop(), "name": name}
-        final_categories.append(curr_category)
+    category_ids = {}
+    for anno in anno_dicts:
+        add_mscoco_categories(category_ids, anno["categories"])
+    final_categories = [{"id": i, "name": n} for n, i in category_ids.items()]
     return final_categories
 
 
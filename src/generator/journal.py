@@ -0,0 +1,62 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Set
+
+from src.generator.plan import get_output_files
+
+JOURNAL_FILE_NAME = "journal.txt"  # IDs of completed tasks, appended by the workers
+
+
+def append_to_journal(journal_file: Path, task_id: int):
+    # a single short write in append mode is atomic, thus workers can share the file
+    with open(journal_file, "a") as f:
+        f.write(f"{task_id}\n")
+
+
+def load_journal(journal_file: Path) -> Set[int]:
+    if not journal_file.exists():
+        return set()
+    with journal_file.open("r") as f:
+        lines = f.read().split("\n")
+    # the last line might be incomplete if the run was killed while writing
+    return set(int(line) for line in lines[:-1] if line.strip())
+
+
+def get_unfinished_tasks(
+    records: List[Dict], header: Dict, output_dir: Path, journal_file: Path
+) -> List[Dict]:
+    """Returns all plan records that are not in the journal or whose outputs are corrupt"""
+    finished = load_journal(journal_file)
+    unfinished = []
+    for record in records:
+        img_files, anno_files = get_output_files(
+            output_dir, record["task_id"], header["blending_list"]
+        )
+        if record["task_id"] in finished and all(
+            is_image_complete(img_file) and is_json_complete(anno_file)
+            for img_file, anno_file in zip(img_files, anno_files)
+        ):
+            continue
+        unfinished.append(record)
+    return unfinished
+
+
+def is_image_complete(img_file: Path) -> bool:
+    """Checks if a JPEG exists and is not truncated (ends with the EOI marker)"""
+    if not img_file.exists() or img_file.stat().st_size < 4:
+        return False
+    with img_file.open("rb") as f:
+        f.seek(-2, os.SEEK_END)
+        return f.read(2) == b"\xff\xd9"
+
+
+def is_json_complete(json_file: Path) -> bool:
+    if not json_file.exists():
+        return False
+    try:
+        with json_file.open("r") as f:
+            json.load(f)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from src.config import METRICS_INTERVAL
+
+METRICS_PREFIX = "synthetic"
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+
+_current_metrics = None
+
+
+class RunMetrics:
+    """Live metrics of a generation run in the Prometheus text format
+
+    Metrics are updated by the parent process from the events of the workers (see
+    workers.run_tasks) and either written to a text file every METRICS_INTERVAL
+    seconds, e.g. for the textfile collector of the node exporter, or served at
+    http://localhost:<port>/metrics.
+
+    Args:
+        metrics_file(Path): Text file of the metrics, not written if None
+        port(int): Local HTTP port of the metrics, no server if None (0 picks a port)
+        interval(float): Seconds between two updates of the metrics file
+    """
+
+    def __init__(
+        self,
+        metrics_file: Optional[Union[str, Path]] = None,
+        port: Optional[int] = None,
+        interval: float = METRICS_INTERVAL,
+    ):
+        self.metrics_file = Path(metrics_file) if metrics_file is not None else None
+        self.interval = interval
+        self.start_time = time.time()
+        self.splits = {}
+        self.split = None
+        self.placement_failures = defaultdict(int)
+        self.stage_seconds = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.stage_sums = defaultdict(float)
+        self.worker_rss = {}
+        self._lock = threading.Lock()
+        self._last_publish = 0.0
+        self._server = None
+        self.port = None
+        if port is not None:
+            self._server = create_metrics_server(self, port)
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def start_split(self, split_type: str):
+        with self._lock:
+            self.split = split_type
+            self.splits[split_type] = {
+                "start_time": time.time(),
+                "end_time": None,
+                "tasks": 0,
+                "running": 0,
+                "done": 0,
+                "failed": 0,
+                "retried": 0,
+                "images": 0,
+            }
+        self.publish(force=True)
+
+    def finish_split(self):
+        with self._lock:
+            self.splits[self.split]["end_time"] = time.time()
+            self.splits[self.split]["running"] = 0
+        self.publish(force=True)
+
+    def tasks_queued(self, num_tasks: int):
+        with self._lock:
+            self.splits[self.split]["tasks"] += num_tasks
+
+    def set_running(self, num_tasks: int):
+        with self._lock:
+            self.splits[self.split]["running"] = num_tasks
+
+    def task_finished(self, result: Dict):
+        """Counts a rendered task, result of create_image_anno_wrapper"""
+        with self._lock:
+            split = self.splits[self.split]
+            split["done"] += 1
+            split["images"] += result.get("images", 0)
+            for stage, seconds in result.get("stages", {}).items():
+                self.stage_seconds[stage][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+                self.stage_sums[stage] += seconds
+            if "rss" in result:
+                self.worker_rss[result["pid"]] = result["rss"]
+
+    def task_failed(self):
+        with self._lock:
+            self.splits[self.split]["failed"] += 1
+
+    def tasks_retried(self, num_tasks: int):
+        """Counts failed tasks that were re-planned, they are queued again"""
+        with self._lock:
+            self.splits[self.split]["retried"] += num_tasks
+
+    def placement_failed(self):
+        """Counts a layout that was given up, e.g. since objects did not fit"""
+        with self._lock:
+            self.placement_failures[self.split] += 1
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            now = time.time()
+            lines = []
+            images = {s: v["images"] for s, v in self.splits.items()}
+            rates = {}
+            for split_type, split in self.splits.items():
+                elapsed = (split["end_time"] or now) - split["start_time"]
+                rates[split_type] = split["images"] / elapsed if elapsed > 0 else 0.0
+            elapsed = now - self.start_time
+            add_metric(lines, "images_total", "counter", "Images rendered", images)
+            add_metric(
+                lines,
+                "images_per_second",
+                "gauge",
+                "Images per second of each split",
+                rates,
+            )
+            add_metric(
+                lines,
+                "run_images_per_second",
+                "gauge",
+                "Images per second of the whole run",
+                {None: sum(images.values()) / elapsed if elapsed > 0 else 0.0},
+            )
+            tasks = {}
+            for split_type, split in self.splits.items():
+                finished = split["done"] + split["failed"] + split["running"]
+                tasks[(split_type, "queued")] = max(0, split["tasks"] - finished)
+                for state in ["running", "done", "failed"]:
+                    tasks[(split_type, state)] = split[state]
+            add_metric(
+                lines,
+                "tasks",
+                "gauge",
+                "Tasks of each split by state",
+                tasks,
+                ["split", "state"],
+            )
+            add_metric(
+                lines,
+                "task_retries_total",
+                "counter",
+                "Failed tasks re-planned with a new seed",
+                {s: v["retried"] for s, v in self.splits.items()},
+            )
+            add_metric(
+                lines,
+                "placement_failures_total",
+                "counter",
+                "Layouts given up while planning",
+                dict(self.placement_failures),
+            )
+            name = f"{METRICS_PREFIX}_stage_seconds"
+            lines.append(f"# HELP {name} Duration of the stages of each task")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, counts in sorted(self.stage_seconds.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ["+Inf"], counts):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'{name}_sum{{stage="{stage}"}} {self.stage_sums[stage]}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+            add_metric(
+                lines,
+                "worker_rss_bytes",
+                "gauge",
+                "Resident set size of each worker after its last task",
+                self.worker_rss,
+                ["pid"],
+            )
+            return "\n".join(lines) + "\n"
+
+    def publish(self, force: bool = False):
+        """Writes the metrics file, at most every interval seconds unless forced"""
+        if self.metrics_file is None:
+            return
+        now = time.time()
+        if not force and now - self._last_publish < self.interval:
+            return
+        self._last_publish = now
+        self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.metrics_file.with_name(f"{self.metrics_file.name}.tmp")
+        tmp_file.write_text(self.render())
+        os.replace(tmp_file, self.metrics_file)  # atomic for the collector
+
+    def close(self):
+        self.publish(force=True)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def add_metric(
+    lines: List[str],
+    name: str,
+    metric_type: str,
+    description: str,
+    values: Dict,
+    labels: List[str] = ["split"],
+):
+    """Appends a metric, values are keyed by the label values (a tuple if several)"""
+    name = f"{METRICS_PREFIX}_{name}"
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for key, value in values.items():
+        if key is None:
+            lines.append(f"{name} {value}")
+            continue
+        key = key if isinstance(key, tuple) else (key,)
+        label_str = ",".join(f'{label}="{k}"' for label, k in zip(labels, key))
+        lines.append(f"{name}{{{label_str}}} {value}")
+
+
+def create_metrics_server(metrics: RunMetrics, port: int) -> ThreadingHTTPServer:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ["/", "/metrics"]:
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # requests of the scraper would clutter the progress bar
+
+    return ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+
+
+def start_run_metrics(
+    metrics_file: Optional[Union[str, Path]] = None, port: Optional[int] = None
+) -> Optional[RunMetrics]:
+    """Starts the metrics of a run, None if neither a file nor a port is given
+
+    Metrics of a previous run (e.g. one that raised) are stopped.
+    """
+    global _current_metrics
+    stop_run_metrics()
+    if metrics_file is None and port is None:
+        return None
+    _current_metrics = RunMetrics(metrics_file, port)
+    return _current_metrics
+
+
+def stop_run_metrics():
+    global _current_metrics
+    if _current_metrics is not None:
+        _current_metrics.close()
+    _current_metrics = None
+
+
+def get_run_metrics() -> Optional[RunMetrics]:
+    """Returns the metrics of the current run (in the parent process) or None"""
+    return _current_metrics
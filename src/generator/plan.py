@@ -0,0 +1,291 @@
+import json
+import os
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.config import (
+    BACKGROUND_RESIZE_MODE,
+    BACKGROUND_TARGET_SIZE,
+    MAX_DEGREES,
+    MAX_ATTEMPTS_TO_SYNTHESIZE,
+    MAX_LAYOUT_ATTEMPTS,
+    MAX_REPLANS,
+)
+from src.generator.backgrounds import get_background_size, sample_background_crop
+from src.generator.metrics import get_run_metrics
+from src.generator.utils import derive_seed
+from src.image_augmentation.basic_augmentations import (
+    SamplingError,
+    sample_scaled_size,
+    sample_rotation,
+)
+from src.image_augmentation.blendings import sample_blending_parameters
+from src.image_augmentation.motion_blur import sample_motion_blur_parameters
+from src.image_augmentation.object_position import find_valid_object_position
+from src.models.img_data import ImgDataRGBA
+
+PLAN_VERSION = 1
+PLAN_FILE_NAME = "plan.jsonl"  # header line followed by one record per image
+FAILED_TASKS_FILE_NAME = (
+    "failed_tasks.jsonl"  # failed tasks, their parameters and reason
+)
+
+
+def create_plan_header(
+    split_type: str,
+    seed: int,
+    categories: List[Dict],
+    blending_list: List[str],
+    scale_augment: bool,
+    rotation_augment: bool,
+    dontocclude: bool,
+) -> Dict:
+    """Settings shared by all records of a plan, rendering only depends on these"""
+    return {
+        "version": PLAN_VERSION,
+        "split": split_type,
+        "seed": seed,
+        "categories": categories,
+        "blending_list": list(blending_list),
+        "scale_augment": scale_augment,
+        "rotation_augment": rotation_augment,
+        "dontocclude": dontocclude,
+    }
+
+
+def plan_images(
+    params_list: List[Dict], header: Dict, failed_file: Path = None
+) -> List[Dict]:
+    """Samples the layouts of all sampled tasks (see plan_task)
+
+    Returns:
+        list: Plan records, without the tasks that were skipped
+    """
+    sizes = {}  # assets and backgrounds are shared by many images
+    records = []
+    for params in params_list:
+        record = plan_task(params, header, sizes, failed_file)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def plan_task(
+    params: Dict,
+    header: Dict,
+    sizes: Dict = None,
+    failed_file: Path = None,
+    replans: int = 0,
+) -> Optional[Dict]:
+    """Plans a task, which is re-planned with a new seed as long as it fails
+
+    Args:
+        params(dict): Task with ID, seed, objects, distractor objects and background
+        header(dict): Settings of the plan (see create_plan_header)
+        sizes(dict): Cache of background sizes and object bounding boxes
+        failed_file(Path): Log of the failures, not written if None
+        replans(int): Number of times the task failed already, e.g. while rendering
+    Returns:
+        dict: Plan record, None if the task failed MAX_REPLANS times and is skipped
+    """
+    for replan in range(replans, MAX_REPLANS + 1):
+        if replan > 0:
+            params = {**params, "seed": derive_seed(params["seed"], "replan", replan)}
+        try:
+            return plan_image(params, header, sizes)
+        except SamplingError as e:
+            print(f"Planning of task {params['task_id']} failed: {e}")
+            if failed_file is not None:
+                log_failed_task(failed_file, get_task_dict(params), str(e), replan)
+    return None
+
+
+def plan_image(params: Dict, header: Dict, sizes: Dict = None) -> Dict:
+    """Samples every random parameter of an image, i.e. the plan record of its task
+
+    Only the sizes of the assets are needed, thus no image is decoded if the assets are
+    indexed. The record contains scaled size, rotation, position and blending parameters
+    of each object as well as the motion blur of the whole image. All random choices
+    depend on the seed of the task only.
+
+    Args:
+        params(dict): Task with ID, seed, objects, distractor objects and background
+        header(dict): Settings of the plan (see create_plan_header)
+        sizes(dict): Cache of background sizes and object bounding boxes
+    Returns:
+        dict: Plan record, which can be rendered by create.render_plan_record
+    Raises:
+        SamplingError: If no layout is found within MAX_LAYOUT_ATTEMPTS
+    """
+    sizes = sizes if sizes is not None else {}
+    rng = random.Random(params["seed"])
+    bg_key = Path(params["bg_file"]).as_posix()
+    if bg_key not in sizes:
+        sizes[bg_key] = get_background_size(bg_key)
+    bg_w, bg_h = sizes[bg_key]
+    all_objects = params["objects"] + params["distractor_objects"]
+    assert len(all_objects) > 0
+    for _ in range(MAX_LAYOUT_ATTEMPTS):  # creating new attempts for synthesizing
+        layouts = []
+        already_syn = []
+        attempt = None
+        for idx, img_data in enumerate(all_objects):
+            key = img_data.img_path.as_posix()
+            if key not in sizes:
+                sizes[key] = img_data.get_annotation_from_mask()
+            xmin, xmax, ymin, ymax = sizes[key]
+            if xmax <= xmin or ymax <= ymin:
+                continue  # no RGBA image or empty mask
+            # Augmentations
+            o_w, o_h = xmax - xmin, ymax - ymin
+            if header["scale_augment"]:
+                o_w, o_h = sample_scaled_size(o_w, o_h, bg_w, bg_h, rng)
+            size = [o_w, o_h]
+            rotation = 0
+            if header["rotation_augment"]:
+                rotation, o_w, o_h = sample_rotation(
+                    o_w, o_h, MAX_DEGREES, bg_w, bg_h, rng
+                )
+            # Determine position
+            x, y, attempt = find_valid_object_position(
+                already_syn,
+                header["dontocclude"],
+                bg_h,
+                o_h,
+                o_w,
+                bg_w,
+                xmax,
+                xmin,
+                ymax,
+                ymin,
+                rng,
+            )
+            layout = img_data.to_dict()
+            layout.update(
+                {
+                    "distractor": idx >= len(params["objects"]),
+                    "bbox": [xmin, xmax, ymin, ymax],
+                    "size": size,
+                    "rotation": rotation,
+                    "position": [x, y],
+                    "blending": [
+                        sample_blending_parameters(b, rng)
+                        for b in header["blending_list"]
+                    ],
+                }
+            )
+            layouts.append(layout)
+        if attempt != MAX_ATTEMPTS_TO_SYNTHESIZE:
+            break  # found synthesized image, otherwise trying again
+        if get_run_metrics() is not None:
+            get_run_metrics().placement_failed()
+    else:
+        raise SamplingError(f"No layout without occlusions found for {bg_key}")
+    motion_blur = [
+        sample_motion_blur_parameters(rng) if b == "motion" else None
+        for b in header["blending_list"]
+    ]
+    record = {
+        "task_id": params["task_id"],
+        "seed": params["seed"],
+        "background": bg_key,
+        "background_size": [bg_w, bg_h],
+        "objects": layouts,
+        "motion_blur": motion_blur,
+    }
+    if BACKGROUND_RESIZE_MODE == "random_crop" and BACKGROUND_TARGET_SIZE is not None:
+        source_key = f"{bg_key}|source"
+        if source_key not in sizes:
+            sizes[source_key] = get_background_size(bg_key, None)
+        record["background_crop"] = sample_background_crop(
+            *sizes[source_key], bg_w, bg_h, rng
+        )
+    return record
+
+
+def get_task_dict(params: Dict) -> Dict:
+    """Returns a task (see handler.sample_tasks) as JSON serializable dict"""
+    return {
+        "task_id": params["task_id"],
+        "seed": params["seed"],
+        "objects": [img_data.to_dict() for img_data in params["objects"]],
+        "distractor_objects": [
+            img_data.to_dict() for img_data in params["distractor_objects"]
+        ],
+        "bg_file": Path(params["bg_file"]).as_posix(),
+    }
+
+
+def get_task_of_record(record: Dict) -> Dict:
+    """Returns the task (assets and seed) a plan record was planned from"""
+    return {
+        "task_id": record["task_id"],
+        "seed": record["seed"],
+        "objects": [
+            ImgDataRGBA.from_dict(layout)
+            for layout in record["objects"]
+            if not layout["distractor"]
+        ],
+        "distractor_objects": [
+            ImgDataRGBA.from_dict(layout)
+            for layout in record["objects"]
+            if layout["distractor"]
+        ],
+        "bg_file": record["background"],
+    }
+
+
+def log_failed_task(failed_file: Path, task: Dict, reason: str, replans: int):
+    """Appends a failed task (plan record or task dict) and the reason to the log"""
+    with open(failed_file, "a") as f:
+        f.write(json.dumps({"reason": reason, "replans": replans, "task": task}) + "\n")
+
+
+def get_output_files(
+    output_dir: Path, task_id: int, blending_list: List[str]
+) -> Tuple[List[Path], List[Path]]:
+    """Returns image and annotation file of each blending of a task"""
+    img_dir = output_dir / str(task_id).zfill(5)
+    img_files = []
+    for blending_type in blending_list:
+        i = 0
+        img_file = img_dir / f"image_{blending_type}{str(i).zfill(2)}.jpg"
+        while img_file in img_files:
+            i += 1
+            img_file = img_dir / f"image_{blending_type}{str(i).zfill(2)}.jpg"
+        img_files.append(img_file)
+    return img_files, [f.with_suffix(".json") for f in img_files]
+
+
+def save_plan(plan_file: Path, header: Dict, records: List[Dict], append: bool = False):
+    """Writes the plan as JSON lines, appended records share the existing header"""
+    if append and plan_file.exists():
+        with plan_file.open("a") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        return
+    tmp_file = plan_file.with_suffix(".tmp")
+    with tmp_file.open("w") as f:
+        f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    os.replace(tmp_file, plan_file)
+
+
+def replace_plan_records(plan_file: Path, records: List[Dict]):
+    """Replaces the records of the same tasks in a plan, e.g. after re-planning"""
+    header, plan_records = load_plan(plan_file)
+    replaced = {record["task_id"]: record for record in records}
+    plan_records = [replaced.get(r["task_id"], r) for r in plan_records]
+    save_plan(plan_file, header, plan_records)
+
+
+def load_plan(plan_file: Path) -> Tuple[Dict, List[Dict]]:
+    with plan_file.open("r") as f:
+        header = json.loads(f.readline())
+        assert (
+            header.get("version") == PLAN_VERSION
+        ), f"Plan version {header.get('version')} of {plan_file} is not supported"
+        records = [json.loads(line) for line in f if line.strip()]
+    return header, records
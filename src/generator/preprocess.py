@@ -0,0 +1,108 @@
+import hashlib
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import tqdm
+from PIL import Image, ImageFilter
+
+from src.config import MINFILTER_SIZE, NUMBER_OF_WORKERS
+from src.generator.utils import init_worker
+from src.models.asset_catalog import AssetCatalog
+from src.models.asset_index import (
+    get_asset_mask_dir,
+    load_asset_index,
+    save_asset_index,
+)
+from src.models.img_data import get_bbox_of_mask
+
+
+def preprocess_assets(
+    split_files: List[Union[str, Path]],
+    crop: bool = True,
+    num_workers: int = NUMBER_OF_WORKERS,
+) -> Dict[str, int]:
+    """Tight-crops RGBA assets and writes an index of their metadata next to each split file
+
+    The index contains content hash, size and bounding box of each asset and the path of
+    its MinFilter mask, thus the renderer does not need to compute them again. Assets whose
+    content hash did not change since the last run are skipped.
+
+    Args:
+        split_files(list): Split files (see data/readme.md) of objects and distractors
+        crop(bool): Crop assets to their visible (non-transparent) part
+        num_workers(int): Number of processes, 1 disables multiprocessing
+    Returns:
+        dict: Number of processed, skipped and invalid assets
+    """
+    summary = {"processed": 0, "skipped": 0, "invalid": 0}
+    for split_file in split_files:
+        catalog = AssetCatalog.from_split_file(split_file)
+        old_assets = load_asset_index(split_file)
+        mask_dir = get_asset_mask_dir(split_file)
+        mask_dir.mkdir(exist_ok=True)
+        rel_paths = sorted(set(p.decode("utf-8") for p in catalog.rel_paths))
+        tasks = [
+            (catalog.base_path / p, old_assets.get(p), mask_dir, crop)
+            for p in rel_paths
+        ]
+        print(f"Preprocessing {len(tasks)} assets of {split_file}")
+        if num_workers > 1:
+            with Pool(num_workers, init_worker) as p:
+                results = list(
+                    tqdm.tqdm(
+                        p.imap(preprocess_asset, tasks, chunksize=16), total=len(tasks)
+                    )
+                )
+        else:
+            results = [preprocess_asset(t) for t in tqdm.tqdm(tasks)]
+        assets = {}
+        for rel_path, (entry, status) in zip(rel_paths, results):
+            assets[rel_path] = entry
+            summary[status] += 1
+            if status == "invalid":
+                print(f"Invalid asset {rel_path}: {entry['error']}")
+        save_asset_index(split_file, assets)
+    return summary
+
+
+def preprocess_asset(args: Tuple[Path, Optional[Dict], Path, bool]) -> Tuple[Dict, str]:
+    """Preprocesses a single asset (used by the workers)
+
+    Returns:
+        tuple: Index entry and status ("processed", "skipped" or "invalid")
+    """
+    img_path, old_entry, mask_dir, crop = args
+    sha1 = get_file_hash(img_path)
+    if old_entry is not None and old_entry["sha1"] == sha1:
+        if "error" in old_entry or (mask_dir / f"{sha1}.png").exists():
+            return old_entry, "invalid" if "error" in old_entry else "skipped"
+    with Image.open(img_path) as img:
+        if img.mode != "RGBA":
+            return {
+                "sha1": sha1,
+                "error": f"Mode {img.mode} instead of RGBA",
+            }, "invalid"
+        img.load()
+        if crop:
+            bbox = img.getchannel("A").getbbox()
+            if bbox is None:
+                return {"sha1": sha1, "error": "Image is fully transparent"}, "invalid"
+            if bbox != (0, 0) + img.size:  # only rewrite assets that are not tight yet
+                img = img.crop(bbox)
+                img.save(img_path)
+                sha1 = get_file_hash(img_path)
+        mask = img.getchannel("A").filter(ImageFilter.MinFilter(MINFILTER_SIZE))
+        mask.save(mask_dir / f"{sha1}.png")
+        entry = {
+            "sha1": sha1,
+            "size": list(img.size),
+            "bbox": list(get_bbox_of_mask(np.asarray(mask))),
+        }
+    return entry, "processed"
+
+
+def get_file_hash(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
@@ -0,0 +1,231 @@
+import math
+import time
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image
+
+from src.config import (
+    BACKGROUND_RESIZE_MODE,
+    BACKGROUND_TARGET_SIZE,
+    BLENDING_LIST,
+    MAX_UPSCALING,
+    OBJECT_CATEGORIES,
+    PREVIEW_COLUMNS,
+    PREVIEW_SCALE,
+    PREVIEW_TILE_SIZE,
+)
+from src.generator.backgrounds import load_background
+from src.generator.create import render_plan_record
+from src.generator.handler import load_relevant_data, sample_tasks
+from src.generator.plan import create_plan_header, plan_task
+from src.image_augmentation.basic_augmentations import augment_scale
+from src.models.asset_catalog import SPLIT_TYPES
+from src.models.img_data import ImgDataRGBA
+
+# cheap stand-ins of expensive blendings, mixed blendings skip the illumination change
+PREVIEW_BLENDING_SUBSTITUTES = {"illumination": "none", "poisson": "gaussian"}
+PREVIEW_OBJECT_CACHE_SIZE = 256  # downscaled objects kept in memory
+
+
+def generate_preview(
+    output_dir: str,
+    object_json: str,
+    distractor_json: str,
+    background_json: str,
+    number_of_images: Dict,
+    dontocclude: bool,
+    rotation: bool,
+    scale: bool,
+    seed: int = 0,
+    blending_list: List[str] = BLENDING_LIST,
+    preview_scale: float = PREVIEW_SCALE,
+) -> Dict[str, Path]:
+    """Renders low resolution previews of each split onto a contact sheet
+
+    Images are planned like generate_synthetic_dataset does, thus the previews of a seed
+    show the layouts of the dataset with that seed. Backgrounds are decoded at reduced
+    size, all geometry is scaled by preview_scale and expensive blendings are replaced
+    by cheap stand-ins (see PREVIEW_BLENDING_SUBSTITUTES). Nothing but the contact
+    sheets <split>_preview.jpg is written.
+
+    Args:
+        output_dir(str): Directory of the contact sheets
+        object_json(str): Path to objects of interest json
+        distractor_json(str): Path to distractor object json
+        background_json(str): Path to background json
+        number_of_images(dict): For each split contains the number of images
+        dontocclude(bool): Disable occlusion
+        rotation(bool): Enable rotation of objects
+        scale(bool): Enable scaling of objects
+        seed(int): Global seed
+        blending_list(list): Blending modes, each image is shown once per blending
+        preview_scale(float): Size of the previews relative to the generated images
+    Returns:
+        dict: Contact sheet of each split with images
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    object_catalog, distractor_catalog, background_catalog = load_relevant_data(
+        object_json, distractor_json, background_json
+    )
+    object_cache = PreviewObjectCache(preview_scale)
+    sheets = {}
+    for split_type in SPLIT_TYPES:
+        if number_of_images[split_type] == 0:
+            continue
+        start_time = time.time()
+        tasks = sample_tasks(
+            object_catalog, distractor_catalog, background_catalog, split_type, seed
+        )
+        header = create_plan_header(
+            split_type,
+            seed,
+            OBJECT_CATEGORIES,
+            blending_list,
+            scale,
+            rotation,
+            dontocclude,
+        )
+        sizes = {}
+        images = []
+        for params in islice(tasks, number_of_images[split_type]):
+            record = plan_task(params, header, sizes)
+            if record is None:
+                continue
+            images += render_preview(record, blending_list, preview_scale, object_cache)
+        sheets[split_type] = output_dir / f"{split_type}_preview.jpg"
+        create_contact_sheet(images).save(sheets[split_type])
+        elapsed = time.time() - start_time
+        print(f"Preview of {split_type}: {len(images)} images in {elapsed:.1f} s")
+    return sheets
+
+
+def render_preview(
+    record: Dict,
+    blending_list: List[str],
+    preview_scale: float = PREVIEW_SCALE,
+    load_object: Callable = None,
+) -> List[Image.Image]:
+    """Renders a plan record at reduced size with cheap blendings
+
+    Args:
+        record(dict): Plan record of the generated image
+        blending_list(list): Blending modes of the plan
+        preview_scale(float): Size of the preview relative to the generated image
+        load_object(callable): Loader of the objects, e.g. a PreviewObjectCache
+
+    Returns:
+        list: Image of each blending
+    """
+    record = scale_plan_record(record, preview_scale)
+    for layout in record["objects"]:
+        layout["blending"] = [
+            get_preview_blending(blending_type, params)[1]
+            for blending_type, params in zip(blending_list, layout["blending"])
+        ]
+    preview_blendings = [get_preview_blending(b, {})[0] for b in blending_list]
+    resize_mode = BACKGROUND_RESIZE_MODE if BACKGROUND_TARGET_SIZE else "resize"
+    background = load_background(
+        record["background"],
+        record["background_size"],
+        resize_mode,
+        draft=True,
+        crop=record.get("background_crop"),
+    )
+    images, _, _ = render_plan_record(
+        record, preview_blendings, background=background, load_object=load_object
+    )
+    return images
+
+
+class PreviewObjectCache:
+    """Loads each object once, downscaled to the largest size a preview can need
+
+    Decoding and filtering the assets at full resolution dominates the rendering of
+    previews otherwise. Objects are scaled by at most MAX_UPSCALING (see
+    sample_scaled_size), thus a downscaled copy loses no detail of the previews.
+    """
+
+    def __init__(self, preview_scale: float, max_size: int = PREVIEW_OBJECT_CACHE_SIZE):
+        self.factor = min(1.0, preview_scale * MAX_UPSCALING)
+        self.max_size = max_size
+        self._cache = OrderedDict()
+
+    def __call__(self, img_data: ImgDataRGBA):
+        key = (img_data.img_path.as_posix(), tuple(img_data.metadata.get("bbox", [])))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        loaded_data = img_data.load_object_data()
+        if loaded_data is not None:
+            foreground, mask, *rest = loaded_data
+            size = (
+                max(1, round(foreground.width * self.factor)),
+                max(1, round(foreground.height * self.factor)),
+            )
+            foreground, mask = augment_scale(foreground, mask, size)
+            loaded_data = (foreground, mask, *rest)
+        self._cache[key] = loaded_data
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return loaded_data
+
+
+def scale_plan_record(record: Dict, factor: float) -> Dict:
+    """Returns a copy of a plan record with background and objects scaled by factor
+
+    Bounding boxes stay in the coordinates of the assets, since objects are cropped
+    before they are scaled.
+    """
+    bg_w, bg_h = record["background_size"]
+    objects = []
+    for layout in record["objects"]:
+        o_w, o_h = layout["size"]
+        x, y = layout["position"]
+        objects.append(
+            {
+                **layout,
+                "size": [max(1, round(o_w * factor)), max(1, round(o_h * factor))],
+                "position": [round(x * factor), round(y * factor)],
+            }
+        )
+    return {
+        **record,
+        "background_size": [max(1, round(bg_w * factor)), max(1, round(bg_h * factor))],
+        "objects": objects,
+    }
+
+
+def get_preview_blending(blending_type: str, params: Dict) -> Tuple[str, Dict]:
+    """Returns a cheap stand-in of a blending and its parameters"""
+    if blending_type == "mixed":  # gamma correction and mask adjustment only
+        return blending_type, {
+            k: v for k, v in params.items() if k not in ["alpha", "beta"]
+        }
+    if blending_type.startswith("poisson"):
+        blending_type = "poisson"
+    if blending_type in PREVIEW_BLENDING_SUBSTITUTES:
+        return PREVIEW_BLENDING_SUBSTITUTES[blending_type], {}
+    return blending_type, params
+
+
+def create_contact_sheet(
+    images: List[Image.Image],
+    tile_size: Tuple[int, int] = PREVIEW_TILE_SIZE,
+    columns: int = PREVIEW_COLUMNS,
+) -> Image.Image:
+    """Arranges thumbnails of the images in a grid, row by row"""
+    tile_w, tile_h = tile_size
+    columns = max(1, min(columns, len(images)))
+    rows = max(1, math.ceil(len(images) / columns))
+    sheet = Image.new("RGB", (columns * tile_w, rows * tile_h), (32, 32, 32))
+    for i, image in enumerate(images):
+        thumbnail = image.copy()
+        thumbnail.thumbnail((tile_w - 2, tile_h - 2))  # keeps a border between tiles
+        x = (i % columns) * tile_w + (tile_w - thumbnail.width) // 2
+        y = (i // columns) * tile_h + (tile_h - thumbnail.height) // 2
+        sheet.paste(thumbnail, (x, y))
+    return sheet
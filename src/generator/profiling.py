@@ -0,0 +1,222 @@
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+TOP_ALLOCATION_SITES = 10  # allocation sites reported per task
+LEAK_THRESHOLD = 1024 * 1024  # RSS growth per task (bytes) reported as leak
+LEAK_WARMUP_TASKS = 2  # first tasks of a worker fill caches, thus they are skipped
+
+_current_profile = None
+_task_counter = 0
+_stage_timing = threading.local()  # durations of the stages of the task of a thread
+
+
+def get_rss() -> Dict[str, int]:
+    """Returns current and peak resident set size of this process in bytes"""
+    rss = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    rss[line[:5]] = int(line.split()[1]) * 1024
+        return {"rss": rss["VmRSS"], "peak_rss": rss["VmHWM"]}
+    except (OSError, KeyError):  # no procfs, only the lifetime peak is known
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {"rss": peak_rss, "peak_rss": peak_rss}
+
+
+def reset_peak_rss() -> bool:
+    """Resets the peak RSS of this process (Linux only), such that it is per task"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class MemoryProfile:
+    """Records the memory usage of a task (in a worker) and its stages
+
+    Peaks of stages are measured with tracemalloc, which covers Python and NumPy
+    allocations, but not the internal buffers of Pillow and OpenCV. Those are included in
+    the peak RSS of the task. Tracing is stopped by finish if the profile started it.
+    """
+
+    def __init__(self, task_id: int):
+        global _task_counter
+        _task_counter += 1
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.task_id = task_id
+        self.task_index = _task_counter  # n-th task of this worker
+        self.peak_rss_is_per_task = reset_peak_rss()
+        self.rss_start = get_rss()["rss"]
+        self.traced_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.stages = {}
+        self._stack = []
+
+    def enter_stage(self, name: str):
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        if len(self._stack) > 0:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], traced_peak)
+        tracemalloc.reset_peak()
+        self._stack.append({"name": name, "start": traced_current, "peak": 0})
+
+    def exit_stage(self):
+        stage = self._stack.pop()
+        peak = max(stage["peak"], tracemalloc.get_traced_memory()[1])
+        stats = self.stages.setdefault(stage["name"], {"traced_peak": 0, "rss": 0})
+        stats["traced_peak"] = max(stats["traced_peak"], peak - stage["start"])
+        stats["rss"] = max(stats["rss"], get_rss()["rss"])
+        if len(self._stack) > 0:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+
+    def finish(self) -> Dict:
+        """Summarizes the task, call it while its large objects are still alive"""
+        rss = get_rss()
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        traced_peak = tracemalloc.get_traced_memory()[1] - self.traced_start
+        if self.started_tracing:
+            tracemalloc.stop()
+        return {
+            "task_id": self.task_id,
+            "pid": os.getpid(),
+            "task_index": self.task_index,
+            "rss_start": self.rss_start,
+            "rss_end": rss["rss"],
+            "peak_rss": rss["peak_rss"],
+            "peak_rss_is_per_task": self.peak_rss_is_per_task,
+            "traced_peak": traced_peak,
+            "stages": self.stages,
+            "top_allocations": [
+                {"site": str(s.traceback), "size": s.size, "count": s.count}
+                for s in statistics[:TOP_ALLOCATION_SITES]
+            ],
+        }
+
+
+def start_task_profile(task_id: int) -> MemoryProfile:
+    global _current_profile
+    previous = _current_profile  # not finished if its task raised
+    _current_profile = MemoryProfile(task_id)
+    if previous is not None:
+        _current_profile.started_tracing |= previous.started_tracing
+    return _current_profile
+
+
+def finish_task_profile() -> Optional[Dict]:
+    global _current_profile
+    if _current_profile is None:
+        return None
+    profile = _current_profile.finish()
+    _current_profile = None
+    return profile
+
+
+def start_stage_timing():
+    _stage_timing.seconds = defaultdict(float)
+
+
+def finish_stage_timing() -> Dict[str, float]:
+    """Returns the total duration of each stage of the current task in seconds"""
+    seconds = getattr(_stage_timing, "seconds", None)
+    _stage_timing.seconds = None
+    return dict(seconds or {})
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Records the duration and memory usage of a stage of the current task
+
+    Durations are summed per stage (e.g. over all objects), if the timing of the task
+    was started. The memory usage is recorded if the current task is profiled.
+    """
+    seconds = getattr(_stage_timing, "seconds", None)
+    profile = _current_profile
+    start = time.perf_counter()
+    if profile is not None:
+        profile.enter_stage(name)
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.exit_stage()
+        if seconds is not None:
+            seconds[name] += time.perf_counter() - start
+
+
+def create_memory_report(profiles: List[Dict], num_largest: int = 5) -> Dict:
+    """Aggregates the memory profiles of all tasks (in the parent process)
+
+    Args:
+        profiles(list): Results of finish_task_profile of each task
+        num_largest(int): Number of tasks reported as largest
+    Returns:
+        dict: Peak per stage, largest tasks, top allocation sites and suspected leaks
+    """
+    stages = defaultdict(lambda: {"traced_peak": 0, "rss": 0})
+    sites = defaultdict(int)
+    workers = defaultdict(list)
+    for profile in profiles:
+        for name, stats in profile["stages"].items():
+            stages[name]["traced_peak"] = max(
+                stages[name]["traced_peak"], stats["traced_peak"]
+            )
+            stages[name]["rss"] = max(stages[name]["rss"], stats["rss"])
+        for allocation in profile["top_allocations"]:
+            sites[allocation["site"]] = max(
+                sites[allocation["site"]], allocation["size"]
+            )
+        workers[profile["pid"]].append(profile)
+    largest = sorted(profiles, key=lambda p: p["peak_rss"], reverse=True)[:num_largest]
+    leaks = []
+    for pid, worker_profiles in workers.items():
+        worker_profiles = sorted(worker_profiles, key=lambda p: p["task_index"])
+        worker_profiles = worker_profiles[LEAK_WARMUP_TASKS:]
+        if len(worker_profiles) < 2:
+            continue
+        growth = worker_profiles[-1]["rss_end"] - worker_profiles[0]["rss_end"]
+        growth_per_task = growth / (len(worker_profiles) - 1)
+        if growth_per_task > LEAK_THRESHOLD:
+            leaks.append({"pid": pid, "rss_growth_per_task": growth_per_task})
+    return {
+        "tasks": len(profiles),
+        "peak_rss": max((p["peak_rss"] for p in profiles), default=0),
+        "stages": dict(stages),
+        "largest_tasks": [
+            {"task_id": p["task_id"], "peak_rss": p["peak_rss"]} for p in largest
+        ],
+        "top_allocation_sites": [
+            {"site": site, "size": size}
+            for site, size in sorted(sites.items(), key=lambda s: s[1], reverse=True)[
+                :TOP_ALLOCATION_SITES
+            ]
+        ],
+        "leaks": leaks,
+    }
+
+
+def print_memory_report(report: Dict):
+    mb = 1024 * 1024
+    print(f"Peak RSS of a worker: {report['peak_rss'] / mb:.1f} MB")
+    for name, stats in report["stages"].items():
+        print(
+            f"  {name:<12} traced peak {stats['traced_peak'] / mb:8.1f} MB, "
+            f"RSS {stats['rss'] / mb:8.1f} MB"
+        )
+    for task in report["largest_tasks"]:
+        print(f"  task {task['task_id']}: peak RSS {task['peak_rss'] / mb:.1f} MB")
+    for leak in report["leaks"]:
+        print(
+            f"  possible leak in worker {leak['pid']}: RSS grows by "
+            f"{leak['rss_growth_per_task'] / mb:.1f} MB per task"
+        )
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.config import (
+    BACKGROUND_TARGET_SIZE,
+    BACKGROUND_RESIZE_MODE,
+    INVERTED_MASK,
+    MINFILTER_SIZE,
+)
+
+RENDER_CACHE_VERSION = 2  # increase whenever the renderer produces other pixels
+
+
+class RenderCache:
+    """Content-addressed store of rendered images and their masks
+
+    Each variant (i.e. blending) of a plan record is keyed by a hash of its layout, the
+    content hashes of its assets and all config values that change the pixels. Task IDs
+    and output paths are not part of the key, thus images are reused on rebuilds (e.g.
+    after changing the annotations or other blendings) and across datasets. Annotations
+    are computed from the cached masks again, so they can change independently.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+        self._file_hashes = {}
+
+    def get_key(self, record: Dict, blending_list: List[str], variant: int) -> str:
+        description = {
+            "version": RENDER_CACHE_VERSION,
+            "config": [
+                MINFILTER_SIZE,
+                INVERTED_MASK,
+                BACKGROUND_TARGET_SIZE,
+                BACKGROUND_RESIZE_MODE,
+            ],
+            "blending": blending_list[variant],
+            "background": self._get_file_hash(record["background"]),
+            "background_size": record["background_size"],
+            "objects": [
+                {
+                    "asset": layout["metadata"].get("sha1")
+                    or self._get_file_hash(layout["path"]),
+                    "label_id": layout["label_id"],
+                    "bbox": layout["bbox"],
+                    "size": layout["size"],
+                    "rotation": layout["rotation"],
+                    "position": layout["position"],
+                    "blending": layout["blending"][variant],
+                }
+                for layout in record["objects"]
+            ],
+            "motion_blur": record["motion_blur"][variant],
+        }
+        if "background_crop" in record:  # keeps the keys of uncropped records
+            description["background_crop"] = record["background_crop"]
+        description = json.dumps(description, sort_keys=True)
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+    def load(
+        self, key: str, img_file: Path
+    ) -> Optional[Tuple[List[np.ndarray], List[int]]]:
+        """Copies the cached image to img_file
+
+        Returns:
+            tuple: Masks and category ID of each mask, None if the key is not cached
+        """
+        cached_img, cached_masks = self._get_paths(key)
+        if not (cached_img.exists() and cached_masks.exists()):
+            return None
+        with np.load(cached_masks) as data:
+            masks = list(data["masks"])
+            mask_category_ids = data["category_ids"].tolist()
+        shutil.copyfile(cached_img, img_file)
+        return masks, mask_category_ids
+
+    def save(
+        self,
+        key: str,
+        img_file: Path,
+        masks: List[np.ndarray],
+        mask_category_ids: List[int],
+    ):
+        cached_img, cached_masks = self._get_paths(key)
+        cached_img.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        # masks first, an image is only used if its masks are complete
+        tmp_masks = cached_masks.with_name(cached_masks.name + suffix)
+        if len(masks) > 0:
+            masks = np.stack(masks)
+        else:
+            masks = np.zeros((0, 0, 0), dtype=np.uint8)
+        with tmp_masks.open("wb") as f:
+            np.savez_compressed(
+                f,
+                masks=masks,
+                category_ids=np.array(mask_category_ids, dtype=np.int64),
+            )
+        os.replace(tmp_masks, cached_masks)
+        tmp_img = cached_img.with_name(cached_img.name + suffix)
+        shutil.copyfile(img_file, tmp_img)
+        os.replace(tmp_img, cached_img)  # atomic, workers might race here
+
+    def _get_paths(self, key: str) -> Tuple[Path, Path]:
+        key_dir = self.cache_dir / key[:2]
+        return key_dir / f"{key}.jpg", key_dir / f"{key}.npz"
+
+    def _get_file_hash(self, path: Union[str, Path]) -> str:
+        """Hashes the content of an asset once per process, unless it is modified"""
+        stat = os.stat(path)
+        file_id = (str(path), stat.st_mtime_ns, stat.st_size)
+        if file_id not in self._file_hashes:
+            with open(path, "rb") as f:
+                self._file_hashes[file_id] = hashlib.sha1(f.read()).hexdigest()
+        return self._file_hashes[file_id]
+
+
+_render_caches = {}
+_render_caches_lock = threading.Lock()
+
+
+def get_render_cache(cache_dir: Union[str, Path]) -> RenderCache:
+    """Returns the render cache of this process for cache_dir"""
+    key = str(cache_dir)
+    with _render_caches_lock:
+        if key not in _render_caches:
+            _render_caches[key] = RenderCache(cache_dir)
+        return _render_caches[key]
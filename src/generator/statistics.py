@@ -0,0 +1,211 @@
+import json
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src.image_augmentation.basic_augmentations import get_rotated_size
+
+SIZE_BINS = [0, 8, 16, 32, 64, 96, 128, 256, 512]  # sqrt of bbox area in pixels
+AREA_BINS = [0, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5]  # mask area / image area
+RATIO_BINS = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9]  # truncation and occlusion ratios
+
+
+class DatasetStatistics:
+    """Accumulates statistics of the annotations while they are generated
+
+    Each task fills its own accumulator in the worker, the parent merges them (see
+    merge), thus no second pass over the images and annotations is needed. Histograms
+    count the values from a bin edge (inclusive) to the next one, the last bin is open.
+
+    Truncation is the fraction of the pasted (rotated) object box outside the image,
+    occlusion the fraction of its box inside the image that is covered by the masks of
+    objects pasted on top of it. Both are computed for annotated objects only, assets
+    are counted once per task (not per blending).
+    """
+
+    def __init__(self):
+        self.tasks = 0
+        self.images = 0
+        self.annotations = 0
+        self.objects_per_image = Counter()
+        self.instances_per_category = Counter()
+        self.bbox_size = [0] * len(SIZE_BINS)
+        self.area = [0] * len(AREA_BINS)
+        self.truncation = [0] * len(RATIO_BINS)
+        self.occlusion = [0] * len(RATIO_BINS)
+        self.truncation_sum = 0.0
+        self.occlusion_sum = 0.0
+        self.asset_usage = {
+            "objects": Counter(),
+            "distractors": Counter(),
+            "backgrounds": Counter(),
+        }
+
+    def add_task(self, record: Dict):
+        """Counts the assets of a plan record"""
+        self.tasks += 1
+        self.asset_usage["backgrounds"][record["background"]] += 1
+        for layout in record["objects"]:
+            asset_type = "distractors" if layout["distractor"] else "objects"
+            self.asset_usage[asset_type][layout["path"]] += 1
+
+    def add_image(
+        self,
+        img_dict: Dict,
+        annotation_dicts: List[Dict],
+        masks: List[np.ndarray],
+        record: Dict,
+        categories: List[Dict] = None,
+    ):
+        """Adds an image and its annotations
+
+        Args:
+            img_dict(dict): MS COCO image of the annotations
+            annotation_dicts(list): MS COCO annotations, IDs are the indices of masks
+            masks(list): Masks of all objects of the image, after occlusion
+            record(dict): Plan record of the image
+            categories(list): Categories of the annotations, IDs are counted otherwise
+        """
+        names = {c["id"]: c["name"] for c in categories or []}
+        image_area = img_dict["width"] * img_dict["height"]
+        self.images += 1
+        self.annotations += len(annotation_dicts)
+        self.objects_per_image[len(annotation_dicts)] += 1
+        # masks only match the layouts if no object failed to load
+        layouts = record["objects"] if len(masks) == len(record["objects"]) else None
+        for anno in annotation_dicts:
+            category_id = anno["category_id"]
+            self.instances_per_category[names.get(category_id, category_id)] += 1
+            _, _, w, h = anno["bbox"]
+            self.bbox_size[get_bin(SIZE_BINS, (w * h) ** 0.5)] += 1
+            mask_area = np.count_nonzero(masks[anno["id"]] >= 250)
+            self.area[get_bin(AREA_BINS, mask_area / image_area)] += 1
+            if layouts is None:
+                continue
+            truncation, occlusion = get_truncation_and_occlusion(
+                masks, layouts, anno["id"], img_dict["width"], img_dict["height"]
+            )
+            self.truncation[get_bin(RATIO_BINS, truncation)] += 1
+            self.occlusion[get_bin(RATIO_BINS, occlusion)] += 1
+            self.truncation_sum += truncation
+            self.occlusion_sum += occlusion
+
+    def merge(self, other: "DatasetStatistics") -> "DatasetStatistics":
+        """Adds the statistics of other (e.g. of another task or worker) to these"""
+        self.tasks += other.tasks
+        self.images += other.images
+        self.annotations += other.annotations
+        self.objects_per_image.update(other.objects_per_image)
+        self.instances_per_category.update(other.instances_per_category)
+        for name in ["bbox_size", "area", "truncation", "occlusion"]:
+            setattr(
+                self,
+                name,
+                [a + b for a, b in zip(getattr(self, name), getattr(other, name))],
+            )
+        self.truncation_sum += other.truncation_sum
+        self.occlusion_sum += other.occlusion_sum
+        for asset_type, usage in other.asset_usage.items():
+            self.asset_usage[asset_type].update(usage)
+        return self
+
+    def to_dict(self) -> Dict:
+        measured = sum(self.truncation)
+        return {
+            "tasks": self.tasks,
+            "images": self.images,
+            "annotations": self.annotations,
+            "objects_per_image": {
+                str(n): c for n, c in sorted(self.objects_per_image.items())
+            },
+            "instances_per_category": {
+                str(k): c for k, c in self.instances_per_category.items()
+            },
+            "bbox_size": {"bins": SIZE_BINS, "counts": self.bbox_size},
+            "area": {"bins": AREA_BINS, "counts": self.area},
+            "truncation": {
+                "bins": RATIO_BINS,
+                "counts": self.truncation,
+                "sum": self.truncation_sum,
+                "mean": self.truncation_sum / measured if measured > 0 else 0.0,
+                "truncated": measured - self.truncation[0],
+            },
+            "occlusion": {
+                "bins": RATIO_BINS,
+                "counts": self.occlusion,
+                "sum": self.occlusion_sum,
+                "mean": self.occlusion_sum / measured if measured > 0 else 0.0,
+                "occluded": measured - self.occlusion[0],
+            },
+            "asset_usage": {
+                asset_type: dict(usage.most_common())
+                for asset_type, usage in self.asset_usage.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, stats_dict: Dict) -> "DatasetStatistics":
+        for name, bins in [
+            ("bbox_size", SIZE_BINS),
+            ("area", AREA_BINS),
+            ("truncation", RATIO_BINS),
+            ("occlusion", RATIO_BINS),
+        ]:
+            assert stats_dict[name]["bins"] == bins, f"Other bins of {name}"
+        stats = cls()
+        stats.tasks = stats_dict["tasks"]
+        stats.images = stats_dict["images"]
+        stats.annotations = stats_dict["annotations"]
+        stats.objects_per_image = Counter(
+            {int(n): c for n, c in stats_dict["objects_per_image"].items()}
+        )
+        stats.instances_per_category = Counter(stats_dict["instances_per_category"])
+        stats.bbox_size = stats_dict["bbox_size"]["counts"]
+        stats.area = stats_dict["area"]["counts"]
+        stats.truncation = stats_dict["truncation"]["counts"]
+        stats.occlusion = stats_dict["occlusion"]["counts"]
+        stats.truncation_sum = stats_dict["truncation"]["sum"]
+        stats.occlusion_sum = stats_dict["occlusion"]["sum"]
+        for asset_type, usage in stats_dict["asset_usage"].items():
+            stats.asset_usage[asset_type] = Counter(usage)
+        return stats
+
+    def save(self, path: Path):
+        with Path(path).open("w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: Path) -> "DatasetStatistics":
+        with Path(path).open("r") as f:
+            return cls.from_dict(json.load(f))
+
+
+def get_bin(bins: List[float], value: float) -> int:
+    return max(0, bisect_right(bins, value) - 1)
+
+
+def get_truncation_and_occlusion(
+    masks: List[np.ndarray], layouts: List[Dict], index: int, width: int, height: int
+):
+    """Returns truncation and occlusion ratio of an object (see DatasetStatistics)"""
+    x, y = layouts[index]["position"]
+    w, h = get_rotated_size(*layouts[index]["size"], layouts[index]["rotation"])
+    x_start, x_end = max(0, x), min(width, x + w)
+    y_start, y_end = max(0, y), min(height, y + h)
+    inside = max(0, x_end - x_start) * max(0, y_end - y_start)
+    truncation = 1 - inside / (w * h) if w * h > 0 else 0.0
+    if inside == 0 or index == len(masks) - 1:
+        return truncation, 0.0
+    # the masks of later objects cover all pixels they occlude
+    covered = np.zeros((y_end - y_start, x_end - x_start), dtype=bool)
+    for mask in masks[index + 1 :]:
+        covered |= mask[y_start:y_end, x_start:x_end] >= 250
+    return truncation, np.count_nonzero(covered) / inside
+
+
+def get_statistics_file(split_output_dir: Path) -> Path:
+    """Returns the path of the statistics report, next to the split annotation file"""
+    return split_output_dir.parent / f"{split_output_dir.name}_stats.json"
@@ -0,0 +1,118 @@
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from src.config import BLENDING_LIST, OBJECT_CATEGORIES
+from src.generator.annotations import (
+    create_annotation_dicts_mscoco,
+    remove_ignore_label_segmentations,
+)
+from src.generator.create import render_plan_record
+from src.generator.handler import load_relevant_data, sample_tasks
+from src.generator.plan import create_plan_header, plan_task
+from src.generator.utils import init_worker
+
+
+def generate_samples(
+    object_json: str,
+    distractor_json: str,
+    background_json: str,
+    split_type: str = "train",
+    num_images: int = None,
+    seed: int = 0,
+    dontocclude: bool = True,
+    rotation: bool = True,
+    scale: bool = True,
+    blending_list: List[str] = BLENDING_LIST,
+    num_workers: int = 0,
+    prefetch: int = None,
+) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+    """Generates samples on the fly, e.g. inside a data loader, without writing files
+
+    Images are planned and rendered exactly like generate_synthetic_dataset does, thus
+    the samples of a seed are the same as the images of a dataset with that seed (before
+    JPEG compression) and do not depend on the number of workers.
+
+    Args:
+        object_json(str): Path to objects of interest json
+        distractor_json(str): Path to distractor object json
+        background_json(str): Path to background json
+        split_type(str): Split whose assets are used
+        num_images(int): Number of images (each with one sample per blending), endless
+            if None. Like in generate_synthetic_dataset, tasks that can not be planned
+            within MAX_REPLANS are skipped
+        seed(int): Global seed
+        dontocclude(bool): Disable occlusion
+        rotation(bool): Enable rotation of objects
+        scale(bool): Enable scaling of objects
+        blending_list(list): Blending modes, each image gives one sample per blending
+        num_workers(int): Number of processes rendering in the background, 0 renders
+            in the calling process
+        prefetch(int): Maximum number of images rendered ahead (default: 2 per worker)
+    Returns:
+        iterator: RGB image of shape (h, w, 3) and MS COCO annotations of each sample
+    """
+    object_catalog, distractor_catalog, background_catalog = load_relevant_data(
+        object_json, distractor_json, background_json
+    )
+    tasks = sample_tasks(
+        object_catalog, distractor_catalog, background_catalog, split_type, seed
+    )
+    if num_images is not None:
+        tasks = islice(tasks, num_images)
+    header = create_plan_header(
+        split_type,
+        seed,
+        OBJECT_CATEGORIES,
+        blending_list,
+        scale,
+        rotation,
+        dontocclude,
+    )
+    sizes = {}
+    records = (plan_task(params, header, sizes) for params in tasks)
+    records = (record for record in records if record is not None)  # skipped tasks
+    if num_workers == 0:
+        for record in records:
+            yield from render_samples(record, header["blending_list"])
+        return
+    prefetch = prefetch if prefetch is not None else 2 * num_workers
+    pool = Pool(num_workers, init_worker)
+    try:
+        # a bounded window of pending images, Pool.imap would consume endless streams
+        pending = deque()
+        for record in records:
+            pending.append(
+                pool.apply_async(render_samples, (record, header["blending_list"]))
+            )
+            if len(pending) >= prefetch:
+                yield from pending.popleft().get()
+        while len(pending) > 0:
+            yield from pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def render_samples(
+    record: Dict, blending_list: List[str]
+) -> List[Tuple[np.ndarray, List[Dict]]]:
+    """Renders a plan record in memory (used by the workers)
+
+    Returns:
+        list: Image and annotations of each blending, image IDs are unique per stream
+    """
+    images, masks, mask_category_ids = render_plan_record(record, blending_list)
+    samples = []
+    for i, image in enumerate(images):
+        image_id = (record["task_id"] - 1) * len(blending_list) + i
+        width, height = image.size
+        annotation_dicts = create_annotation_dicts_mscoco(
+            image_id, masks, mask_category_ids, width, height
+        )
+        remove_ignore_label_segmentations(annotation_dicts)
+        samples.append((np.array(image), annotation_dicts))
+    return samples
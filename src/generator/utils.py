@@ -1,32 +1,84 @@
+import hashlib
+import os
 import signal
 
 import numpy as np
 
+from src.config import WORKER_LIBRARY_THREADS
+
+LIBRARY_THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
 
 def init_worker():
     """
-    Catch Ctrl+C signal to termiante workers
+    Catch Ctrl+C signal to termiante workers and limit the threads of the libraries
     """
     signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if WORKER_LIBRARY_THREADS is not None:
+        set_library_threads(WORKER_LIBRARY_THREADS)
+
+
+def set_library_threads(num_threads: int) -> bool:
+    """Limits the thread pools of OpenCV and BLAS to num_threads
+
+    Otherwise each worker starts as many threads as there are cores, which oversubscribes
+    the CPU.
+
+    Returns:
+        bool: False if the BLAS of NumPy could not be limited (threadpoolctl missing)
+    """
+    import cv2
+
+    cv2.setNumThreads(num_threads)
+    for variable in LIBRARY_THREAD_VARIABLES:  # for libraries loaded later on
+        os.environ[variable] = str(num_threads)
+    try:  # BLAS of NumPy/SciPy is already loaded, thus needs to be limited at runtime
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        print(
+            f"threadpoolctl is not installed (see requirements.txt), the BLAS threads "
+            f"of process {os.getpid()} are not limited to {num_threads}"
+        )
+        return False
+    threadpool_limits(num_threads)
+    return True
+
+
+def derive_seed(*keys) -> int:
+    """Derives a seed from e.g. the global seed, split and task index
+
+    In contrast to hash(), the result does not change between processes and runs.
+    """
+    description = "/".join(str(k) for k in keys)
+    return int(hashlib.sha256(description.encode("utf-8")).hexdigest()[:16], 16)
 
 
-def PIL2array1C(img):
+def PIL2array1C(img, copy=True):
     """Converts a PIL image to NumPy Array
 
     Args:
         img(PIL Image): Input PIL image
+        copy(bool): Return a writable copy, otherwise a read-only array of the image data
     Returns:
         NumPy Array: Converted image
     """
-    return np.array(img.getdata(), np.uint8).reshape(img.size[1], img.size[0])
+    img_array = np.array(img, np.uint8) if copy else np.asarray(img, np.uint8)
+    return img_array.reshape(img.size[1], img.size[0])
 
 
-def PIL2array3C(img):
+def PIL2array3C(img, copy=True):
     """Converts a PIL image to NumPy Array
 
     Args:
         img(PIL Image): Input PIL image
+        copy(bool): Return a writable copy, otherwise a read-only array of the image data
     Returns:
         NumPy Array: Converted image
     """
-    return np.array(img.getdata(), np.uint8).reshape(img.size[1], img.size[0], 3)
+    img_array = np.array(img, np.uint8) if copy else np.asarray(img, np.uint8)
+    return img_array.reshape(img.size[1], img.size[0], 3)
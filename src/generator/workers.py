@@ -0,0 +1,307 @@
+import math
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+from collections import defaultdict
+from multiprocessing import Pool, Queue
+from multiprocessing.pool import ThreadPool
+from typing import Callable, Dict, List, Tuple
+
+import tqdm
+
+from src.config import (
+    SCHEDULING_BATCH_SIZE,
+    TASK_SCHEDULING,
+    TASK_TIMEOUT,
+    WORKER_LIBRARY_THREADS,
+)
+from src.generator.metrics import get_run_metrics
+from src.generator.utils import init_worker, set_library_threads
+from src.image_augmentation.basic_augmentations import SamplingError
+
+WATCHDOG_INTERVAL = 0.5  # seconds between two checks of the running tasks
+
+# start of each task (task ID, PID, thread ID, time), read by the watchdog
+_started_queue = None
+
+
+def create_worker_pool(backend: str, num_workers: int, started_queue=None):
+    """Creates a pool of processes or of threads, which share one process
+
+    Threads save the memory of the imports, caches and buffers of each process and
+    most heavy calls (Pillow, OpenCV, NumPy) release the GIL.
+    """
+    global _started_queue
+    if backend == "processes":
+        return Pool(num_workers, init_watched_worker, (started_queue,))
+    elif backend == "threads":
+        if WORKER_LIBRARY_THREADS is not None:
+            set_library_threads(WORKER_LIBRARY_THREADS)
+        _started_queue = started_queue  # shared by the threads
+        return ThreadPool(num_workers)
+    else:
+        raise NotImplementedError(f"Unknown execution backend: {backend}")
+
+
+def init_watched_worker(started_queue):
+    global _started_queue
+    init_worker()
+    _started_queue = started_queue
+
+
+def run_watched_batch(func: Callable, records: List[Dict]) -> List[Tuple]:
+    """Runs a batch of tasks one after another (in a worker)
+
+    The start of each task is reported to the watchdog. Tasks whose layout can not be
+    rendered (SamplingError) do not stop the batch, any other error is raised.
+
+    Returns:
+        list: Task ID, result and error (None if successful) of each task
+    """
+    outcomes = []
+    for record in records:
+        if _started_queue is not None:
+            _started_queue.put(
+                (record["task_id"], os.getpid(), threading.get_ident(), time.time())
+            )
+        try:
+            outcomes.append((record["task_id"], func(record), None))
+        except SamplingError as e:
+            outcomes.append((record["task_id"], None, format_error(e)))
+    return outcomes
+
+
+def schedule_tasks(
+    records: List[Dict],
+    scheduling: str,
+    num_workers: int,
+    batch_size: int = SCHEDULING_BATCH_SIZE,
+) -> List[List[Dict]]:
+    """Splits plan records into batches, each batch is rendered by one worker
+
+    Backgrounds and assets are sampled uniformly for each image, thus in plan order
+    every worker renders every background and its caches thrash. The locality
+    scheduling groups the tasks sharing a background, sorted by their objects, and cuts
+    them into batches of at most batch_size tasks, such that each background is only
+    decoded by the workers of its few batches. Batches are kept small enough to give
+    each worker some. Images only depend on their plan records, thus the scheduling
+    does not change the dataset.
+
+    Args:
+        records(list): Plan records
+        scheduling(str): "locality" or "fifo" (one task per batch, in plan order)
+        num_workers(int): Size of the pool
+        batch_size(int): Maximum number of tasks per batch
+    Returns:
+        list: Batches of plan records
+    """
+    if scheduling == "fifo":
+        return [[record] for record in records]
+    elif scheduling != "locality":
+        raise NotImplementedError(f"Unknown task scheduling: {scheduling}")
+    batch_size = max(1, min(batch_size, math.ceil(len(records) / num_workers)))
+    groups = defaultdict(list)
+    for record in records:
+        groups[record.get("background", "")].append(record)
+    ordered = []
+    for background in sorted(groups):
+        ordered += sorted(
+            groups[background],
+            key=lambda r: sorted(layout["path"] for layout in r.get("objects", [])),
+        )
+    return [ordered[i : i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+def run_tasks(
+    func: Callable,
+    records: List[Dict],
+    multithreading: bool,
+    backend: str,
+    num_workers: int,
+    timeout: float = TASK_TIMEOUT,
+    scheduling: str = TASK_SCHEDULING,
+) -> Tuple[List, List[Tuple[Dict, str]]]:
+    """Runs func on each plan record, tasks that can be re-planned are reported
+
+    Tasks raising a SamplingError and tasks exceeding the timeout are returned as
+    failures, such that they can be planned again with a new seed. Any other error is a
+    bug and raised (with the traceback of the worker), the workers are terminated.
+
+    With the process backend, a watchdog kills workers whose task runs longer than
+    timeout seconds, e.g. in a huge Poisson blending, and the pool replaces them. The
+    other unfinished tasks of the batch of a killed worker are scheduled again. Threads
+    can not be stopped, thus their timeouts are only reported.
+
+    Args:
+        func(callable): Renders a plan record (in a worker)
+        records(list): Plan records
+        multithreading(bool): Use a pool of workers, otherwise run in this process
+        backend(str): Run the workers as "processes" or "threads"
+        num_workers(int): Size of the pool
+        timeout(float): Time budget of a task in seconds, None disables the watchdog
+        scheduling(str): Order of the tasks, see schedule_tasks
+    Returns:
+        tuple: Results of the finished tasks and (record, reason) of each failed task
+    """
+    global _started_queue
+    results = []
+    failures = []
+    metrics = get_run_metrics()
+    if metrics is not None:
+        metrics.tasks_queued(len(records))
+    if not multithreading:
+        batches = schedule_tasks(records, scheduling, 1, len(records))
+        for record in tqdm.tqdm([r for batch in batches for r in batch]):
+            if metrics is not None:
+                metrics.set_running(1)
+            try:
+                results.append(func(record))
+                if metrics is not None:
+                    metrics.task_finished(results[-1])
+            except SamplingError as e:
+                failures.append((record, format_error(e)))
+                if metrics is not None:
+                    metrics.task_failed()
+            if metrics is not None:
+                metrics.set_running(0)
+                metrics.publish()
+        return results, failures
+
+    started = Queue() if backend == "processes" else queue.Queue()
+    finished = queue.Queue()
+    pool = create_worker_pool(backend, num_workers, started)
+    pending = {record["task_id"]: record for record in records}
+    batch_of = {}  # task ID -> batch, to schedule a batch again if its worker is killed
+
+    def submit(batch: List[Dict]):
+        for record in batch:
+            batch_of[record["task_id"]] = batch
+        pool.apply_async(
+            run_watched_batch,
+            (func, batch),
+            callback=lambda outcomes: put_all(finished, outcomes),
+            error_callback=lambda e: finished.put((batch[0]["task_id"], None, e)),
+        )
+
+    for batch in schedule_tasks(records, scheduling, num_workers):
+        submit(batch)
+    running = {}  # task ID -> (PID, thread ID, start time)
+    reported = set()
+    recycled = False
+    last_event = time.time()
+    progress = tqdm.tqdm(total=len(records))
+    try:
+        while len(pending) > 0:
+            events = get_all(finished, WATCHDOG_INTERVAL)
+            for task_id, pid, thread_id, start_time in get_all(started):
+                if task_id not in pending:
+                    continue
+                # a worker runs one task at a time, its previous task has finished
+                for other_id, (other_pid, other_thread_id, _) in list(running.items()):
+                    if (other_pid, other_thread_id) == (pid, thread_id):
+                        running.pop(other_id)
+                running[task_id] = (pid, thread_id, start_time)
+                last_event = time.time()
+            for task_id, result, error in events:
+                if isinstance(error, BaseException):
+                    raise error  # not a failure of the task, e.g. a bug of func
+                if task_id not in pending:
+                    continue  # task of a recycled worker, which failed already
+                record = pending.pop(task_id)
+                running.pop(task_id, None)
+                progress.update()
+                last_event = time.time()
+                if error is None:
+                    results.append(result)
+                    if metrics is not None:
+                        metrics.task_finished(result)
+                else:
+                    failures.append((record, error))
+                    if metrics is not None:
+                        metrics.task_failed()
+            if metrics is not None:
+                metrics.set_running(len(running))
+                metrics.publish()
+            if timeout is None:
+                continue
+            now = time.time()
+            for task_id, (pid, _, start_time) in list(running.items()):
+                if task_id not in running or task_id in reported:
+                    continue
+                if now - start_time <= timeout:
+                    continue
+                if backend != "processes":
+                    print(f"Task {task_id} exceeds {timeout} s, threads can't stop")
+                    reported.add(task_id)
+                    continue
+                # the worker may have started other tasks (in a race), they fail too
+                for other_id, (other_pid, _, _) in list(running.items()):
+                    if other_pid == pid:
+                        running.pop(other_id)
+                        failures.append(
+                            (pending.pop(other_id), f"Timeout after {timeout} s")
+                        )
+                        progress.update()
+                        if metrics is not None:
+                            metrics.task_failed()
+                kill_worker(pid)
+                recycled = True
+                # results of the batch are lost with the worker, its other tasks rerun
+                remaining = [r for r in batch_of[task_id] if r["task_id"] in pending]
+                if len(remaining) > 0:
+                    submit(remaining)
+                    last_event = now
+            if recycled and len(running) == 0 and now - last_event > timeout:
+                # tasks taken by a killed worker before reporting their start are lost
+                for record in pending.values():
+                    failures.append((record, "Lost by a recycled worker"))
+                    if metrics is not None:
+                        metrics.task_failed()
+                pending = {}
+    except KeyboardInterrupt:
+        print("....\nCaught KeyboardInterrupt, terminating workers")
+        recycled = True
+    except Exception:
+        recycled = True  # the other workers are terminated
+        raise
+    finally:
+        progress.close()
+        _started_queue = None
+        if recycled:
+            pool.terminate()  # results of killed workers would be awaited forever
+        else:
+            pool.close()
+        pool.join()
+    return results, failures
+
+
+def put_all(events: queue.Queue, items: List):
+    for item in items:
+        events.put(item)
+
+
+def get_all(events, timeout: float = None) -> List:
+    """Returns all queued events, waiting up to timeout seconds for the first one"""
+    items = []
+    try:
+        if timeout is not None:
+            items.append(events.get(timeout=timeout))
+        while True:
+            items.append(events.get_nowait())
+    except queue.Empty:
+        return items
+
+
+def kill_worker(pid: int):
+    """Kills a hanging worker process, the pool starts a new one"""
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass  # exited in the meantime
+
+
+def format_error(error: Exception) -> str:
+    return "".join(traceback.format_exception_only(type(error), error)).strip()
@@ -1,37 +1,86 @@
+import math
 import random
 
 from PIL import Image
 
-from src.config import MIN_SCALE, MAX_SCALE, MAX_UPSCALING
+from src.config import MIN_SCALE, MAX_SCALE, MAX_UPSCALING, MAX_SAMPLING_ATTEMPTS
 
 
-def augment_rotation(foreground, h, mask, max_degrees, w):
-    while True:
-        rot_degrees = random.randint(-max_degrees, max_degrees)
-        foreground_tmp = foreground.rotate(rot_degrees, expand=True)
-        mask_tmp = mask.rotate(rot_degrees, expand=True)
-        o_w, o_h = foreground_tmp.size
-        if w - o_w > 0 and h - o_h > 0:
-            break
-    mask = mask_tmp
-    foreground = foreground_tmp
-    return foreground, mask, o_h, o_w
+class SamplingError(RuntimeError):
+    """No valid augmentation was found within MAX_SAMPLING_ATTEMPTS"""
 
 
-def augment_scale(foreground, bg_h, mask, fg_h, fg_w, bg_w):
+def sample_rotation(o_w, o_h, max_degrees, bg_w, bg_h, rng=random):
+    """Samples a rotation, such that the rotated object still fits into the background
+
+    Returns:
+        tuple: Rotation in degrees and (width, height) of the rotated object
+    Raises:
+        SamplingError: If the object does not fit with any sampled rotation
+    """
+    for _ in range(MAX_SAMPLING_ATTEMPTS):
+        rot_degrees = rng.randint(-max_degrees, max_degrees)
+        r_w, r_h = get_rotated_size(o_w, o_h, rot_degrees)
+        if bg_w - r_w > 0 and bg_h - r_h > 0:
+            return rot_degrees, r_w, r_h
+    raise SamplingError(f"Object of size {o_w}x{o_h} does not fit when rotated")
+
+
+def sample_scaled_size(fg_w, fg_h, bg_w, bg_h, rng=random):
+    """Samples the (width, height) of an object relative to the background size
+
+    Raises:
+        SamplingError: If no sampled scale fits into the background
+    """
     width_scale = fg_w / bg_w
     height_scale = fg_h / bg_h
     choosen_scale = max(
         width_scale, height_scale
     )  # scale between foreground and background
-    while True:
-        scale = random.uniform(MIN_SCALE, MAX_SCALE) * (1 / choosen_scale)
+    for _ in range(MAX_SAMPLING_ATTEMPTS):
+        scale = rng.uniform(MIN_SCALE, MAX_SCALE) * (1 / choosen_scale)
         scale = min(
             scale, MAX_UPSCALING
         )  # allow only certain upscaling to prevent blurry foregrounds
         o_w, o_h = int(scale * fg_w), int(scale * fg_h)
         if bg_w - o_w > 0 and bg_h - o_h > 0 and o_w > 0 and o_h > 0:
-            break
-    foreground = foreground.resize((o_w, o_h), Image.ANTIALIAS)
-    mask = mask.resize((o_w, o_h), Image.ANTIALIAS)
-    return foreground, mask, o_h, o_w
+            return o_w, o_h
+    raise SamplingError(f"Object of size {fg_w}x{fg_h} can not be scaled to fit")
+
+
+def augment_rotation(foreground, mask, rot_degrees):
+    foreground = foreground.rotate(rot_degrees, expand=True)
+    mask = mask.rotate(rot_degrees, expand=True)
+    return foreground, mask
+
+
+def augment_scale(foreground, mask, size):
+    foreground = foreground.resize(tuple(size), Image.ANTIALIAS)
+    mask = mask.resize(tuple(size), Image.ANTIALIAS)
+    return foreground, mask
+
+
+def get_rotated_size(w, h, rot_degrees):
+    """Returns the size of Image.rotate(rot_degrees, expand=True) without rotating
+
+    Follows the computation of Pillow, such that layouts can be planned from the image
+    sizes only.
+    """
+    rot_degrees = rot_degrees % 360.0
+    if rot_degrees in (0, 180):
+        return w, h
+    if rot_degrees in (90, 270):
+        return h, w
+    angle = -math.radians(rot_degrees)
+    a, b = round(math.cos(angle), 15), round(math.sin(angle), 15)
+    d, e = round(-math.sin(angle), 15), round(math.cos(angle), 15)
+    center_x, center_y = w / 2.0, h / 2.0
+    c = a * -center_x + b * -center_y + center_x
+    f = d * -center_x + e * -center_y + center_y
+    corners = [(0, 0), (w, 0), (w, h), (0, h)]
+    xx = [a * x + b * y + c for x, y in corners]
+    yy = [d * x + e * y + f for x, y in corners]
+    return (
+        math.ceil(max(xx)) - math.floor(min(xx)),
+        math.ceil(max(yy)) - math.floor(min(yy)),
+    )
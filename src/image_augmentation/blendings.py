@@ -10,26 +10,49 @@ from PIL import Image
 
 root_dir = Path(__file__).parent.parent.parent
 
+from src.config import TASK_TIMEOUT
+from src.generator.profiling import profile_stage
 from src.generator.utils import PIL2array1C, PIL2array3C
-from src.image_augmentation.pb import create_mask, poisson_blend
 from src.image_augmentation.gamma_correction import adjust_gamma_of_image
 
 
+def sample_blending_parameters(blending_type, rng=random):
+    """Samples the random parameters of a blending, empty if it has none
+
+    Returns:
+        dict: Parameters passed to apply_blendings_and_paste_onto_background
+    """
+    params = {}
+    if blending_type in ["gamma_correction", "mixed"]:
+        params["gamma"] = 1 + ((rng.random() + 0.5) * 0.25)
+    if blending_type in ["illumination", "mixed"]:
+        params["alpha"] = 1.75 + ((rng.random() - 0.25) * 1)
+        params["beta"] = (rng.random()) * 0.3
+    if blending_type == "mixed":
+        params["mask_adjustment"] = rng.choice(["none", "gaussian", "blur"])
+    return params
+
+
 def apply_blendings_and_paste_onto_background(
-    backgrounds, blending_list, foreground, mask, x, y
+    backgrounds, blending_list, foreground, mask, x, y, blending_params
 ):
+    foreground_array = None  # shared by the photometric blendings
     for i in range(len(blending_list)):
-        new_foreground = foreground.copy()
-        new_mask = mask.copy()
+        params = blending_params[i]
+        # pasting does not change foreground and mask, thus they are not copied
+        new_foreground = foreground
+        new_mask = mask
         # Cases
         if blending_list[i] in ["none", "motion"]:
-            pass  # both are only copied
+            pass  # both are pasted as they are
         elif blending_list[i] == "gaussian":
             new_mask = Image.fromarray(
-                cv2.GaussianBlur(PIL2array1C(new_mask), (5, 5), 2)
+                cv2.GaussianBlur(PIL2array1C(new_mask, copy=False), (5, 5), 2)
             )
         elif blending_list[i] == "box":
-            new_mask = Image.fromarray(cv2.blur(PIL2array1C(new_mask), (3, 3)))
+            new_mask = Image.fromarray(
+                cv2.blur(PIL2array1C(new_mask, copy=False), (3, 3))
+            )
         elif blending_list[i].startswith("poisson"):
             if blending_list[i] == "poisson":
                 backgrounds[i] = apply_poisson_blending(
@@ -43,14 +66,20 @@ def apply_blendings_and_paste_onto_background(
                 except Exception as e:
                     print(f"Error: {e}; are you sure you have CUDA enabled?")
             continue
-        elif blending_list[i] == "gamma_correction":
-            new_foreground = apply_gamma_correction(new_foreground)
-        elif blending_list[i] == "illumination":
-            new_foreground = apply_illumination_change(new_foreground, new_mask)
-        elif blending_list[i] == "mixed":
-            new_foreground = apply_gamma_correction(new_foreground)
-            new_foreground = apply_illumination_change(new_foreground, new_mask)
-            new_mask = apply_random_mask_adjustment(new_mask)
+        elif blending_list[i] in ["gamma_correction", "illumination", "mixed"]:
+            # both augmentations work on uint8 arrays, converted once per object
+            if foreground_array is None:
+                foreground_array = PIL2array3C(foreground, copy=False)
+            img = foreground_array
+            if "gamma" in params:
+                img = apply_gamma_correction(img, params["gamma"])
+            if "alpha" in params:
+                img = apply_illumination_change(
+                    img, PIL2array1C(mask, copy=False), params["alpha"], params["beta"]
+                )
+            new_foreground = Image.fromarray(img, "RGB")
+            if blending_list[i] == "mixed":
+                new_mask = apply_mask_adjustment(new_mask, params["mask_adjustment"])
         else:
             raise NotImplementedError(
                 f"Could not find blending of type: {blending_list[i]}"
@@ -59,6 +88,13 @@ def apply_blendings_and_paste_onto_background(
 
 
 def apply_poisson_blending(foreground, mask, background, offset):
+    with profile_stage("poisson"):
+        return _apply_poisson_blending(foreground, mask, background, offset)
+
+
+def _apply_poisson_blending(foreground, mask, background, offset):
+    from src.image_augmentation.pb import poisson_blend  # scipy is only needed here
+
     (
         img_mask,
         img_src,
@@ -76,9 +112,11 @@ def apply_poisson_blending(foreground, mask, background, offset):
 
 
 def create_temporary_input_for_poisson_blending(background, foreground, mask, offset):
-    img_mask = PIL2array1C(mask)
-    img_src = PIL2array3C(foreground).astype(np.float64)
-    img_target = PIL2array3C(background)
+    from src.image_augmentation.pb import create_mask
+
+    img_mask = PIL2array1C(mask, copy=False)
+    img_src = PIL2array3C(foreground, copy=False).astype(np.float64)
+    img_target = PIL2array3C(background, copy=False)
     img_mask, img_src, offset_adj = create_mask(
         img_mask.astype(np.float64), img_target, img_src, offset=offset
     )
@@ -111,34 +149,59 @@ def apply_poisson_blending_fast(foreground, mask, background, offset, backend="c
     )
     cmd = f"fpie -s {src_path} -m {mask_path} -t {target_path} -o {result_path.resolve()} -h1 {offset_adj[0]} -w1 {offset[1]} -b {backend} -n 5000 -g src"
     process = subprocess.Popen(cmd.split(" "))
-    process.wait()
+    try:
+        process.wait(timeout=TASK_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()  # otherwise it outlives a recycled worker
+        process.wait()
+        shutil.rmtree(tmp_dir)
+        raise
     new_background = Image.open(result_path)
     shutil.rmtree(tmp_dir)
     return new_background
 
 
-def apply_illumination_change(img, mask):
-    alpha = 1.75 + ((random.random() - 0.25) * 1)
-    beta = (random.random()) * 0.3
-    foreground = cv2.illuminationChange(
-        PIL2array3C(img), PIL2array1C(mask), alpha=alpha, beta=beta
+def apply_illumination_change(img, mask, alpha, beta):
+    """Changes the illumination of an RGB array inside the mask
+
+    The Poisson solve of cv2.illuminationChange covers the whole array, thus it is
+    confined to the bounding box of the mask (with a margin of one pixel for the
+    boundary), which skips the transparent corners of rotated objects.
+
+    Args:
+        img(np.ndarray): RGB uint8 array of shape (h, w, 3)
+        mask(np.ndarray): uint8 array of shape (h, w)
+    Returns:
+        np.ndarray: New RGB uint8 array
+    """
+    x, y, w, h = cv2.boundingRect(mask)
+    if w == 0 or h == 0:
+        return img
+    x0, y0 = max(x - 1, 0), max(y - 1, 0)
+    x1, y1 = min(x + w + 1, img.shape[1]), min(y + h + 1, img.shape[0])
+    changed = cv2.illuminationChange(
+        np.ascontiguousarray(img[y0:y1, x0:x1]),
+        mask[y0:y1, x0:x1].copy(),  # OpenCV modifies the mask
+        alpha=alpha,
+        beta=beta,
     )
-    foreground = Image.fromarray(foreground, "RGB")
-    return foreground
+    img = img.copy()
+    img[y0:y1, x0:x1] = changed
+    return img
 
 
-def apply_gamma_correction(img):
-    img = adjust_gamma_of_image(PIL2array3C(img), 1 + ((random.random() + 0.5) * 0.25))
-    img = Image.fromarray(img, "RGB")
-    return img
+def apply_gamma_correction(img, gamma):
+    """Applies a (cached) gamma lookup table to an RGB uint8 array"""
+    return adjust_gamma_of_image(img, gamma)
 
 
-def apply_random_mask_adjustment(mask):
-    choice = random.choice(["none", "gaussian", "blur"])
-    if choice == "gaussian":
-        mask = Image.fromarray(cv2.GaussianBlur(PIL2array1C(mask), (3, 3), 2))
-    elif choice == "box":
-        mask = Image.fromarray(cv2.blur(PIL2array1C(mask), (3, 3)))
+def apply_mask_adjustment(mask, adjustment):
+    if adjustment == "gaussian":
+        mask = Image.fromarray(
+            cv2.GaussianBlur(PIL2array1C(mask, copy=False), (3, 3), 2)
+        )
+    elif adjustment == "box":
+        mask = Image.fromarray(cv2.blur(PIL2array1C(mask, copy=False), (3, 3)))
     else:
         pass
     return mask
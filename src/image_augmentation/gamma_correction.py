@@ -1,11 +1,20 @@
+from functools import lru_cache
+
 import numpy as np
 import cv2
 
+GAMMA_DECIMALS = 3  # gamma values are quantized, such that their tables can be reused
+
 
 def adjust_gamma_of_image(image, gamma=1.0):
     # https://stackoverflow.com/a/41061351
+    return cv2.LUT(image, get_gamma_table(round(gamma, GAMMA_DECIMALS)))
+
+
+@lru_cache(maxsize=1024)
+def get_gamma_table(gamma):
+    """Returns the (read-only) lookup table of a gamma correction of uint8 images"""
     invGamma = 1.0 / gamma
-    table = np.array(
-        [((i / 255.0) ** invGamma) * 255 for i in np.arange(0, 256)]
-    ).astype("uint8")
-    return cv2.LUT(image, table)
+    table = (((np.arange(0, 256) / 255.0) ** invGamma) * 255).astype("uint8")
+    table.flags.writeable = False
+    return table
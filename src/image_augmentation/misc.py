@@ -8,7 +8,7 @@ from src.models.auxiliary import ImgSize, ImgPosition
 def create_full_size_and_sharpened_mask(
     mask, original_size: ImgSize, paste_position: ImgPosition, threshold=200
 ):
-    mask = PIL2array1C(mask)
+    mask = PIL2array1C(mask, copy=False)
     full_mask = np.zeros((original_size.height, original_size.width))
     # sharpen mask
     sharp_mask = np.zeros_like(mask)
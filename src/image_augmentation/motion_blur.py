@@ -1,49 +1,115 @@
 import math
+import random
+from functools import lru_cache
 
+import cv2
 import numpy as np
 from PIL import Image
-from pyblur import LinearMotionBlur
 
-from src.generator.utils import PIL2array1C
+LINE_LENGTHS = [3, 5, 7, 9]
+LINE_TYPES = ["right", "left", "full"]
 
 
-def LinearMotionBlur3C(img):
+def LinearMotionBlur3C(img, rng=random):
     """Performs motion blur on an image with 3 channels. Used to simulate
        blurring caused due to motion of camera.
 
     Args:
         img(NumPy Array): Input image with 3 channels
+        rng(random.Random): Random number generator
 
     Returns:
         Image: Blurred image by applying a motion blur with random parameters
     """
-    lineLengths = [3, 5, 7, 9]
-    lineTypes = ["right", "left", "full"]
-    lineLengthIdx = np.random.randint(0, len(lineLengths))
-    lineTypeIdx = np.random.randint(0, len(lineTypes))
-    lineLength = lineLengths[lineLengthIdx]
-    lineType = lineTypes[lineTypeIdx]
-    lineAngle = randomAngle(lineLength)
-    blurred_img = img
-    for i in range(3):
-        blurred_img[:, :, i] = PIL2array1C(
-            LinearMotionBlur(img[:, :, i], lineLength, lineAngle, lineType)
-        )
+    return apply_motion_blur(img, **sample_motion_blur_parameters(rng))
+
+
+def sample_motion_blur_parameters(rng=random):
+    """Samples length, angle and type of the line kernel of a motion blur
+
+    Returns:
+        dict: Keyword arguments of apply_motion_blur
+    """
+    lineLengthIdx = rng.randrange(len(LINE_LENGTHS))
+    lineTypeIdx = rng.randrange(len(LINE_TYPES))
+    lineLength = LINE_LENGTHS[lineLengthIdx]
+    lineType = LINE_TYPES[lineTypeIdx]
+    lineAngle = randomAngle(lineLength, rng)
+    return {"length": lineLength, "angle": lineAngle, "linetype": lineType}
+
+
+def apply_motion_blur(img, length, angle, linetype):
+    """Blurs an image with 3 channels with the given line kernel
+
+    Args:
+        img(NumPy Array): Input image with 3 channels
+        length(int): Size of the kernel
+        angle(float): Angle of the line in degrees
+        linetype(str): "full", "left" or "right"
+
+    Returns:
+        Image: Blurred image
+    """
+    kernel = LineKernel(length, angle, linetype)
+    blurred_img = cv2.filter2D(img, -1, kernel)  # all channels at once
     blurred_img = Image.fromarray(blurred_img, "RGB")
     return blurred_img
 
 
-def randomAngle(kerneldim):
+def randomAngle(kerneldim, rng=random):
     """Returns a random angle used to produce motion blurring
 
     Args:
         kerneldim (int): size of the kernel used in motion blurring
+        rng(random.Random): Random number generator
 
     Returns:
-        int: Random angle
+        float: Random angle
     """
+    validLineAngles = getValidLineAngles(kerneldim)
+    angleIdx = rng.randrange(len(validLineAngles))
+    return validLineAngles[angleIdx]
+
+
+@lru_cache(maxsize=None)
+def getValidLineAngles(kerneldim):
+    """Returns the angles of all distinct lines that fit into a kernel of size kerneldim"""
     kernelCenter = int(math.floor(kerneldim / 2))
     numDistinctLines = kernelCenter * 4
-    validLineAngles = np.linspace(0, 180, numDistinctLines, endpoint=False)
-    angleIdx = np.random.randint(0, len(validLineAngles))
-    return int(validLineAngles[angleIdx])
+    return tuple(np.linspace(0, 180, numDistinctLines, endpoint=False).tolist())
+
+
+@lru_cache(maxsize=None)
+def LineKernel(dim, angle, linetype):
+    """Creates a normalized line kernel (compatible with pyblur.LineKernel)
+
+    Only lengths in LINE_LENGTHS, the angles of getValidLineAngles and LINE_TYPES are
+    sampled, so all kernels ever used are computed once and cached.
+
+    Args:
+        dim(int): Size of the quadratic kernel
+        angle(float): Angle of the line in degrees
+        linetype(str): "full" line through the center or "left"/"right" half line
+
+    Returns:
+        NumPy Array: Kernel of shape (dim, dim) that sums up to 1
+    """
+    kernelCenter = int(math.floor(dim / 2))
+    # find line end points on the kernel border
+    rad = math.radians(angle)
+    d_row, d_col = math.sin(rad), math.cos(rad)
+    border_scale = kernelCenter / max(abs(d_row), abs(d_col))
+    d_row, d_col = int(round(d_row * border_scale)), int(round(d_col * border_scale))
+    start = (kernelCenter - d_col, kernelCenter + d_row)  # (x, y) for OpenCV
+    end = (kernelCenter + d_col, kernelCenter - d_row)
+    if linetype == "right":
+        start = (kernelCenter, kernelCenter)
+    elif linetype == "left":
+        end = (kernelCenter, kernelCenter)
+    kernel = np.zeros((dim, dim), dtype=np.float32)
+    cv2.line(kernel, start, end, 1.0, thickness=1, lineType=cv2.LINE_8)
+    kernel /= np.count_nonzero(kernel)
+    # pyblur convolves, while cv2.filter2D correlates, thus flip the kernel
+    kernel = np.ascontiguousarray(kernel[::-1, ::-1])
+    kernel.flags.writeable = False
+    return kernel
@@ -6,16 +6,16 @@ from src.image_augmentation.misc import overlap
 
 
 def find_valid_object_position(
-    already_syn, dontocclude, h, o_h, o_w, w, xmax, xmin, ymax, ymin
+    already_syn, dontocclude, h, o_h, o_w, w, xmax, xmin, ymax, ymin, rng=random
 ):
     attempt = 0
     while True:
         attempt += 1
-        x = random.randint(
+        x = rng.randint(
             int(-MAX_TRUNCATION_FRACTION * o_w),
             int(w - o_w + MAX_TRUNCATION_FRACTION * o_w),
         )
-        y = random.randint(
+        y = rng.randint(
             int(-MAX_TRUNCATION_FRACTION * o_h),
             int(h - o_h + MAX_TRUNCATION_FRACTION * o_h),
         )
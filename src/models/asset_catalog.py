@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.models.asset_index import get_asset_mask_dir, load_asset_index
+from src.models.img_data import CATEGORY_IDS, ImgDataRGBA
+
+SPLIT_TYPES = ["test", "train", "validation"]
+
+
+class AssetCatalog:
+    """Compact index of all assets listed in a split file
+
+    The split file is parsed once for all splits. Only relative paths (as bytes), label
+    IDs, split IDs, sizes, bounding boxes and content hashes are kept in NumPy arrays, so
+    that even pools with millions of assets stay small. Sizes, bounding boxes and hashes
+    are taken from the asset index of the preprocessing if it exists. Assets are sampled
+    by integer index and only materialised (see materialise) when they are rendered.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        rel_paths: List[str],
+        split_ids: List[int],
+        label: Optional[str] = None,
+    ):
+        self.base_path = base_path
+        self.label = label
+        self.rel_paths = np.array([p.encode("utf-8") for p in rel_paths], dtype=bytes)
+        self.split_ids = np.array(split_ids, dtype=np.int8)
+        label_id = CATEGORY_IDS[label] if label is not None else -1
+        self.label_ids = np.full(len(rel_paths), label_id, dtype=np.int16)
+        self.sizes = np.full((len(rel_paths), 2), -1, dtype=np.int32)  # (w, h)
+        self.bboxes = np.full((len(rel_paths), 4), -1, dtype=np.int32)  # x/y min/max
+        self.hashes = np.zeros(len(rel_paths), dtype="S40")  # empty if not indexed
+        self.valid = np.ones(len(rel_paths), dtype=bool)
+        self.mask_dir = None
+        self._split_indices = {}
+
+    def add_asset_index(self, assets: Dict[str, Dict], mask_dir: Path):
+        """Adds the metadata of the preprocessing (see src/generator/preprocess.py)"""
+        self.mask_dir = mask_dir
+        for idx, rel_path in enumerate(self.rel_paths):
+            entry = assets.get(rel_path.decode("utf-8"))
+            if entry is None:
+                continue
+            if "error" in entry:
+                self.valid[idx] = False
+                continue
+            self.hashes[idx] = entry["sha1"].encode("ascii")
+            self.sizes[idx] = entry["size"]
+            self.bboxes[idx] = entry["bbox"]
+        self._split_indices = {}
+
+    @classmethod
+    def from_split_file(
+        cls, json_file: Union[str, Path], label: Optional[str] = None
+    ) -> "AssetCatalog":
+        if isinstance(json_file, str):
+            json_file = Path(json_file)
+        assert json_file.exists(), f"File {json_file.resolve()} does not exist!"
+        with json_file.open("r") as f:
+            data = json.load(f)
+        base_path = json_file.parent
+        if data.get("path", None) is not None and Path(data["path"]).exists():
+            base_path = Path(data["path"])
+        rel_paths, split_ids = [], []
+        for split_id, split_type in enumerate(SPLIT_TYPES):
+            rel_paths += data.get(split_type, [])
+            split_ids += [split_id] * len(data.get(split_type, []))
+        catalog = cls(base_path, rel_paths, split_ids, label)
+        assets = load_asset_index(json_file)
+        if len(assets) > 0:
+            catalog.add_asset_index(assets, get_asset_mask_dir(json_file))
+        return catalog
+
+    def __len__(self):
+        return len(self.rel_paths)
+
+    def get_split_indices(self, split_type: str) -> np.ndarray:
+        if split_type not in self._split_indices:
+            split_id = SPLIT_TYPES.index(split_type)
+            self._split_indices[split_type] = np.flatnonzero(
+                (self.split_ids == split_id) & self.valid
+            )
+        return self._split_indices[split_type]
+
+    def get_path(self, idx: int) -> Path:
+        return self.base_path / self.rel_paths[idx].decode("utf-8")
+
+    def get_size(self, idx: int) -> Tuple[int, int]:
+        """Returns (width, height), reading only the image header if not indexed yet"""
+        if self.sizes[idx, 0] < 0:
+            with Image.open(self.get_path(idx)) as img:
+                self.sizes[idx] = img.size
+        return int(self.sizes[idx, 0]), int(self.sizes[idx, 1])
+
+    def get_metadata(self, idx: int) -> Dict:
+        if len(self.hashes[idx]) == 0:
+            return {}
+        sha1 = self.hashes[idx].decode("ascii")
+        return {
+            "sha1": sha1,
+            "bbox": self.bboxes[idx].tolist(),
+            "mask": (self.mask_dir / f"{sha1}.png").as_posix(),
+        }
+
+    def materialise(self, idx: int) -> ImgDataRGBA:
+        return ImgDataRGBA(
+            self.get_path(idx),
+            self.label,
+            label_id=int(self.label_ids[idx]),
+            metadata=self.get_metadata(idx),
+        )
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        arrays = [
+            self.rel_paths,
+            self.split_ids,
+            self.label_ids,
+            self.sizes,
+            self.bboxes,
+            self.hashes,
+            self.valid,
+        ]
+        return {"assets": len(self), "bytes": sum(a.nbytes for a in arrays)}
@@ -0,0 +1,54 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Union
+
+from src.config import INVERTED_MASK, MINFILTER_SIZE
+
+ASSET_INDEX_VERSION = 1
+ASSET_INDEX_FILE_NAME = "asset_index.json"  # sidecar next to the split file
+ASSET_MASK_DIR_NAME = "asset_masks"  # filtered masks, named by content hash
+
+
+def get_asset_index_path(split_file: Union[str, Path]) -> Path:
+    return Path(split_file).parent / ASSET_INDEX_FILE_NAME
+
+
+def get_asset_mask_dir(split_file: Union[str, Path]) -> Path:
+    return Path(split_file).parent / ASSET_MASK_DIR_NAME
+
+
+def load_asset_index(split_file: Union[str, Path]) -> Dict[str, Dict]:
+    """Loads the asset metadata written by the preprocessing (see src/generator/preprocess.py)
+
+    Returns:
+        dict: Entry for each relative asset path, empty if there is no valid index
+    """
+    index_path = get_asset_index_path(split_file)
+    if not index_path.exists():
+        return {}
+    with index_path.open("r") as f:
+        index = json.load(f)
+    settings = (
+        index.get("version"),
+        index.get("minfilter_size"),
+        index.get("inverted"),
+    )
+    if settings != (ASSET_INDEX_VERSION, MINFILTER_SIZE, INVERTED_MASK):
+        print(f"Ignoring outdated asset index {index_path}, please rerun preprocessing")
+        return {}
+    return index["assets"]
+
+
+def save_asset_index(split_file: Union[str, Path], assets: Dict[str, Dict]):
+    index_path = get_asset_index_path(split_file)
+    index = {
+        "version": ASSET_INDEX_VERSION,
+        "minfilter_size": MINFILTER_SIZE,
+        "inverted": INVERTED_MASK,
+        "assets": assets,
+    }
+    tmp_path = index_path.with_suffix(".tmp")
+    with tmp_path.open("w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Dict
 
 import cv2
 import numpy as np
@@ -7,17 +8,57 @@ from PIL import Image, ImageFilter
 from src.config import INVERTED_MASK, MINFILTER_SIZE
 from src.config import OBJECT_CATEGORIES
 
+CATEGORY_IDS = {f["name"]: f["id"] for f in OBJECT_CATEGORIES}
+
+
+def get_bbox_of_mask(mask: np.ndarray):
+    """Returns the bounding box (xmin, xmax, ymin, ymax) of a mask, -1s if it is empty"""
+    if INVERTED_MASK:
+        mask = 255 - mask
+    rows = np.any(mask, axis=1)
+    cols = np.any(mask, axis=0)
+    if len(np.where(rows)[0]) > 0:
+        ymin, ymax = np.where(rows)[0][[0, -1]]
+        xmin, xmax = np.where(cols)[0][[0, -1]]
+        return int(xmin), int(xmax), int(ymin), int(ymax)
+    else:
+        return -1, -1, -1, -1
+
 
 class BaseImgData:
-    def __init__(self, img_path: Path, label: str):
+    def __init__(
+        self, img_path: Path, label: str, label_id: int = None, metadata: Dict = None
+    ):
+        """
+        Args:
+            img_path(Path): Path of the image
+            label(str): Category name
+            label_id(int): Category ID, looked up from label if not given
+            metadata(dict): Precomputed "bbox" and "mask" path (see asset_index.py)
+        """
         self.img_path = img_path
         self.label = label
-        self.label_id = [f["id"] for f in OBJECT_CATEGORIES if label == f["name"]][0]
+        self.label_id = label_id if label_id is not None else CATEGORY_IDS[label]
+        self.metadata = metadata if metadata is not None else {}
         self.load_complementary_data()
 
     def __str__(self):
         return f"Label {self.label} from {self.img_path}"
 
+    def to_dict(self) -> Dict:
+        return {
+            "path": self.img_path.as_posix(),
+            "label": self.label,
+            "label_id": self.label_id,
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BaseImgData":
+        return cls(
+            Path(data["path"]), data["label"], data["label_id"], data["metadata"]
+        )
+
     def load_complementary_data(self):
         raise NotImplementedError("Should be implemented by subclass")
 
@@ -40,23 +81,21 @@ class BaseImgData:
         Returns:
             tuple: Bounding box annotation (xmin, xmax, ymin, ymax)
         """
-        mask = self.get_mask(opencv=True)
-        if mask is not None:
-            if INVERTED_MASK:
-                mask = 255 - mask
-            rows = np.any(mask, axis=1)
-            cols = np.any(mask, axis=0)
-            if len(np.where(rows)[0]) > 0:
-                ymin, ymax = np.where(rows)[0][[0, -1]]
-                xmin, xmax = np.where(cols)[0][[0, -1]]
-                return (
-                    int(scale * xmin),
-                    int(scale * xmax),
-                    int(scale * ymin),
-                    int(scale * ymax),
-                )
-            else:
+        if "bbox" in self.metadata:
+            bbox = self.metadata["bbox"]
+        else:
+            mask = self.get_mask(opencv=True)
+            bbox = get_bbox_of_mask(mask) if mask is not None else None
+        if bbox is not None:
+            if bbox[0] < 0:
                 return -1, -1, -1, -1
+            xmin, xmax, ymin, ymax = bbox
+            return (
+                int(scale * xmin),
+                int(scale * xmax),
+                int(scale * ymin),
+                int(scale * ymax),
+            )
         else:
             print("Mask not found. Using empty mask instead.")
             return -1, -1, -1, -1
@@ -76,13 +115,22 @@ class BaseImgData:
 
 
 class ImgDataRGBA(BaseImgData):
-    def __init__(self, img_path: Path, label):
-        super().__init__(img_path, label)
+    def __init__(
+        self, img_path: Path, label, label_id: int = None, metadata: Dict = None
+    ):
+        super().__init__(img_path, label, label_id, metadata)
 
     def load_complementary_data(self):
         pass
 
     def get_mask(self, opencv=False):
+        mask_path = self.metadata.get("mask")
+        if mask_path is not None and Path(mask_path).exists():
+            mask = Image.open(mask_path)  # already filtered during preprocessing
+            mask.load()
+            if opencv:
+                mask = np.asarray(mask).astype(np.uint8)
+            return mask
         with open(self.img_path.as_posix(), "rb") as f:
             image = Image.open(f)
             if image.mode == "RGBA":
@@ -0,0 +1,49 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.append(ROOT.as_posix())
+import argparse
+import json
+from src.generator.autotune import (
+    AUTOTUNE_FILE,
+    autotune_workers,
+    save_autotune_result,
+)
+
+DATA_DIR = ROOT / "data"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Find the number of workers with the best throughput on this machine"
+    )
+    parser.add_argument(
+        "--images", type=int, default=8, help="minimum images per calibration run"
+    )
+    parser.add_argument(
+        "--candidates", type=int, nargs="*", help="numbers of workers to try"
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        help="memory in MB the workers may use (default: 80%% of the available memory)",
+    )
+    parser.add_argument(
+        "--output", default=AUTOTUNE_FILE.as_posix(), help="file of the chosen settings"
+    )
+    args = parser.parse_args()
+
+    result = autotune_workers(
+        object_json=(DATA_DIR / "objects/splits.json").as_posix(),
+        distractor_json=(DATA_DIR / "distractors/splits.json").as_posix(),
+        background_json=(DATA_DIR / "backgrounds/splits.json").as_posix(),
+        num_images=args.images,
+        candidates=args.candidates,
+        memory_limit=(
+            args.memory_limit * 1024**2 if args.memory_limit is not None else None
+        ),
+    )
+    save_autotune_result(result, Path(args.output))
+    print(json.dumps({k: v for k, v in result.items() if k != "measurements"}))
+    print(f"Saved to {args.output}")
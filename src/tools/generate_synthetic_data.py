@@ -3,24 +3,80 @@ import sys
 
 ROOT = Path(__file__).parent.parent.parent
 sys.path.append(ROOT.as_posix())
+import argparse
 import shutil
-import random
-import numpy as np
-from src.generator.handler import generate_synthetic_dataset
+from src.config import EXECUTION_BACKEND, METRICS_FILE, METRICS_PORT
+from src.generator.handler import generate_synthetic_dataset, get_next_task_ids
 
 seed = 42
-random.seed(seed)
-np.random.seed(seed)
 
 DATA_DIR = ROOT / "data"
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run instead of starting from scratch",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="add the images to the existing dataset instead of starting from scratch",
+    )
+    parser.add_argument(
+        "--num-shards",
+        type=int,
+        default=1,
+        help="split the dataset into shards, e.g. to render it on several machines",
+    )
+    parser.add_argument(
+        "--shard-index", type=int, default=0, help="shard rendered by this run"
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="report the memory usage of the workers (slower)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only estimate wall time, CPU-hours, memory and disk usage of the run",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["processes", "threads"],
+        default=EXECUTION_BACKEND,
+        help="run the workers as processes or as threads of one process (less memory)",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=METRICS_FILE,
+        help="write live metrics in the Prometheus text format to this file",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="serve live metrics at http://localhost:<port>/metrics",
+    )
+    args = parser.parse_args()
+
     dataset_name = "demo_dataset"  # Give your dataset a name
     output_dir = (DATA_DIR / dataset_name).resolve()
-    if output_dir.exists():
-        shutil.rmtree(output_dir.as_posix())
-    output_dir.mkdir()
+    first_task_ids = None
+    if args.num_shards > 1:
+        if args.append:  # all shards continue after the images of the merged dataset
+            first_task_ids = get_next_task_ids(output_dir)
+        # merge the shards afterwards with src/tools/merge_shards.py
+        output_dir = (
+            output_dir / f"shard-{args.shard_index:03d}-of-{args.num_shards:03d}"
+        )
+    if not args.dry_run:  # a dry run writes nothing
+        if output_dir.exists() and not (args.resume or args.append):
+            shutil.rmtree(output_dir.as_posix())
+        output_dir.mkdir(parents=True, exist_ok=True)
     docker = False
     if not docker:
         # Adjust paths here if you are not using Docker
@@ -45,4 +101,15 @@ if __name__ == "__main__":
         rotation=True,  # enable random rotation of objects
         scale=True,  # enable random scaling of objects
         multithreading=True,  # enable multithreading for faster dataset generation
+        resume=args.resume,
+        seed=seed,  # same seed gives the same dataset (for any number of workers)
+        num_shards=args.num_shards,
+        shard_index=args.shard_index,
+        append=args.append,
+        profile_memory=args.profile_memory,
+        backend=args.backend,
+        dry_run=args.dry_run,
+        metrics_file=args.metrics_file,
+        metrics_port=args.metrics_port,
+        first_task_ids=first_task_ids,
     )
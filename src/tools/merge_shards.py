@@ -0,0 +1,34 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.append(ROOT.as_posix())
+import argparse
+from src.generator.join_annotations import merge_shards
+
+DATA_DIR = ROOT / "data"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Merge the annotation files of shards into the final split files"
+    )
+    parser.add_argument(
+        "--dataset-dir",
+        default=(DATA_DIR / "demo_dataset").as_posix(),
+        help="output directory of the merged annotations",
+    )
+    parser.add_argument(
+        "shard_dirs",
+        nargs="*",
+        help="output directories of the shards (default: all shard-* in dataset dir)",
+    )
+    args = parser.parse_args()
+
+    dataset_dir = Path(args.dataset_dir).resolve()
+    if len(args.shard_dirs) > 0:
+        shard_dirs = [Path(d).resolve() for d in args.shard_dirs]
+    else:
+        shard_dirs = sorted(d for d in dataset_dir.glob("shard-*") if d.is_dir())
+    assert len(shard_dirs) > 0, f"No shards found in {dataset_dir}"
+    merge_shards(shard_dirs, dataset_dir)
@@ -0,0 +1,35 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.append(ROOT.as_posix())
+import argparse
+from src.config import NUMBER_OF_WORKERS
+from src.generator.preprocess import preprocess_assets
+
+DATA_DIR = ROOT / "data"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Tight-crop objects and distractors and index their metadata"
+    )
+    parser.add_argument(
+        "split_files",
+        nargs="*",
+        default=[
+            (DATA_DIR / "objects/splits.json").as_posix(),
+            (DATA_DIR / "distractors/splits.json").as_posix(),
+        ],
+        help="split files of the assets (default: demo objects and distractors)",
+    )
+    parser.add_argument("--no-crop", action="store_true", help="only index assets")
+    parser.add_argument("--workers", type=int, default=NUMBER_OF_WORKERS)
+    args = parser.parse_args()
+
+    summary = preprocess_assets(
+        args.split_files, crop=not args.no_crop, num_workers=args.workers
+    )
+    print(f"Preprocessing done: {summary}")
+    if summary["invalid"] > 0:
+        sys.exit(1)  # generation would skip these assets
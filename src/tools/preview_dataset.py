@@ -0,0 +1,47 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.append(ROOT.as_posix())
+import argparse
+from src.config import PREVIEW_SCALE
+from src.generator.preview import generate_preview
+
+DATA_DIR = ROOT / "data"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render low resolution previews of a dataset onto contact sheets"
+    )
+    parser.add_argument(
+        "--images", type=int, default=50, help="number of train images to preview"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="seed of the dataset")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=PREVIEW_SCALE,
+        help="size of the previews relative to the generated images",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=(DATA_DIR / "preview").as_posix(),
+        help="directory of the contact sheets",
+    )
+    args = parser.parse_args()
+
+    sheets = generate_preview(
+        output_dir=args.output_dir,
+        object_json=str(ROOT / "data/objects/splits.json"),
+        distractor_json=str(ROOT / "data/distractors/splits.json"),
+        background_json=str(ROOT / "data/backgrounds/splits.json"),
+        number_of_images={"train": args.images, "validation": 0, "test": 0},
+        dontocclude=True,
+        rotation=True,
+        scale=True,
+        seed=args.seed,
+        preview_scale=args.scale,
+    )
+    for split_type, sheet in sheets.items():
+        print(f"Saved preview of {split_type} to {sheet}")
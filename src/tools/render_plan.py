@@ -0,0 +1,44 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.append(ROOT.as_posix())
+import argparse
+from src.config import EXECUTION_BACKEND
+from src.generator.handler import render_plan
+from src.generator.plan import PLAN_FILE_NAME
+
+DATA_DIR = ROOT / "data"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render the images of an existing plan again"
+    )
+    parser.add_argument(
+        "--split-dir",
+        default=(DATA_DIR / "demo_dataset" / "train").as_posix(),
+        help="output directory of the split containing the plan file",
+    )
+    parser.add_argument(
+        "--tasks", type=int, nargs="*", help="task IDs to render (default: all)"
+    )
+    parser.add_argument(
+        "--single-process", action="store_true", help="disable multiprocessing"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["processes", "threads"],
+        default=EXECUTION_BACKEND,
+        help="run the workers as processes or as threads of one process (less memory)",
+    )
+    args = parser.parse_args()
+
+    plan_file = Path(args.split_dir).resolve() / PLAN_FILE_NAME
+    assert plan_file.exists(), f"No plan found at {plan_file}"
+    render_plan(
+        plan_file,
+        args.tasks,
+        multithreading=not args.single_process,
+        backend=args.backend,
+    )
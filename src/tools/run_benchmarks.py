@@ -0,0 +1,85 @@
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.append(ROOT.as_posix())
+import argparse
+from src.benchmarks.pipeline import STAGES, benchmark_pipeline
+from src.benchmarks.utils import compare_to_baseline, load_results, save_results
+from src.config import NUMBER_OF_WORKERS
+
+BASELINE_FILE = ROOT / "src/benchmarks/baseline.json"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generation pipeline on the bundled assets"
+    )
+    parser.add_argument(
+        "--stages", nargs="*", default=STAGES, choices=STAGES, help="stages to run"
+    )
+    parser.add_argument("--repeats", type=int, default=10, help="timed calls per stage")
+    parser.add_argument(
+        "--join-sizes",
+        type=int,
+        nargs="*",
+        default=[10000, 100000],
+        help="number of annotation files joined",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="*",
+        default=[1, 4, NUMBER_OF_WORKERS],
+        help="number of workers of the end-to-end and backend runs",
+    )
+    parser.add_argument(
+        "--images", type=int, default=8, help="number of images of end-to-end runs"
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="file of the results"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE.as_posix(),
+        help="results to compare against, required unless --save-baseline is given",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as new baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown relative to the baseline that counts as regression",
+    )
+    args = parser.parse_args()
+
+    results = benchmark_pipeline(
+        args.stages, args.repeats, args.join_sizes, args.workers, args.images
+    )
+    for name, stats in results.items():
+        if "peak_rss" in stats:
+            print(f"{name}: peak RSS {stats['peak_rss'] / 1024 / 1024:.1f} MB")
+    save_results(results, Path(args.output))
+    print(f"Saved results to {args.output}")
+    regressions = []
+    if Path(args.baseline).exists():
+        regressions = compare_to_baseline(
+            results, load_results(Path(args.baseline)), args.threshold
+        )
+    elif not args.save_baseline:
+        # timings depend on the machine, thus no baseline is committed
+        print(
+            f"No baseline {args.baseline}, regressions can not be detected. Run with "
+            f"--save-baseline on this machine first"
+        )
+        sys.exit(1)
+    if args.save_baseline:
+        save_results(results, Path(args.baseline))
+        print(f"Saved baseline to {args.baseline}")
+    if len(regressions) > 0:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.handler import generate_synthetic_dataset
+
+
+def generate_dataset(output_dir, train_images=2, **overrides):
+    """Generates a small dataset of the bundled assets with seed 1
+
+    Args:
+        output_dir(Path): Directory of the dataset
+        train_images(int): Number of images of the train split, no other splits
+        overrides: Further arguments of generate_synthetic_dataset, replace the defaults
+
+    Returns:
+        result of generate_synthetic_dataset
+    """
+    kwargs = dict(
+        output_dir=str(output_dir),
+        object_json=str(ROOT / "data/objects/splits.json"),
+        distractor_json=str(ROOT / "data/distractors/splits.json"),
+        background_json=str(ROOT / "data/backgrounds/splits.json"),
+        number_of_images={"train": train_images, "validation": 0, "test": 0},
+        dontocclude=True,
+        rotation=True,
+        scale=True,
+        multithreading=False,
+        seed=1,
+    )
+    kwargs.update(overrides)
+    return generate_synthetic_dataset(**kwargs)
@@ -0,0 +1,43 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.config import BLENDING_LIST
+from tests.helpers import generate_dataset
+
+
+class TestAppend(unittest.TestCase):
+    def test_append_to_existing_dataset(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_dir = Path(output_dir)
+            generate_dataset(output_dir, 2)
+            with (output_dir / "train.json").open("r") as f:
+                existing = json.load(f)
+
+            generate_dataset(output_dir, 1, append=True)
+            self.assertTrue((output_dir / "train" / "00003").is_dir())
+            with (output_dir / "train.json").open("r") as f:
+                appended = json.load(f)
+            n_images = len(existing["images"])
+            self.assertEqual(n_images, 2 * len(BLENDING_LIST))
+            self.assertEqual(len(appended["images"]), 3 * len(BLENDING_LIST))
+            self.assertEqual(appended["images"][:n_images], existing["images"])
+            self.assertEqual(
+                [img["id"] for img in appended["images"]],
+                list(range(len(appended["images"]))),
+            )
+            annotation_ids = [anno["id"] for anno in appended["annotations"]]
+            self.assertEqual(annotation_ids, list(range(len(annotation_ids))))
+            self.assertTrue(
+                appended["images"][-1]["file_name"].startswith("train/00003/")
+            )
+            with (output_dir / "train_stats.json").open("r") as f:
+                statistics = json.load(f)
+            self.assertEqual(statistics["tasks"], 3)
+            self.assertEqual(statistics["images"], len(appended["images"]))
+            self.assertEqual(statistics["annotations"], len(appended["annotations"]))
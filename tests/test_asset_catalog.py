@@ -0,0 +1,25 @@
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.config import OBJECT_CATEGORIES
+from src.models.asset_catalog import AssetCatalog
+
+
+class TestAssetCatalog(unittest.TestCase):
+    def test_catalog_from_split_file(self):
+        catalog = AssetCatalog.from_split_file(
+            ROOT / "data/objects/splits.json", OBJECT_CATEGORIES[0]["name"]
+        )
+        self.assertEqual(len(catalog), 5)
+        self.assertEqual(len(catalog.get_split_indices("train")), 5)
+        self.assertEqual(len(catalog.get_split_indices("test")), 0)
+        img_data = catalog.materialise(catalog.get_split_indices("train")[0])
+        self.assertEqual(img_data.label_id, OBJECT_CATEGORIES[0]["id"])
+        self.assertTrue(img_data.img_path.exists())
+        width, height = catalog.get_size(0)
+        self.assertGreater(width, 0)
+        self.assertGreater(height, 0)
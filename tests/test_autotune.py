@@ -0,0 +1,44 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.config import NUMBER_OF_WORKERS
+from src.generator.autotune import (
+    autotune_workers,
+    get_candidate_worker_counts,
+    get_number_of_workers,
+    save_autotune_result,
+)
+
+
+class TestAutotune(unittest.TestCase):
+    def test_candidates(self):
+        self.assertEqual(get_candidate_worker_counts(1), [1])
+        self.assertEqual(get_candidate_worker_counts(6), [1, 2, 4, 6])
+        self.assertEqual(get_candidate_worker_counts(8), [1, 2, 4, 8])
+
+    def test_autotune_is_persisted(self):
+        parent_memory = bytearray(256 * 1024**2)  # not part of the measured runs
+        result = autotune_workers(
+            str(ROOT / "data/objects/splits.json"),
+            str(ROOT / "data/distractors/splits.json"),
+            str(ROOT / "data/backgrounds/splits.json"),
+            num_images=1,
+            candidates=[1],
+        )
+        self.assertEqual(result["num_workers"], 1)
+        self.assertGreater(result["measurements"][0]["images_per_s"], 0)
+        self.assertGreater(result["measurements"][0]["memory"], 0)
+        self.assertLess(result["measurements"][0]["memory"], len(parent_memory))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            autotune_file = Path(tmp_dir) / "autotune.json"
+            self.assertEqual(get_number_of_workers(autotune_file), NUMBER_OF_WORKERS)
+            save_autotune_result(result, autotune_file)
+            self.assertEqual(get_number_of_workers(autotune_file), 1)
+            result["machine"]["cpu_count"] = -1  # e.g. copied from another machine
+            save_autotune_result(result, autotune_file)
+            self.assertEqual(get_number_of_workers(autotune_file), NUMBER_OF_WORKERS)
@@ -0,0 +1,99 @@
+import json
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator import handler, plan
+from src.generator.backgrounds import (
+    BackgroundCache,
+    crop_background,
+    get_background_size,
+    load_background,
+    sample_background_crop,
+)
+from src.generator.plan import PLAN_FILE_NAME, load_plan
+from tests.helpers import generate_dataset
+
+BG_FILE = ROOT / "data/backgrounds/road-g1883e1352_1280.jpg"
+
+
+class TestBackgroundCache(unittest.TestCase):
+    def test_resize_and_crop(self):
+        background = load_background(BG_FILE, (320, 200), "resize")
+        self.assertEqual(background.shape, (200, 320, 3))
+        background = load_background(BG_FILE, (200, 200), "crop")
+        self.assertEqual(background.shape, (200, 200, 3))
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = BackgroundCache(max_size=0, cache_dir=tmp_dir, target_size=None)
+            background = cache.get(BG_FILE)
+            self.assertEqual(len(list(Path(tmp_dir).glob("*.npy"))), 1)
+            self.assertFalse(background.flags.writeable)
+            np.testing.assert_array_equal(background, load_background(BG_FILE))
+            np.testing.assert_array_equal(cache.get(BG_FILE), background)
+
+    def test_random_crop(self):
+        rng = random.Random(0)
+        for _ in range(100):
+            left, top, right, bottom = sample_background_crop(1280, 853, 320, 240, rng)
+            self.assertTrue(0 <= left < right <= 1280 and 0 <= top < bottom <= 853)
+            self.assertAlmostEqual((right - left) / (bottom - top), 4 / 3, delta=0.01)
+        crop = [100, 50, 740, 530]
+        background = load_background(BG_FILE, (320, 240), "random_crop", crop=crop)
+        self.assertEqual(background.shape, (240, 320, 3))
+        expected = crop_background(load_background(BG_FILE), crop, (320, 240))
+        np.testing.assert_array_equal(background, expected)
+        # drafts are decoded at reduced size, but still cover the crop
+        background = load_background(BG_FILE, (80, 60), "random_crop", True, crop)
+        self.assertEqual(background.shape, (60, 80, 3))
+
+
+class TestBackgroundCrops(unittest.TestCase):
+    def test_crops_share_background(self):
+        num_crops = 3
+        target_size = (320, 240)
+        with mock.patch.multiple(
+            handler,
+            BACKGROUND_CROPS=num_crops,
+            BACKGROUND_RESIZE_MODE="random_crop",
+            BACKGROUND_TARGET_SIZE=target_size,
+        ), mock.patch.multiple(
+            plan,
+            BACKGROUND_RESIZE_MODE="random_crop",
+            BACKGROUND_TARGET_SIZE=target_size,
+            get_background_size=lambda bg_file, size=target_size: get_background_size(
+                bg_file, size
+            ),
+        ), tempfile.TemporaryDirectory() as output_dir:
+            generate_dataset(output_dir, num_crops, dontocclude=False)
+            split_dir = Path(output_dir) / "train"
+            _, records = load_plan(split_dir / PLAN_FILE_NAME)
+            annotations = []
+            for task_dir in sorted(d for d in split_dir.iterdir() if d.is_dir()):
+                with sorted(task_dir.glob("*.json"))[0].open("r") as f:
+                    annotations.append(json.load(f)["annotations"])
+        self.assertEqual(len(records), num_crops)
+        self.assertEqual(len(set(r["background"] for r in records)), 1)
+        crops = [tuple(r["background_crop"]) for r in records]
+        self.assertEqual(len(set(crops)), num_crops)
+        self.assertTrue(all(r["background_size"] == list(target_size) for r in records))
+        layouts = [[o["position"] for o in r["objects"]] for r in records]
+        self.assertTrue(all(layouts.count(layout) == 1 for layout in layouts))
+        self.assertEqual(len(annotations), num_crops)
+        self.assertTrue(all(annotations.count(a) == 1 for a in annotations))
+
+    def test_crops_need_random_crop(self):
+        with mock.patch.multiple(
+            handler, BACKGROUND_CROPS=2, BACKGROUND_RESIZE_MODE="resize"
+        ), tempfile.TemporaryDirectory() as output_dir:
+            with self.assertRaises(AssertionError):
+                generate_dataset(output_dir, 2)
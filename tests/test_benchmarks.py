@@ -0,0 +1,27 @@
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.benchmarks.pipeline import benchmark_pipeline
+from src.benchmarks.utils import compare_to_baseline
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_benchmark_stages(self):
+        results = benchmark_pipeline(["planning", "motion_blur"], repeats=1)
+        self.assertEqual(set(results), {"planning", "motion_blur"})
+        for stats in results.values():
+            self.assertGreater(stats["mean_ms"], 0)
+            self.assertGreater(stats["per_s"], 0)
+
+    def test_compare_to_baseline(self):
+        baseline = {"render": {"mean_ms": 100.0}, "join": {"mean_ms": 100.0}}
+        results = {
+            "render": {"mean_ms": 150.0},
+            "join": {"mean_ms": 90.0},
+            "new": {"mean_ms": 1.0},
+        }
+        self.assertEqual(compare_to_baseline(results, baseline, 1.2), ["render"])
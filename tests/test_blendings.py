@@ -0,0 +1,41 @@
+import sys
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.image_augmentation.blendings import apply_illumination_change
+from src.image_augmentation.gamma_correction import (
+    adjust_gamma_of_image,
+    get_gamma_table,
+)
+
+
+class TestBlendings(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        img = (rng.random((200, 220, 3)) * 255).astype(np.uint8)
+        self.img = cv2.GaussianBlur(img, (15, 15), 5)
+        self.mask = np.zeros((200, 220), np.uint8)
+        cv2.circle(self.mask, (110, 100), 60, 255, -1)
+
+    def test_gamma_table_is_cached(self):
+        get_gamma_table.cache_clear()
+        adjust_gamma_of_image(self.img, 1.2)
+        adjust_gamma_of_image(self.img, 1.20001)  # quantized to the same gamma
+        self.assertEqual(get_gamma_table.cache_info().hits, 1)
+        expected = [int(((i / 255.0) ** (1 / 1.2)) * 255) for i in range(256)]
+        self.assertEqual(get_gamma_table(1.2).tolist(), expected)
+
+    def test_illumination_change_in_mask_region(self):
+        expected = cv2.illuminationChange(self.img, self.mask.copy(), alpha=2, beta=0.2)
+        changed = apply_illumination_change(self.img, self.mask, 2, 0.2)
+        difference = np.abs(expected.astype(int) - changed.astype(int))
+        self.assertLessEqual(difference[self.mask > 0].max(), 2)
+        outside = self.mask == 0
+        outside[39:162, 49:172] = False  # bounding box of the mask with margin
+        self.assertTrue(np.array_equal(changed[outside], self.img[outside]))
@@ -0,0 +1,27 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from tests.helpers import generate_dataset
+
+
+class TestEstimate(unittest.TestCase):
+    def test_dry_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = Path(tmp_dir) / "dataset"
+            estimates = generate_dataset(
+                output_dir, 4, multithreading=True, num_workers=2, dry_run=True
+            )
+            self.assertFalse(output_dir.exists())
+        train = estimates["train"]
+        self.assertEqual(train["tasks"], 4)
+        self.assertGreater(train["calibration_tasks"], 0)
+        self.assertGreater(train["wall_time_s"], 0)
+        self.assertGreater(train["cpu_hours"], 0)
+        self.assertGreater(train["peak_memory"], 0)
+        self.assertGreater(train["output_bytes"], 0)
+        self.assertEqual(estimates["test"]["tasks"], 0)
@@ -1,5 +1,5 @@
-import shutil
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 
@@ -11,11 +11,10 @@ from src.generator.handler import generate_synthetic_dataset
 
 class TestDatasetGeneration(unittest.TestCase):
     def test_dataset_generation(self):
-        dataset_name = "test_dataset"  # Give your dataset a name
-        output_dir = (ROOT / "data" / dataset_name).resolve()
-        if output_dir.exists():
-            shutil.rmtree(output_dir.as_posix())
-        output_dir.mkdir(parents=True)
+        # Generated into a temporary directory, such that tests leave the tree clean
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        output_dir = Path(tmp_dir.name)
         # Adjust paths here if you are not using Docker
         distractor_json = ROOT / "data/distractors/splits.json"
         object_json = ROOT / "data/objects/splits.json"
@@ -35,3 +34,4 @@ class TestDatasetGeneration(unittest.TestCase):
             scale=True,  # enable random scaling of objects
             multithreading=False,  # enable multithreading for faster dataset generation
         )
+        self.assertTrue((output_dir / "train.json").exists())
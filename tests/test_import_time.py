@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+IMPORT_TIME_BUDGET = 1.5  # seconds for importing the generator in a fresh interpreter
+LAZY_MODULES = ["matplotlib", "scipy"]  # only needed by optional features
+
+
+class TestImportTime(unittest.TestCase):
+    def test_handler_import_time(self):
+        code = (
+            "import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            "import src.generator.handler\n"
+            "elapsed = time.perf_counter() - start\n"
+            f"lazy = [m for m in {LAZY_MODULES} if m in sys.modules]\n"
+            "print(json.dumps({'elapsed': elapsed, 'lazy': lazy}))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT.as_posix(),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(result["lazy"], [])
+        self.assertLess(
+            result["elapsed"],
+            IMPORT_TIME_BUDGET,
+            f"Import of src.generator.handler took {result['elapsed']:.3f}s",
+        )
@@ -0,0 +1,63 @@
+import sys
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator import handler
+from src.generator.metrics import get_run_metrics, start_run_metrics, stop_run_metrics
+from src.generator.workers import run_tasks
+from src.image_augmentation.basic_augmentations import SamplingError
+from tests.helpers import generate_dataset
+
+
+def render_task(record):
+    if record["task_id"] == 3:
+        raise SamplingError("no layout")
+    return {"task_id": record["task_id"], "images": 2, "stages": {"render": 0.2}}
+
+
+class TestMetrics(unittest.TestCase):
+    def test_metrics_of_tasks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            metrics_file = Path(tmp_dir) / "metrics.prom"
+            metrics = start_run_metrics(metrics_file, port=0)
+            try:
+                metrics.start_split("train")
+                records = [{"task_id": i} for i in range(1, 5)]
+                run_tasks(render_task, records, False, "processes", 1)
+                metrics.placement_failed()
+                url = f"http://127.0.0.1:{metrics.port}/metrics"
+                with urllib.request.urlopen(url) as response:
+                    served = response.read().decode("utf-8")
+            finally:
+                stop_run_metrics()
+            self.assertIsNone(get_run_metrics())
+            self.assertIn(
+                'synthetic_tasks{split="train",state="done"} 3',
+                metrics_file.read_text(),
+            )
+        self.assertIn('synthetic_images_total{split="train"} 6', served)
+        self.assertIn('synthetic_tasks{split="train",state="done"} 3', served)
+        self.assertIn('synthetic_tasks{split="train",state="failed"} 1', served)
+        self.assertIn('synthetic_tasks{split="train",state="queued"} 0', served)
+        self.assertIn('synthetic_placement_failures_total{split="train"} 1', served)
+        self.assertIn(
+            'synthetic_stage_seconds_bucket{stage="render",le="0.1"} 0', served
+        )
+        self.assertIn(
+            'synthetic_stage_seconds_bucket{stage="render",le="0.25"} 3', served
+        )
+        self.assertIn('synthetic_stage_seconds_count{stage="render"} 3', served)
+
+    def test_metrics_stopped_if_run_raises(self):
+        with mock.patch.object(
+            handler, "render_configurations", side_effect=RuntimeError("crash")
+        ), tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(RuntimeError):
+                generate_dataset(tmp_dir, 1, metrics_port=0)
+        self.assertIsNone(get_run_metrics())
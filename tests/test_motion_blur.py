@@ -0,0 +1,36 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.image_augmentation.motion_blur import (
+    LINE_LENGTHS,
+    LINE_TYPES,
+    LineKernel,
+    LinearMotionBlur3C,
+    getValidLineAngles,
+)
+
+
+class TestMotionBlur(unittest.TestCase):
+    def test_kernels(self):
+        for length in LINE_LENGTHS:
+            for angle in getValidLineAngles(length):
+                for line_type in LINE_TYPES:
+                    kernel = LineKernel(length, angle, line_type)
+                    self.assertEqual(kernel.shape, (length, length))
+                    self.assertAlmostEqual(float(kernel.sum()), 1.0, places=5)
+        horizontal = LineKernel(5, 0.0, "full")
+        np.testing.assert_allclose(horizontal[2], 0.2)
+        self.assertIs(LineKernel(5, 0.0, "full"), horizontal)  # cached
+
+    def test_blur_of_3_channel_image(self):
+        img = np.zeros((40, 50, 3), dtype=np.uint8)
+        img[:, 25:, 1] = 255
+        blurred = np.asarray(LinearMotionBlur3C(img))
+        self.assertEqual(blurred.shape, img.shape)
+        self.assertTrue(np.all(blurred[:, :, [0, 2]] == 0))
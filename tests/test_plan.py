@@ -0,0 +1,40 @@
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.handler import render_plan
+from src.generator.plan import PLAN_FILE_NAME, load_plan
+from src.image_augmentation.basic_augmentations import get_rotated_size
+from tests.helpers import generate_dataset
+
+
+class TestPlan(unittest.TestCase):
+    def test_rotated_size_matches_pillow(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            w, h = rng.randint(1, 300), rng.randint(1, 300)
+            degrees = rng.randint(-30, 30)
+            rotated = Image.new("L", (w, h)).rotate(degrees, expand=True)
+            self.assertEqual(get_rotated_size(w, h, degrees), rotated.size)
+
+    def test_render_plan_again(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            generate_dataset(output_dir)
+            plan_file = Path(output_dir) / "train" / PLAN_FILE_NAME
+            header, records = load_plan(plan_file)
+            self.assertEqual([r["task_id"] for r in records], [1, 2])
+            self.assertTrue(all("position" in o for o in records[0]["objects"]))
+
+            images = sorted((Path(output_dir) / "train" / "00002").glob("*.jpg"))
+            expected = [f.read_bytes() for f in images]
+            for f in images:
+                f.unlink()
+            render_plan(plan_file, task_ids=[2])
+            self.assertEqual([f.read_bytes() for f in images], expected)
@@ -0,0 +1,42 @@
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.preprocess import preprocess_assets
+from src.models.asset_catalog import AssetCatalog
+from src.models.img_data import ImgDataRGBA
+
+
+class TestPreprocessAssets(unittest.TestCase):
+    def test_preprocess_assets(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            shutil.copy(ROOT / "data/objects/box/box_01.png", tmp_dir / "box.png")
+            Image.new("RGB", (10, 10)).save(tmp_dir / "rgb.png")
+            split_file = tmp_dir / "splits.json"
+            with split_file.open("w") as f:
+                json.dump({"train": ["box.png", "rgb.png"], "test": []}, f)
+
+            summary = preprocess_assets([split_file], num_workers=1)
+            self.assertEqual(summary, {"processed": 1, "skipped": 0, "invalid": 1})
+            summary = preprocess_assets([split_file], num_workers=1)
+            self.assertEqual(summary, {"processed": 0, "skipped": 1, "invalid": 1})
+
+            catalog = AssetCatalog.from_split_file(split_file, "box")
+            indices = catalog.get_split_indices("train")
+            self.assertEqual(len(indices), 1)  # RGB image is excluded
+            img_data = catalog.materialise(indices[0])
+            self.assertTrue(Path(img_data.metadata["mask"]).exists())
+            uncached = ImgDataRGBA(img_data.img_path, "box")
+            self.assertEqual(
+                img_data.get_annotation_from_mask(),
+                uncached.get_annotation_from_mask(),
+            )
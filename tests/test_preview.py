@@ -0,0 +1,67 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.preview import (
+    generate_preview,
+    get_preview_blending,
+    scale_plan_record,
+)
+
+
+class TestPreview(unittest.TestCase):
+    def test_contact_sheet(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sheets = generate_preview(
+                output_dir=tmp_dir,
+                object_json=str(ROOT / "data/objects/splits.json"),
+                distractor_json=str(ROOT / "data/distractors/splits.json"),
+                background_json=str(ROOT / "data/backgrounds/splits.json"),
+                number_of_images={"train": 3, "validation": 0, "test": 0},
+                dontocclude=True,
+                rotation=True,
+                scale=True,
+                seed=1,
+                blending_list=["none", "poisson", "mixed"],
+                preview_scale=0.25,
+            )
+            self.assertEqual(list(sheets), ["train"])
+            with Image.open(sheets["train"]) as sheet:
+                self.assertGreater(sheet.width, 0)
+            self.assertEqual(len(list(Path(tmp_dir).iterdir())), 1)
+
+    def test_scaled_geometry(self):
+        record = {
+            "background_size": [1280, 720],
+            "objects": [
+                {
+                    "bbox": [3, 203, 5, 105],
+                    "size": [400, 200],
+                    "position": [-20, 100],
+                    "blending": [{}],
+                }
+            ],
+        }
+        scaled = scale_plan_record(record, 0.25)
+        self.assertEqual(scaled["background_size"], [320, 180])
+        self.assertEqual(scaled["objects"][0]["size"], [100, 50])
+        self.assertEqual(scaled["objects"][0]["position"], [-5, 25])
+        self.assertEqual(scaled["objects"][0]["bbox"], [3, 203, 5, 105])
+        self.assertEqual(record["objects"][0]["size"], [400, 200])
+
+    def test_cheap_blendings(self):
+        self.assertEqual(get_preview_blending("poisson", {}), ("gaussian", {}))
+        self.assertEqual(
+            get_preview_blending("illumination", {"alpha": 2, "beta": 0.1}),
+            ("none", {}),
+        )
+        self.assertEqual(
+            get_preview_blending("mixed", {"gamma": 1.2, "alpha": 2, "beta": 0.1}),
+            ("mixed", {"gamma": 1.2}),
+        )
@@ -0,0 +1,66 @@
+import sys
+import tracemalloc
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.profiling import (
+    create_memory_report,
+    finish_task_profile,
+    profile_stage,
+    start_task_profile,
+)
+
+MB = 1024 * 1024
+
+
+class TestProfiling(unittest.TestCase):
+    def test_stage_peaks(self):
+        self.addCleanup(tracemalloc.stop)
+        start_task_profile(task_id=1)
+        with profile_stage("render"):
+            with profile_stage("masks"):
+                mask = np.ones(4 * MB, dtype=np.uint8)
+                del mask
+            image = np.ones(2 * MB, dtype=np.uint8)
+        profile = finish_task_profile()
+        self.assertEqual(profile["task_id"], 1)
+        self.assertGreaterEqual(profile["stages"]["masks"]["traced_peak"], 4 * MB)
+        self.assertGreaterEqual(profile["stages"]["render"]["traced_peak"], 4 * MB)
+        self.assertLess(profile["stages"]["render"]["traced_peak"], 7 * MB)
+        self.assertIsNone(finish_task_profile())
+        del image
+
+    def test_tracing_stopped_by_profile(self):
+        start_task_profile(task_id=1)
+        start_task_profile(task_id=2)  # task 1 raised
+        finish_task_profile()
+        self.assertFalse(tracemalloc.is_tracing())
+
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        start_task_profile(task_id=3)
+        finish_task_profile()
+        self.assertTrue(tracemalloc.is_tracing())
+
+    def test_leak_detection(self):
+        profiles = [
+            {
+                "task_id": i,
+                "pid": 1,
+                "task_index": i,
+                "rss_end": 100 * MB + i * 10 * MB,
+                "peak_rss": 200 * MB,
+                "stages": {},
+                "top_allocations": [],
+            }
+            for i in range(6)
+        ]
+        report = create_memory_report(profiles)
+        self.assertEqual(report["tasks"], 6)
+        self.assertEqual(len(report["leaks"]), 1)
+        self.assertAlmostEqual(report["leaks"][0]["rss_growth_per_task"], 10 * MB)
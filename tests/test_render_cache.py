@@ -0,0 +1,44 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.create import create_image_anno_wrapper
+from src.generator.plan import PLAN_FILE_NAME, load_plan
+from tests.helpers import generate_dataset
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_rebuild_reuses_cached_images(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = Path(tmp_dir) / "dataset"
+            cache_dir = Path(tmp_dir) / "cache"
+            output_dir.mkdir()
+            generate_dataset(output_dir, 1, render_cache_dir=str(cache_dir))
+            split_dir = output_dir / "train"
+            header, records = load_plan(split_dir / PLAN_FILE_NAME)
+            n_variants = len(header["blending_list"])
+            self.assertEqual(len(list(cache_dir.rglob("*.jpg"))), n_variants)
+
+            img_files = sorted(split_dir.rglob("*.jpg"))
+            anno_files = sorted(split_dir.rglob("*.json"))
+            images = [f.read_bytes() for f in img_files]
+            annotations = [json.loads(f.read_text()) for f in anno_files]
+            for f in img_files + anno_files:
+                f.unlink()
+            result = create_image_anno_wrapper(
+                records[0],
+                split_dir,
+                header["blending_list"],
+                header["categories"],
+                render_cache_dir=str(cache_dir),
+            )
+            self.assertEqual(result["cached"], n_variants)
+            self.assertEqual([f.read_bytes() for f in img_files], images)
+            self.assertEqual(
+                [json.loads(f.read_text()) for f in anno_files], annotations
+            )
@@ -0,0 +1,44 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from tests.helpers import generate_dataset
+
+
+class TestReproducibility(unittest.TestCase):
+    def test_output_independent_of_workers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            single_dir = Path(tmp_dir) / "single"
+            multi_dir = Path(tmp_dir) / "multi"
+            single_dir.mkdir()
+            multi_dir.mkdir()
+            generate_dataset(single_dir)
+            generate_dataset(multi_dir, multithreading=True)
+            self.assertSameImages(single_dir, multi_dir)
+
+    def test_output_independent_of_backend(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            single_dir = Path(tmp_dir) / "single"
+            multi_dir = Path(tmp_dir) / "threads"
+            single_dir.mkdir()
+            multi_dir.mkdir()
+            generate_dataset(single_dir)
+            generate_dataset(multi_dir, multithreading=True, backend="threads")
+            self.assertSameImages(single_dir, multi_dir)
+
+    def assertSameImages(self, single_dir, multi_dir):
+        """Compares the images of two generated datasets byte by byte"""
+        single_files = sorted(
+            f.relative_to(single_dir) for f in single_dir.rglob("*.jpg")
+        )
+        multi_files = sorted(f.relative_to(multi_dir) for f in multi_dir.rglob("*.jpg"))
+        self.assertGreater(len(single_files), 0)
+        self.assertEqual(single_files, multi_files)
+        for f in single_files:
+            self.assertEqual(
+                (single_dir / f).read_bytes(), (multi_dir / f).read_bytes()
+            )
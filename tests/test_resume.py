@@ -0,0 +1,34 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.config import BLENDING_LIST
+from src.generator.journal import JOURNAL_FILE_NAME, load_journal
+from tests.helpers import generate_dataset
+
+
+class TestResume(unittest.TestCase):
+    def test_resume_renders_only_missing_outputs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_dir = Path(output_dir)
+            generate_dataset(output_dir)
+            split_dir = output_dir / "train"
+            self.assertEqual(load_journal(split_dir / JOURNAL_FILE_NAME), {1, 2})
+
+            # simulate a run that died while writing the second image
+            truncated_img = sorted((split_dir / "00002").glob("*.jpg"))[0]
+            with truncated_img.open("r+b") as f:
+                f.truncate(100)
+            untouched_img = sorted((split_dir / "00001").glob("*.jpg"))[0]
+            mtime = untouched_img.stat().st_mtime_ns
+
+            generate_dataset(output_dir, resume=True)
+            self.assertEqual(untouched_img.stat().st_mtime_ns, mtime)
+            self.assertGreater(truncated_img.stat().st_size, 100)
+            with (output_dir / "train.json").open("r") as f:
+                self.assertEqual(len(json.load(f)["images"]), 2 * len(BLENDING_LIST))
@@ -0,0 +1,75 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.config import BLENDING_LIST
+from src.generator.handler import get_next_task_ids
+from src.generator.join_annotations import merge_shards
+from tests.helpers import generate_dataset
+
+
+class TestShards(unittest.TestCase):
+    def test_sharded_generation_and_merge(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            (tmp_dir / "full").mkdir()
+            generate_dataset(tmp_dir / "full")
+            shard_dirs = [tmp_dir / "sharded" / f"shard-{i}" for i in range(2)]
+            for i, shard_dir in enumerate(shard_dirs):
+                shard_dir.mkdir(parents=True)
+                generate_dataset(shard_dir, num_shards=2, shard_index=i)
+            merge_shards(shard_dirs, tmp_dir / "sharded")
+
+            with (tmp_dir / "full" / "train.json").open("r") as f:
+                full = json.load(f)
+            with (tmp_dir / "sharded" / "train.json").open("r") as f:
+                merged = json.load(f)
+            self.assertEqual(len(merged["images"]), len(full["images"]))
+            self.assertEqual(len(merged["annotations"]), len(full["annotations"]))
+            self.assertEqual(
+                [img["id"] for img in merged["images"]],
+                list(range(len(merged["images"]))),
+            )
+            for img in merged["images"]:
+                merged_file = tmp_dir / "sharded" / img["file_name"]
+                full_file = (
+                    tmp_dir
+                    / "full"
+                    / Path(img["file_name"]).relative_to(
+                        Path(img["file_name"]).parts[0]
+                    )
+                )
+                self.assertEqual(merged_file.read_bytes(), full_file.read_bytes())
+
+    def test_append_to_merged_shards(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset_dir = Path(tmp_dir)
+            shard_dirs = [dataset_dir / f"shard-{i}" for i in range(2)]
+            for i, shard_dir in enumerate(shard_dirs):
+                shard_dir.mkdir()
+                generate_dataset(shard_dir, 3, num_shards=2, shard_index=i)
+            merge_shards(shard_dirs, dataset_dir)
+            first_task_ids = get_next_task_ids(dataset_dir)
+            self.assertEqual(first_task_ids["train"], 4)
+            for i, shard_dir in enumerate(shard_dirs):
+                generate_dataset(
+                    shard_dir,
+                    3,
+                    num_shards=2,
+                    shard_index=i,
+                    append=True,
+                    first_task_ids=first_task_ids,
+                )
+            merge_shards(shard_dirs, dataset_dir)
+
+            with (dataset_dir / "train.json").open("r") as f:
+                merged = json.load(f)
+            task_dirs = set(Path(img["file_name"]).parent for img in merged["images"])
+            self.assertEqual(sorted(int(d.name) for d in task_dirs), list(range(1, 7)))
+            self.assertEqual(len(merged["images"]), 6 * len(BLENDING_LIST))
+            self.assertEqual(get_next_task_ids(dataset_dir)["train"], 7)
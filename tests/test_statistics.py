@@ -0,0 +1,83 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator.statistics import DatasetStatistics
+
+
+def create_mask(x, y, w, h, width=100, height=50):
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[max(0, y) : y + h, max(0, x) : x + w] = 255
+    return mask
+
+
+def create_layout(x, y, w, h, distractor=False):
+    return {
+        "path": "data/objects/box.png",
+        "distractor": distractor,
+        "size": [w, h],
+        "rotation": 0,
+        "position": [x, y],
+    }
+
+
+class TestStatistics(unittest.TestCase):
+    def setUp(self):
+        # second object covers half of the first one, third one is half outside
+        self.record = {
+            "background": "data/backgrounds/bg.jpg",
+            "objects": [
+                create_layout(0, 0, 20, 10),
+                create_layout(10, 0, 20, 10),
+                create_layout(90, 40, 20, 20),
+            ],
+        }
+        self.masks = [
+            create_mask(0, 0, 10, 10),
+            create_mask(10, 0, 20, 10),
+            create_mask(90, 40, 10, 10),
+        ]
+        self.img_dict = {"id": 0, "width": 100, "height": 50}
+        self.annotations = [
+            {"id": i, "category_id": 0, "bbox": [0, 0, 10, 10]} for i in range(3)
+        ]
+
+    def test_truncation_and_occlusion(self):
+        statistics = DatasetStatistics()
+        statistics.add_task(self.record)
+        statistics.add_image(
+            self.img_dict,
+            self.annotations,
+            self.masks,
+            self.record,
+            [{"id": 0, "name": "box"}],
+        )
+        report = statistics.to_dict()
+        self.assertEqual(report["objects_per_image"], {"3": 1})
+        self.assertEqual(report["instances_per_category"], {"box": 3})
+        self.assertAlmostEqual(report["truncation"]["sum"], 0.75)
+        self.assertAlmostEqual(report["occlusion"]["sum"], 0.5)
+        self.assertEqual(report["truncation"]["truncated"], 1)
+        self.assertEqual(report["occlusion"]["occluded"], 1)
+        self.assertEqual(report["asset_usage"]["objects"], {"data/objects/box.png": 3})
+
+    def test_merge(self):
+        statistics = DatasetStatistics()
+        for _ in range(2):  # e.g. accumulators of two workers
+            worker_statistics = DatasetStatistics()
+            worker_statistics.add_task(self.record)
+            worker_statistics.add_image(
+                self.img_dict, self.annotations[:2], self.masks, self.record
+            )
+            statistics.merge(worker_statistics)
+        report = statistics.to_dict()
+        self.assertEqual(report["tasks"], 2)
+        self.assertEqual(report["annotations"], 4)
+        self.assertEqual(report["instances_per_category"], {"0": 4})
+        self.assertEqual(sum(report["area"]["counts"]), 4)
+        self.assertEqual(DatasetStatistics.from_dict(report).to_dict(), report)
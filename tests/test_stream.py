@@ -0,0 +1,61 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.config import BLENDING_LIST
+from src.generator import plan
+from src.generator.stream import generate_samples
+from src.image_augmentation.basic_augmentations import SamplingError
+
+
+def generate(num_workers):
+    return list(
+        generate_samples(
+            object_json=str(ROOT / "data/objects/splits.json"),
+            distractor_json=str(ROOT / "data/distractors/splits.json"),
+            background_json=str(ROOT / "data/backgrounds/splits.json"),
+            num_images=3,
+            seed=1,
+            num_workers=num_workers,
+            prefetch=1,
+        )
+    )
+
+
+class TestStream(unittest.TestCase):
+    def test_samples_independent_of_workers(self):
+        samples = generate(num_workers=0)
+        self.assertEqual(len(samples), 3 * len(BLENDING_LIST))
+        image, annotations = samples[0]
+        self.assertEqual(image.dtype, np.uint8)
+        self.assertEqual(image.shape[2], 3)
+        self.assertGreater(len(annotations), 0)
+        image_ids = [annotations[0]["image_id"] for _, annotations in samples]
+        self.assertEqual(image_ids, list(range(len(samples))))
+
+        for (image, annotations), (other_image, other_annotations) in zip(
+            samples, generate(num_workers=2)
+        ):
+            np.testing.assert_array_equal(image, other_image)
+            self.assertEqual(annotations, other_annotations)
+
+    def test_unplannable_task_is_skipped(self):
+        plan_image = plan.plan_image
+
+        def plan_image_failing_task_2(params, header, sizes=None):
+            if params["task_id"] == 2:
+                raise SamplingError("no layout")
+            return plan_image(params, header, sizes)
+
+        with mock.patch.object(plan, "plan_image", plan_image_failing_task_2):
+            samples = generate(num_workers=0)
+        self.assertEqual(len(samples), 2 * len(BLENDING_LIST))
+        image_ids = [annotations[0]["image_id"] for _, annotations in samples]
+        n = len(BLENDING_LIST)
+        self.assertEqual(image_ids, list(range(n)) + list(range(2 * n, 3 * n)))
@@ -0,0 +1,101 @@
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(ROOT.as_posix())
+
+from src.generator import create
+from src.generator.workers import run_tasks, schedule_tasks
+from src.image_augmentation.basic_augmentations import SamplingError, sample_rotation
+from tests.helpers import generate_dataset
+
+
+def sleep_task(record):
+    if record["sleep"] == -1:
+        raise SamplingError("no layout")
+    if record["sleep"] == -2:
+        raise ValueError("broken task")
+    time.sleep(record["sleep"])
+    return record["task_id"]
+
+
+class TestWorkers(unittest.TestCase):
+    def test_hanging_task_is_recycled(self):
+        records = [
+            {"task_id": 1, "sleep": 0},
+            {"task_id": 2, "sleep": 600},
+            {"task_id": 3, "sleep": 0},
+        ]
+        start = time.time()
+        results, failures = run_tasks(
+            sleep_task, records, True, "processes", 2, timeout=1
+        )
+        self.assertLess(time.time() - start, 60)
+        self.assertEqual(sorted(results), [1, 3])
+        self.assertEqual([record["task_id"] for record, _ in failures], [2])
+        self.assertIn("Timeout", failures[0][1])
+
+    def test_failing_task_is_reported(self):
+        records = [{"task_id": 1, "sleep": 0}, {"task_id": 2, "sleep": -1}]
+        for multithreading in [False, True]:
+            results, failures = run_tasks(
+                sleep_task, records, multithreading, "threads", 2
+            )
+            self.assertEqual(results, [1])
+            self.assertEqual([record for record, _ in failures], [records[1]])
+            self.assertTrue(failures[0][1].endswith("SamplingError: no layout"))
+
+    def test_error_of_task_is_raised(self):
+        records = [{"task_id": 1, "sleep": 0}, {"task_id": 2, "sleep": -2}]
+        for multithreading, backend in [
+            (False, "processes"),
+            (True, "threads"),
+            (True, "processes"),
+        ]:
+            with self.assertRaisesRegex(ValueError, "broken task") as context:
+                run_tasks(sleep_task, records, multithreading, backend, 2)
+            if multithreading and backend == "processes":
+                # the traceback of the worker is attached
+                self.assertIn("sleep_task", str(context.exception.__cause__))
+
+    def test_render_errors_are_not_skipped(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with mock.patch.object(
+                create, "render_plan_record", side_effect=ValueError("renderer bug")
+            ), self.assertRaisesRegex(ValueError, "renderer bug"):
+                generate_dataset(output_dir, 1)
+            with mock.patch.object(
+                create, "render_plan_record", side_effect=SamplingError("no layout")
+            ), self.assertRaisesRegex(RuntimeError, "1 tasks of train failed"):
+                generate_dataset(output_dir, 1)
+            self.assertTrue((Path(output_dir) / "train.json").exists())
+
+    def test_locality_scheduling(self):
+        records = [
+            {
+                "task_id": i,
+                "background": f"bg_{i % 3}.jpg",
+                "objects": [{"path": f"box_{i % 2}.png"}],
+            }
+            for i in range(12)
+        ]
+        batches = schedule_tasks(records, "locality", 2, batch_size=4)
+        self.assertEqual(len(batches), 3)
+        for batch in batches:
+            self.assertEqual(len(set(r["background"] for r in batch)), 1)
+            self.assertEqual(
+                [r["objects"][0]["path"] for r in batch],
+                sorted(r["objects"][0]["path"] for r in batch),
+            )
+        scheduled = sorted(r["task_id"] for batch in batches for r in batch)
+        self.assertEqual(scheduled, list(range(12)))
+        batches = schedule_tasks(records, "fifo", 2)
+        self.assertEqual([r["task_id"] for r, in batches], list(range(12)))
+
+    def test_sampling_is_capped(self):
+        with self.assertRaises(SamplingError):
+            sample_rotation(200, 200, 30, 100, 100)